@@ -0,0 +1,213 @@
+import asyncio
+import logging
+from . import crud, diagnostics, plan_index, repository
+from .database import AsyncSessionLocal
+from .lod import FULL_DETAIL, GeometryDetail
+
+logger = logging.getLogger(__name__)
+
+# Async counterparts of the GeoJSON functions in crud.py. An AsyncSession runs one statement
+# at a time, so every independent query gets its own session (and pooled connection) and the
+# queries of a request are awaited together with asyncio.gather.
+
+async def _execute(statement, params: dict = None):
+    """Run a statement on its own async session and return all rows"""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(statement, params or {})
+        return result.all()
+
+async def _run_sync(fn, *args):
+    """Run a sync crud/diagnostics helper against an async session"""
+    async with AsyncSessionLocal() as db:
+        return await db.run_sync(fn, *args)
+
+async def get_index():
+    """Return the plan index, loading it through the async engine on first use"""
+    return await _run_sync(plan_index.get_index)
+
+async def get_zip_code_attributes(postal_codes):
+    """Async crud.get_zip_code_attributes()"""
+    postal_codes = list(set(postal_codes))
+    if not postal_codes:
+        return {}
+
+    rows = await _execute(repository.zip_code_attributes_query(postal_codes))
+    return {row.postal_code: row for row in rows}
+
+async def get_geometries(postal_codes, detail: GeometryDetail = FULL_DETAIL):
+    """Async crud.get_geometries(); cache hits are served without a query"""
+    postal_codes = set(postal_codes)
+    if not postal_codes:
+        return {}
+
+    geometries, missing = repository.get_cached_geometries(postal_codes, detail)
+    if missing:
+        rows = await _execute(repository.geometry_query(detail), {"postal_codes": missing, "precision": detail.precision})
+        repository.cache_geometry_rows(rows, geometries, detail)
+
+    return geometries
+
+async def get_demographics(postal_codes=None, year: int = None):
+    """Async crud.get_demographics()"""
+    if postal_codes is not None:
+        postal_codes = list(set(postal_codes))
+        if not postal_codes:
+            return {}
+
+    return repository.group_demographics(await _execute(repository.demographics_query(postal_codes, year)))
+
+async def _empty():
+    return {}
+
+async def get_zip_codes(
+    postal_codes: list[str] = None,
+    year: int = None,
+    include_demographics: bool = False,
+    include_geometry: bool = True,
+    debug: bool = False,
+    detail: GeometryDetail = FULL_DETAIL
+):
+    """
+    Async crud.get_zip_codes().
+    When postal codes are given, ZIP rows, geometries and demographics are queried concurrently.
+    """
+    try:
+        # Convert all postal codes to strings and strip any whitespace
+        if postal_codes:
+            postal_codes = [str(code).strip() for code in postal_codes]
+
+        # Run the validity probes only in diagnostics mode
+        if debug or diagnostics.diagnostics_enabled():
+            report = await _run_sync(diagnostics.check_geometries, postal_codes)
+            logger.info("Geometry diagnostics for /zip-codes/", extra={"diagnostics": report})
+
+        if postal_codes:
+            zip_codes, geometries, demographics = await asyncio.gather(
+                _execute(repository.zip_code_attributes_query(postal_codes)),
+                get_geometries(postal_codes, detail) if include_geometry else _empty(),
+                get_demographics(postal_codes, year) if include_demographics else _empty()
+            )
+        else:
+            # Without a filter the geometry lookup needs the list of ZIP codes first
+            zip_codes = await _execute(repository.zip_code_attributes_query())
+            geometries, demographics = await asyncio.gather(
+                get_geometries([zip_code.postal_code for zip_code in zip_codes], detail) if include_geometry else _empty(),
+                get_demographics(None, year) if include_demographics else _empty()
+            )
+
+        features = [
+            crud.build_zip_code_feature(zip_code, year, demographics, geometries)
+            for zip_code in zip_codes
+        ]
+
+        logger.debug("Built /zip-codes/ response", extra={"requested": len(postal_codes or []), "features": len(features)})
+
+        return {
+            "type": "FeatureCollection",
+            "features": features
+        }
+    except Exception:
+        logger.exception("Error in async get_zip_codes")
+        raise
+
+async def get_plan_features(
+    plans,
+    include_geometry: bool = True,
+    include_population: bool = False,
+    detail: GeometryDetail = FULL_DETAIL,
+    main_station: str = None
+):
+    """Async crud.iter_plan_features(): ZIP rows, geometries and demographics are queried concurrently"""
+    postal_codes = set(plan.postal_code for plan in plans)
+
+    zip_codes, geometries, populations = await asyncio.gather(
+        get_zip_code_attributes(postal_codes),
+        get_geometries(postal_codes, detail) if include_geometry else _empty(),
+        get_demographics(postal_codes) if include_population else _empty()
+    )
+
+    return [
+        crud.build_plan_feature(plan, zip_codes, geometries, populations, main_station)
+        for plan in plans
+    ]
+
+async def get_node_data(
+    delivery_station: str,
+    effective_week: str = None,
+    program_type: str = 'all',
+    include_geometry: bool = True,
+    include_population: bool = False,
+    recursive: bool = False,
+    depth: int = None,
+    component: bool = False,
+    detail: GeometryDetail = FULL_DETAIL
+):
+    """
+    Async crud.get_node_data().
+    Plans are resolved from the in-memory plan index; the database work runs concurrently.
+    """
+    try:
+        index = await get_index()
+        plans, metadata = crud.resolve_node_plans(
+            index,
+            delivery_station,
+            effective_week=effective_week,
+            program_type=program_type,
+            recursive=recursive,
+            depth=depth,
+            component=component
+        )
+
+        features = await get_plan_features(
+            plans,
+            include_geometry=include_geometry,
+            include_population=include_population,
+            detail=detail,
+            main_station=delivery_station
+        )
+
+        logger.debug("Built /node/ response", extra={"features": len(features), "delivery_stations": metadata["total_delivery_stations"]})
+
+        return {
+            "type": "FeatureCollection",
+            "features": features,
+            "metadata": metadata
+        }
+    except Exception:
+        logger.exception("Error in async get_node_data")
+        raise
+
+async def get_node_reverse_data(
+    postal_codes: list[str],
+    effective_week: str = None,
+    program_type: str = 'all',
+    include_geometry: bool = True,
+    include_population: bool = False,
+    detail: GeometryDetail = FULL_DETAIL
+):
+    """Async crud.get_node_reverse_data()"""
+    try:
+        index = await get_index()
+
+        # Get the minimum effective week if none provided
+        if not effective_week:
+            effective_week = index.default_week()
+
+        postal_codes = [str(code).strip() for code in postal_codes]
+        plans = index.plans_for_postal_codes(effective_week, program_type, postal_codes)
+
+        features = await get_plan_features(
+            plans,
+            include_geometry=include_geometry,
+            include_population=include_population,
+            detail=detail
+        )
+
+        return {
+            "type": "FeatureCollection",
+            "features": features,
+            "metadata": crud.node_reverse_metadata(postal_codes, effective_week, program_type, plans, features)
+        }
+    except Exception:
+        logger.exception("Error in async get_node_reverse_data")
+        raise
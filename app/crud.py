@@ -1,225 +1,370 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, text
 from . import models
-from geoalchemy2.shape import to_shape
-from geojson import Feature, FeatureCollection
-import json
+from . import diagnostics, plan_index
+from .geometry_cache import boundary_cache, tile_cache
+from .lod import FULL_DETAIL, GeometryDetail
+from .repository import repository_for
+from .responses import RawJSON, render_feature, render_feature_collection
+import itertools
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Number of ZIP codes / plans fetched per batch in streaming mode
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "1000"))
+
+def get_zip_code_attributes(db: Session, postal_codes):
+    """
+    Get lat/long for a set of postal codes in a single lookup.
+    The geometry column is deliberately not loaded; use get_geometries() for that.
+    Returns a dict keyed by postal code.
+    """
+    postal_codes = list(set(postal_codes))
+    if not postal_codes:
+        return {}
+
+    return {
+        row.postal_code: row
+        for batch in repository_for(db).zip_code_attributes(postal_codes)
+        for row in batch
+    }
+
+def get_geometries(db: Session, postal_codes, detail: GeometryDetail = FULL_DETAIL):
+    """
+    Get GeoJSON geometries for a set of postal codes as pre-serialized RawJSON.
+    `detail` selects the precomputed simplification tier and coordinate precision.
+    Geometries are served from the shared geometry cache; misses are fetched in one batch
+    (a single ST_AsGeoJSON query on PostGIS) and cached, so each ZIP is serialized at most once.
+    Returns a dict keyed by postal code; ZIPs without geometry are omitted.
+    """
+    postal_codes = set(postal_codes)
+    if not postal_codes:
+        return {}
+
+    return repository_for(db).geometries(postal_codes, detail)
+
+def get_demographics(db: Session, postal_codes=None, year: int = None):
+    """
+    Get demographics for a set of postal codes (all ZIP codes if None) in a single lookup.
+    Returns a dict keyed by postal code of [{"year", "population"}, ...] ordered by year.
+    """
+    if postal_codes is not None:
+        postal_codes = list(set(postal_codes))
+        if not postal_codes:
+            return {}
+
+    return repository_for(db).demographics(postal_codes, year)
+
+def build_zip_code_feature(zip_code, year: int = None, demographics: dict = None, geometries: dict = None):
+    """Build the GeoJSON feature for a ZIP code row from pre-fetched demographics and geometries"""
+    # Prepare properties
+    properties = {
+        "postal_code": zip_code.postal_code,
+        "lat": zip_code.lat,
+        "long": zip_code.long,
+    }
+    
+    # Add demographics if requested and available
+    if demographics and zip_code.postal_code in demographics:
+        if year:
+            # If specific year requested, return single year data
+            year_demographics = demographics[zip_code.postal_code][0]
+            properties["population"] = year_demographics["population"]
+            properties["year"] = year_demographics["year"]
+        else:
+            # If no year specified, return all years
+            properties["demographics"] = demographics[zip_code.postal_code]
+    
+    # Create feature
+    feature = {
+        "type": "Feature",
+        "properties": properties,
+    }
+    
+    # Add geometry if requested
+    if geometries and zip_code.postal_code in geometries:
+        feature["geometry"] = geometries[zip_code.postal_code]
+    
+    return feature
+
+def build_plan_feature(plan, zip_codes: dict, geometries: dict = None, populations: dict = None, main_station: str = None):
+    """
+    Build the GeoJSON feature for a jurisdiction plan from pre-fetched ZIP data.
+    If main_station is given, the feature is flagged with is_main_station.
+    """
+    properties = {
+        "postal_code": plan.postal_code,
+        "delivery_station": plan.delivery_station,
+        "program_type": plan.program_type,
+        "effective_week": plan.effective_week,
+        "plan_identifier": plan.plan_identifier,
+        "dw_update_datetime": plan.dw_update_datetime
+    }
+    if main_station is not None:
+        properties["is_main_station"] = main_station.lower() in plan.delivery_station.lower()
+    
+    # Add zip code data if available
+    if plan.postal_code in zip_codes:
+        zip_code = zip_codes[plan.postal_code]
+        properties.update({
+            "lat": zip_code.lat,
+            "long": zip_code.long
+        })
+    
+    # Add population data if requested and available
+    if populations and plan.postal_code in populations:
+        properties["demographics"] = populations[plan.postal_code]
+
+    feature = {
+        "type": "Feature",
+        "properties": properties
+    }
+
+    # Add geometry if requested and available
+    if geometries and plan.postal_code in geometries:
+        feature["geometry"] = geometries[plan.postal_code]
+
+    return feature
+
+def iter_zip_code_features(
+    db: Session,
+    postal_codes: list[str] = None,
+    year: int = None,
+    include_demographics: bool = False,
+    include_geometry: bool = True,
+    detail: GeometryDetail = FULL_DETAIL,
+    batch_size: int = None
+):
+    """
+    Yield GeoJSON features for ZIP codes with optional demographics and geometry.
+    With batch_size set, ZIP rows are read through a server-side cursor and geometry and
+    demographics are fetched per batch, so memory stays flat however many ZIPs match.
+    """
+    # Filter by postal codes if provided (geometry is fetched separately, per batch)
+    batches = repository_for(db).zip_code_attributes(postal_codes or None, batch_size)
+
+    for zip_codes in batches:
+        batch_postal_codes = [zip_code.postal_code for zip_code in zip_codes]
+
+        # Get all geometries in a single batched query if requested
+        geometries = {}
+        if include_geometry:
+            geometries = get_geometries(db, batch_postal_codes, detail)
+
+        # Get demographics for the whole set in a single query if requested
+        demographics = {}
+        if include_demographics:
+            demographics = get_demographics(
+                db,
+                batch_postal_codes if postal_codes or batch_size else None,
+                year
+            )
+        
+        for zip_code in zip_codes:
+            yield build_zip_code_feature(zip_code, year, demographics, geometries)
 
 def get_zip_codes(
     db: Session,
     postal_codes: list[str] = None,
     year: int = None,
     include_demographics: bool = False,
-    include_geometry: bool = True
+    include_geometry: bool = True,
+    debug: bool = False,
+    detail: GeometryDetail = FULL_DETAIL
 ):
     """
     Get ZIP code data with optional demographics and geometry.
     Returns data in GeoJSON format.
+
+    If debug=True (or API_DIAGNOSTICS is set), geometry validity checks for the
+    requested ZIP codes are run as one batched query and logged.
     """
     try:
-        # Base query for zip codes
-        query = db.query(models.ZipCode)
-        
-        # Filter by postal codes if provided
+        # Convert all postal codes to strings and strip any whitespace
         if postal_codes:
-            # Convert all postal codes to strings and strip any whitespace
             postal_codes = [str(code).strip() for code in postal_codes]
-            print(f"Searching for postal codes: {postal_codes}")  # Debug print
-            
-            # Debug: Check each postal code individually
-            for code in postal_codes:
-                result = db.query(models.ZipCode).filter(models.ZipCode.postal_code == code).first()
-                print(f"Individual query for {code}: {'Found' if result else 'Not found'}")
-            
-            # Apply the IN filter
-            query = query.filter(models.ZipCode.postal_code.in_(postal_codes))
-            
-            # Debug: Print the SQL query
-            print(f"SQL Query: {query}")
-        
-        # Get all matching zip codes
-        zip_codes = query.all()
-        print(f"Found {len(zip_codes)} matching ZIP codes")  # Debug print
-        
-        # Debug: Print raw data from database
-        for zc in zip_codes:
-            print(f"Processing ZIP: {zc.postal_code}")
-            print(f"  Lat: {zc.lat}")
-            print(f"  Long: {zc.long}")
-            print(f"  Has geometry: {zc.geometry is not None}")
-            
-            if zc.geometry is not None:
-                # Check if geometry is valid
-                valid_check = db.execute(
-                    text("SELECT ST_IsValid(geometry::geometry) FROM zip_codes WHERE postal_code = :postal_code"),
-                    {"postal_code": zc.postal_code}
-                ).scalar()
-                print(f"  Geometry is valid: {valid_check}")
-                
-                # Debug: Check raw geometry
-                raw_geom = db.execute(
-                    text("SELECT ST_AsText(geometry) FROM zip_codes WHERE postal_code = :postal_code"),
-                    {"postal_code": zc.postal_code}
-                ).scalar()
-                print(f"  Raw geometry type: {raw_geom[:50] if raw_geom else 'None'}...")
-        
+
+        # Run the validity probes only in diagnostics mode
+        if debug or diagnostics.diagnostics_enabled():
+            report = repository_for(db).check_geometries(postal_codes)
+            logger.info("Geometry diagnostics for /zip-codes/", extra={"diagnostics": report})
+
         # Create features list for GeoJSON
-        features = []
-        for zip_code in zip_codes:
-            try:
-                # Prepare properties
-                properties = {
-                    "postal_code": zip_code.postal_code,
-                    "lat": zip_code.lat,
-                    "long": zip_code.long,
-                }
-                
-                # Add demographics if requested
-                if include_demographics:
-                    if year:
-                        # If specific year requested, return single year data
-                        demographics = db.query(models.ZipDemographics).filter(
-                            models.ZipDemographics.postal_code == zip_code.postal_code,
-                            models.ZipDemographics.year == year
-                        ).first()
-                        
-                        if demographics:
-                            properties["population"] = demographics.population
-                            properties["year"] = demographics.year
-                            print(f"  Added demographics for {zip_code.postal_code}: pop={demographics.population}")
-                    else:
-                        # If no year specified, return all years
-                        demographics_all = db.query(models.ZipDemographics).filter(
-                            models.ZipDemographics.postal_code == zip_code.postal_code
-                        ).order_by(models.ZipDemographics.year).all()
-                        
-                        if demographics_all:
-                            properties["demographics"] = [
-                                {"year": d.year, "population": d.population}
-                                for d in demographics_all
-                            ]
-                            print(f"  Added demographics for {zip_code.postal_code} for {len(demographics_all)} years")
-                
-                # Create feature
-                feature = {
-                    "type": "Feature",
-                    "properties": properties,
-                }
-                
-                # Add geometry if requested
-                if include_geometry and zip_code.geometry is not None:
-                    try:
-                        # Get geometry directly as GeoJSON
-                        result = db.execute(
-                            text("""
-                                SELECT ST_AsGeoJSON(geometry)
-                                FROM zip_codes 
-                                WHERE postal_code = :postal_code
-                            """),
-                            {"postal_code": zip_code.postal_code}
-                        ).scalar()
-                        
-                        if result:
-                            feature["geometry"] = json.loads(result)
-                            print(f"  Successfully added geometry for {zip_code.postal_code}")
-                        else:
-                            print(f"  No geometry found for ZIP {zip_code.postal_code}")
-                            feature["geometry"] = None
-                            
-                    except Exception as e:
-                        print(f"  Error converting geometry for ZIP {zip_code.postal_code}: {e}")
-                        feature["geometry"] = None
-                
-                features.append(feature)
-                print(f"Successfully processed ZIP {zip_code.postal_code}")
-            except Exception as e:
-                print(f"Error processing ZIP {zip_code.postal_code}: {e}")
-                continue
+        features = list(iter_zip_code_features(
+            db,
+            postal_codes=postal_codes,
+            year=year,
+            include_demographics=include_demographics,
+            include_geometry=include_geometry,
+            detail=detail
+        ))
         
-        print(f"Processed {len(features)} features")  # Debug print
+        logger.debug("Built /zip-codes/ response", extra={"requested": len(postal_codes or []), "features": len(features)})
         
         # Create and return FeatureCollection
         return {
             "type": "FeatureCollection",
             "features": features
         }
-    except Exception as e:
-        print(f"Error in get_zip_codes: {e}")
+    except Exception:
+        logger.exception("Error in get_zip_codes")
         raise
 
+def get_nearby_zip_codes(
+    db: Session,
+    lat: float,
+    lon: float,
+    radius: float = None,
+    limit: int = 10,
+    year: int = None,
+    include_demographics: bool = False,
+    include_geometry: bool = False,
+    detail: GeometryDetail = FULL_DETAIL
+):
+    """
+    Get the ZIP codes nearest to a point, optionally within `radius` meters, ordered by distance.
+    Returns data in GeoJSON format with distance_m on every feature.
+    """
+    rows = repository_for(db).nearby_zip_codes(lat, lon, radius, limit)
+    postal_codes = [row.postal_code for row in rows]
+
+    geometries = get_geometries(db, postal_codes, detail) if include_geometry else {}
+    demographics = get_demographics(db, postal_codes, year) if include_demographics else {}
+
+    features = []
+    for row in rows:
+        feature = build_zip_code_feature(row, year, demographics, geometries)
+        feature["properties"]["distance_m"] = round(row.distance_m, 1)
+        features.append(feature)
+
+    return {
+        "type": "FeatureCollection",
+        "features": features,
+        "metadata": {
+            "lat": lat,
+            "lon": lon,
+            "radius": radius,
+            "limit": limit,
+            "total_features": len(features)
+        }
+    }
+
+def get_locations(
+    db: Session,
+    points,
+    effective_week: str = None,
+    program_type: str = 'all'
+):
+    """
+    Resolve points (objects with lat, lon and an optional id) to their ZIP code and the
+    delivery stations serving it in the given week, from the in-memory plan index.
+    """
+    started = time.perf_counter()
+    index = plan_index.get_index(db)
+
+    # Get the minimum effective week if none provided
+    if not effective_week:
+        effective_week = index.default_week()
+
+    postal_codes = repository_for(db).locate_postal_codes([(point.lat, point.lon) for point in points])
+
+    # Many points fall in the same ZIP code, so each one is looked up in the plan index once
+    stations = {}
+    for postal_code in set(postal_codes):
+        if postal_code is not None:
+            stations[postal_code] = [
+                {
+                    "delivery_station": plan.delivery_station,
+                    "program_type": plan.program_type,
+                    "plan_identifier": plan.plan_identifier
+                }
+                for plan in index.plans_for_postal_codes(effective_week, program_type, [postal_code])
+            ]
+
+    results = []
+    for point, postal_code in zip(points, postal_codes):
+        results.append({
+            "id": point.id,
+            "lat": point.lat,
+            "lon": point.lon,
+            "postal_code": postal_code,
+            "delivery_stations": stations.get(postal_code, [])
+        })
+
+    duration = time.perf_counter() - started
+    metadata = {
+        "effective_week": effective_week,
+        "program_type": program_type,
+        "total_points": len(points),
+        "located_points": sum(1 for postal_code in postal_codes if postal_code is not None),
+        "assigned_points": sum(1 for result in results if result["delivery_stations"]),
+        "unique_postal_codes": len(stations),
+        "duration_ms": round(duration * 1000, 2),
+        "points_per_second": round(len(points) / duration, 1) if duration > 0 else None
+    }
+    logger.info("Located points", extra=metadata)
+    return {"results": results, "metadata": metadata}
+
 def get_available_years(db: Session):
-    """Get list of available years in demographics data"""
-    years = db.query(models.ZipDemographics.year)\
-        .distinct()\
-        .order_by(models.ZipDemographics.year)\
-        .all()
-    return [year[0] for year in years]
+    """Get list of available years in demographics data (from the precomputed year statistics)"""
+    return repository_for(db).available_years()
 
 def get_zip_code_stats(db: Session, year: int = None):
-    """Get comprehensive statistics about ZIP codes and demographics"""
+    """
+    Get comprehensive statistics about ZIP codes and demographics.
+    Served from the zip_code_stats / zip_demographics_year_stats tables built by init_db.
+    """
+    repository = repository_for(db)
+    summary = repository.zip_code_stats()
+    if summary is None:
+        raise ValueError("ZIP code statistics have not been computed; run `python init_db.py refresh-stats`")
+
     # Basic ZIP code stats
     stats = {
-        "total_zip_codes": db.query(func.count(models.ZipCode.postal_code)).scalar(),
+        "total_zip_codes": summary.total_zip_codes,
         "geographic_coverage": {
             "lat_range": {
-                "min": float(db.query(func.min(models.ZipCode.lat)).scalar()),
-                "max": float(db.query(func.max(models.ZipCode.lat)).scalar())
+                "min": summary.lat_min,
+                "max": summary.lat_max
             },
             "long_range": {
-                "min": float(db.query(func.min(models.ZipCode.long)).scalar()),
-                "max": float(db.query(func.max(models.ZipCode.long)).scalar())
+                "min": summary.long_min,
+                "max": summary.long_max
             }
         },
         "demographics_availability": {
-            "total_years_available": db.query(models.ZipDemographics.year).distinct().count(),
+            "total_years_available": summary.total_years_available,
             "year_range": {
-                "earliest": db.query(func.min(models.ZipDemographics.year)).scalar(),
-                "latest": db.query(func.max(models.ZipDemographics.year)).scalar()
+                "earliest": summary.earliest_year,
+                "latest": summary.latest_year
             }
         }
     }
     
     if year:
-        # Year-specific demographics stats
-        demographics_stats = db.query(
-            func.count(models.ZipDemographics.postal_code).label('count'),
-            func.avg(models.ZipDemographics.population).label('avg_population'),
-            func.min(models.ZipDemographics.population).label('min_population'),
-            func.max(models.ZipDemographics.population).label('max_population'),
-            func.stddev(models.ZipDemographics.population).label('stddev_population')
-        ).filter(models.ZipDemographics.year == year).first()
-        
-        # Population distribution stats
-        population_quartiles = db.query(
-            func.percentile_cont(0.25).within_group(
-                models.ZipDemographics.population.asc()
-            ).label('q1'),
-            func.percentile_cont(0.5).within_group(
-                models.ZipDemographics.population.asc()
-            ).label('median'),
-            func.percentile_cont(0.75).within_group(
-                models.ZipDemographics.population.asc()
-            ).label('q3')
-        ).filter(models.ZipDemographics.year == year).first()
+        # Year-specific demographics stats (a year without data has no row)
+        year_stats = repository.year_stats(year) or models.ZipDemographicsYearStats(year=year, zip_codes_with_demographics=0)
         
         stats.update({
             "year_specific_stats": {
                 "year": year,
                 "coverage": {
-                    "zip_codes_with_demographics": demographics_stats.count,
-                    "coverage_percentage": round(demographics_stats.count / stats["total_zip_codes"] * 100, 2)
+                    "zip_codes_with_demographics": year_stats.zip_codes_with_demographics,
+                    "coverage_percentage": round(year_stats.zip_codes_with_demographics / stats["total_zip_codes"] * 100, 2)
                 },
                 "population_stats": {
-                    "total": int(demographics_stats.count * demographics_stats.avg_population),
-                    "average": round(float(demographics_stats.avg_population), 2) if demographics_stats.avg_population else None,
-                    "median": round(float(population_quartiles.median), 2) if population_quartiles.median else None,
-                    "std_deviation": round(float(demographics_stats.stddev_population), 2) if demographics_stats.stddev_population else None,
-                    "min": int(demographics_stats.min_population) if demographics_stats.min_population else None,
-                    "max": int(demographics_stats.max_population) if demographics_stats.max_population else None,
+                    "total": int(year_stats.zip_codes_with_demographics * year_stats.avg_population) if year_stats.avg_population else None,
+                    "average": round(float(year_stats.avg_population), 2) if year_stats.avg_population else None,
+                    "median": round(float(year_stats.median), 2) if year_stats.median else None,
+                    "std_deviation": round(float(year_stats.stddev_population), 2) if year_stats.stddev_population else None,
+                    "min": int(year_stats.min_population) if year_stats.min_population else None,
+                    "max": int(year_stats.max_population) if year_stats.max_population else None,
                     "quartiles": {
-                        "q1": round(float(population_quartiles.q1), 2) if population_quartiles.q1 else None,
-                        "q2": round(float(population_quartiles.median), 2) if population_quartiles.median else None,
-                        "q3": round(float(population_quartiles.q3), 2) if population_quartiles.q3 else None
+                        "q1": round(float(year_stats.q1), 2) if year_stats.q1 else None,
+                        "q2": round(float(year_stats.median), 2) if year_stats.median else None,
+                        "q3": round(float(year_stats.q3), 2) if year_stats.q3 else None
                     }
                 }
             }
@@ -227,201 +372,189 @@ def get_zip_code_stats(db: Session, year: int = None):
     
     return stats 
 
-def get_node_data(
-    db: Session,
+def get_station_edges(index, effective_week: str, program_type: str, stations):
+    """
+    Edges of the station overlap graph between the given stations.
+    Each edge carries the number of postal codes the two stations share.
+    """
+    graph = index.station_graph(effective_week, program_type)
+    return [
+        {"from": station, "to": neighbor, "shared_postal_codes": shared}
+        for station in sorted(stations)
+        for neighbor, shared in sorted(graph.get(station, {}).items())
+        if station < neighbor and neighbor in stations
+    ]
+
+def resolve_node_plans(
+    index: plan_index.PlanIndex,
     delivery_station: str,
     effective_week: str = None,
     program_type: str = 'all',
-    include_geometry: bool = True,
-    include_population: bool = False,
-    recursive: bool = False
+    recursive: bool = False,
+    depth: int = None,
+    component: bool = False
 ):
     """
-    Get node (delivery station) coverage data with optional geometry and population data.
-    Returns data in GeoJSON format.
+    Resolve the jurisdiction plans for a delivery station from the given plan index.
+    Returns (plans, metadata) where metadata describes the stations and postal codes covered.
     
-    If recursive=True, also returns data for all delivery stations that cover the same postal codes
-    as the main delivery station.
+    If recursive=True, also includes all delivery stations that cover the same postal codes
+    as the main delivery station. `depth` extends this to N hops over the station overlap graph,
+    and component=True includes the whole connected component.
     """
-    try:
-        print(f"Starting get_node_data for delivery_station={delivery_station}, recursive={recursive}")
-        
-        # Get the minimum effective week if none provided
-        if not effective_week:
-            effective_week = db.query(func.min(models.JurisdictionPlan.effective_week)).scalar()
-        
-        print(f"Using effective_week={effective_week}")
+    # A depth or component request implies recursive expansion; plain recursive is one hop
+    recursive = recursive or component or depth is not None
+    if component:
+        depth = None
+    elif depth is None:
+        depth = 1
 
-        # Base query for jurisdiction plans
-        query = db.query(models.JurisdictionPlan)
-        
-        # Check if specifically requesting Additional Zips
-        is_additional_zips = delivery_station.upper() == "ADDITIONAL-ZIPS" or delivery_station.lower() == "additional zips"
-        
-        # Filter by delivery station (including partial matches)
-        if not is_additional_zips:
-            query = query.filter(models.JurisdictionPlan.delivery_station.ilike(f'%{delivery_station}%'))
-            # Exclude all variations of Additional Zips
-            query = query.filter(~models.JurisdictionPlan.delivery_station.ilike("additional%zips"))
-            query = query.filter(models.JurisdictionPlan.delivery_station != "ADDITIONAL-ZIPS")
-        else:
-            # If specifically requesting Additional Zips, use exact match for either variation
-            query = query.filter(
-                (models.JurisdictionPlan.delivery_station == "ADDITIONAL-ZIPS") | 
-                (models.JurisdictionPlan.delivery_station == "Additional Zips")
-            )
-        
-        # Filter by effective week
-        query = query.filter(models.JurisdictionPlan.effective_week == effective_week)
-        
-        # Filter by program type if not 'all'
-        if program_type.lower() != 'all':
-            query = query.filter(models.JurisdictionPlan.program_type == program_type.lower())
+    # Get the minimum effective week if none provided
+    if not effective_week:
+        effective_week = index.default_week()
 
-        # Get all matching jurisdiction plans
-        plans = query.all()
-        print(f"Found {len(plans)} plans for delivery station {delivery_station}")
-        
-        # Get postal codes for the main delivery station
-        postal_codes = [plan.postal_code for plan in plans]
-        print(f"Main delivery station covers {len(postal_codes)} postal codes")
-        
-        # If recursive mode is enabled, find all delivery stations that cover these postal codes
-        all_delivery_stations = set([plan.delivery_station for plan in plans])
-        if recursive and postal_codes:
-            print(f"Recursive mode enabled. Finding all delivery stations covering the same postal codes...")
-            
-            # Query for all delivery stations that cover any of these postal codes
-            recursive_query = db.query(models.JurisdictionPlan.delivery_station)\
-                .filter(models.JurisdictionPlan.postal_code.in_(postal_codes))\
-                .filter(models.JurisdictionPlan.effective_week == effective_week)\
-                .filter(~models.JurisdictionPlan.delivery_station.ilike("additional%zips"))  # Exclude all variations of Additional Zips
-            
-            # Apply program type filter if specified
-            if program_type.lower() != 'all':
-                recursive_query = recursive_query.filter(models.JurisdictionPlan.program_type == program_type.lower())
-            
-            # Get unique delivery stations
-            recursive_stations = set([row[0] for row in recursive_query.distinct().all()])
-            
-            # Remove the main delivery station from the set
-            recursive_stations = recursive_stations - all_delivery_stations
-            
-            print(f"Found {len(recursive_stations)} additional delivery stations covering the same postal codes")
-            
-            # Get plans for these additional delivery stations
-            if recursive_stations:
-                additional_query = db.query(models.JurisdictionPlan)\
-                    .filter(models.JurisdictionPlan.delivery_station.in_(recursive_stations))\
-                    .filter(models.JurisdictionPlan.effective_week == effective_week)
-                
-                if program_type.lower() != 'all':
-                    additional_query = additional_query.filter(models.JurisdictionPlan.program_type == program_type.lower())
-                
-                additional_plans = additional_query.all()
-                print(f"Retrieved {len(additional_plans)} additional plans")
-                
-                # Add these plans to our main plans list
-                plans.extend(additional_plans)
-                
-                # Update the set of all delivery stations
-                all_delivery_stations.update(recursive_stations)
-            
-            print(f"Total plans after recursive search: {len(plans)}")
-            print(f"Total unique delivery stations: {len(all_delivery_stations)}")
+    # Check if specifically requesting Additional Zips
+    is_additional_zips = delivery_station.upper() == "ADDITIONAL-ZIPS" or delivery_station.lower() == "additional zips"
+    
+    # Find matching delivery stations (including partial matches)
+    if not is_additional_zips:
+        # Excludes all variations of Additional Zips
+        main_stations = index.match_stations(effective_week, program_type, delivery_station)
+    else:
+        # If specifically requesting Additional Zips, use exact match for either variation
+        main_stations = list(plan_index.ADDITIONAL_ZIPS_STATIONS)
+
+    # Get all matching jurisdiction plans
+    plans = index.plans_for_stations(effective_week, program_type, main_stations)
+    logger.debug("Loaded main station plans", extra={"effective_week": effective_week, "plans": len(plans)})
+    
+    # If recursive mode is enabled, walk the station overlap graph from the main stations
+    all_delivery_stations = set([plan.delivery_station for plan in plans])
+    station_hops = {station: 0 for station in all_delivery_stations}
+    if recursive and plans:
+        station_hops = index.expand_stations(effective_week, program_type, all_delivery_stations, depth)
+        recursive_stations = set(station_hops) - all_delivery_stations
         
-        # Get all postal codes from all plans
-        all_postal_codes = set([plan.postal_code for plan in plans])
-        print(f"Total unique postal codes: {len(all_postal_codes)}")
-        
-        # Create features list for GeoJSON
-        features = []
+        # Get plans for these additional delivery stations
+        if recursive_stations:
+            plans.extend(index.plans_for_stations(effective_week, program_type, recursive_stations))
+            all_delivery_stations.update(recursive_stations)
         
+        logger.debug("Expanded recursive stations", extra={"plans": len(plans), "delivery_stations": len(all_delivery_stations)})
+
+    # Create metadata
+    metadata = {
+        "delivery_station": delivery_station,
+        "effective_week": effective_week,
+        "program_type": program_type,
+        "recursive": recursive,
+        "depth": depth if recursive else 0,
+        "station_hops": station_hops,
+        "station_edges": get_station_edges(index, effective_week, program_type, all_delivery_stations) if recursive else [],
+        "total_postal_codes": len(set(plan.postal_code for plan in plans)),
+        "total_delivery_stations": len(all_delivery_stations),
+        "delivery_stations": list(all_delivery_stations)
+    }
+    return plans, metadata
+
+def get_node_plans(
+    db: Session,
+    delivery_station: str,
+    effective_week: str = None,
+    program_type: str = 'all',
+    recursive: bool = False,
+    depth: int = None,
+    component: bool = False
+):
+    """Resolve the jurisdiction plans for a delivery station from the in-memory plan index"""
+    return resolve_node_plans(
+        plan_index.get_index(db),
+        delivery_station,
+        effective_week=effective_week,
+        program_type=program_type,
+        recursive=recursive,
+        depth=depth,
+        component=component
+    )
+
+def iter_plan_features(
+    db: Session,
+    plans,
+    include_geometry: bool = True,
+    include_population: bool = False,
+    detail: GeometryDetail = FULL_DETAIL,
+    main_station: str = None,
+    batch_size: int = None
+):
+    """
+    Yield GeoJSON features for jurisdiction plans with optional geometry and population data.
+    ZIP attributes, geometry and demographics are fetched once per batch of plans (all plans
+    when batch_size is None). If main_station is given, features are flagged with is_main_station.
+    """
+    batches = itertools.batched(plans, batch_size) if batch_size else [plans]
+
+    for batch in batches:
+        postal_codes = set(plan.postal_code for plan in batch)
+
         # Get all zip codes data for the postal codes
-        zip_codes = {}
-        if all_postal_codes:
-            zip_codes_query = db.query(models.ZipCode).filter(
-                models.ZipCode.postal_code.in_(all_postal_codes)
-            )
-            zip_codes = {zc.postal_code: zc for zc in zip_codes_query.all()}
-            print(f"Retrieved ZIP code data for {len(zip_codes)} postal codes")
+        zip_codes = get_zip_code_attributes(db, postal_codes)
+
+        # Get all geometries in a single batched query if requested
+        geometries = {}
+        if include_geometry:
+            geometries = get_geometries(db, postal_codes, detail)
         
         # Get population data if requested
         populations = {}
-        if include_population and all_postal_codes:
-            pop_query = db.query(models.ZipDemographics).filter(
-                models.ZipDemographics.postal_code.in_(all_postal_codes)
-            ).order_by(models.ZipDemographics.year)
-            
-            for pop in pop_query.all():
-                if pop.postal_code not in populations:
-                    populations[pop.postal_code] = []
-                populations[pop.postal_code].append({
-                    "year": pop.year,
-                    "population": pop.population
-                })
-            
-            print(f"Retrieved population data for {len(populations)} postal codes")
+        if include_population:
+            populations = get_demographics(db, postal_codes)
 
         # Process each jurisdiction plan
-        for plan in plans:
-            properties = {
-                "postal_code": plan.postal_code,
-                "delivery_station": plan.delivery_station,
-                "program_type": plan.program_type,
-                "effective_week": plan.effective_week,
-                "plan_identifier": plan.plan_identifier,
-                "dw_update_datetime": plan.dw_update_datetime,
-                "is_main_station": plan.delivery_station in [ds for ds in all_delivery_stations if ds.lower().find(delivery_station.lower()) >= 0]
-            }
-            
-            # Add zip code data if available
-            if plan.postal_code in zip_codes:
-                zip_code = zip_codes[plan.postal_code]
-                properties.update({
-                    "lat": zip_code.lat,
-                    "long": zip_code.long
-                })
-            
-            # Add population data if requested and available
-            if include_population and plan.postal_code in populations:
-                properties["demographics"] = populations[plan.postal_code]
-
-            feature = {
-                "type": "Feature",
-                "properties": properties
-            }
-
-            # Add geometry if requested and available
-            if include_geometry and plan.postal_code in zip_codes:
-                zip_code = zip_codes[plan.postal_code]
-                if zip_code.geometry is not None:
-                    try:
-                        geojson_result = db.execute(
-                            text("SELECT ST_AsGeoJSON(geometry) FROM zip_codes WHERE postal_code = :postal_code"),
-                            {"postal_code": plan.postal_code}
-                        ).scalar()
-                        
-                        if geojson_result:
-                            feature["geometry"] = json.loads(geojson_result)
-                    except Exception as e:
-                        print(f"Error converting geometry for postal code {plan.postal_code}: {e}")
-                        feature["geometry"] = None
+        for plan in batch:
+            yield build_plan_feature(plan, zip_codes, geometries, populations, main_station)
 
-            features.append(feature)
+def get_node_data(
+    db: Session,
+    delivery_station: str,
+    effective_week: str = None,
+    program_type: str = 'all',
+    include_geometry: bool = True,
+    include_population: bool = False,
+    recursive: bool = False,
+    depth: int = None,
+    component: bool = False,
+    detail: GeometryDetail = FULL_DETAIL
+):
+    """
+    Get node (delivery station) coverage data with optional geometry and population data.
+    Returns data in GeoJSON format.
+    
+    If recursive=True, also returns data for all delivery stations that cover the same postal codes
+    as the main delivery station. `depth` extends this to N hops over the station overlap graph,
+    and component=True returns the whole connected component.
+    """
+    try:
+        plans, metadata = get_node_plans(
+            db,
+            delivery_station,
+            effective_week=effective_week,
+            program_type=program_type,
+            recursive=recursive,
+            depth=depth,
+            component=component
+        )
 
-        # Create metadata
-        metadata = {
-            "delivery_station": delivery_station,
-            "effective_week": effective_week,
-            "program_type": program_type,
-            "recursive": recursive,
-            "total_postal_codes": len(all_postal_codes),
-            "total_delivery_stations": len(all_delivery_stations),
-            "delivery_stations": list(all_delivery_stations)
-        }
+        # Create features list for GeoJSON
+        features = list(iter_plan_features(
+            db,
+            plans,
+            include_geometry=include_geometry,
+            include_population=include_population,
+            detail=detail,
+            main_station=delivery_station
+        ))
         
-        print(f"Returning {len(features)} features with {len(all_delivery_stations)} delivery stations")
+        logger.debug("Built /node/ response", extra={"features": len(features), "delivery_stations": metadata["total_delivery_stations"]})
 
         # Create and return FeatureCollection with metadata
         return {
@@ -429,147 +562,352 @@ def get_node_data(
             "features": features,
             "metadata": metadata
         }
-    except Exception as e:
-        print(f"Error in get_node_data: {e}")
+    except Exception:
+        logger.exception("Error in get_node_data")
         raise 
 
-def get_node_reverse_data(
+def get_node_batch_data(
     db: Session,
-    postal_codes: list[str],
+    delivery_stations: list[str],
     effective_week: str = None,
     program_type: str = 'all',
     include_geometry: bool = True,
-    include_population: bool = False
+    include_population: bool = False,
+    recursive: bool = False,
+    depth: int = None,
+    component: bool = False,
+    detail: GeometryDetail = FULL_DETAIL
 ):
     """
-    Get delivery station coverage data for given postal codes with optional geometry and population data.
-    Returns data in GeoJSON format.
+    Get coverage data for several delivery stations in one response.
+    Each station is resolved like /node/, then ZIP attributes, geometries and demographics are
+    looked up once for the union of their postal codes. Features carry no geometry of their own:
+    `geometries` and `demographics` are dictionaries keyed by postal code, so a ZIP shared by
+    several stations is serialized once.
     """
     try:
-        # Get the minimum effective week if none provided
+        index = plan_index.get_index(db)
         if not effective_week:
-            effective_week = db.query(func.min(models.JurisdictionPlan.effective_week)).scalar()
-
-        # Base query for jurisdiction plans
-        query = db.query(models.JurisdictionPlan)
-        
-        # Filter by postal codes
-        postal_codes = [str(code).strip() for code in postal_codes]
-        query = query.filter(models.JurisdictionPlan.postal_code.in_(postal_codes))
-        
-        # Filter by effective week
-        query = query.filter(models.JurisdictionPlan.effective_week == effective_week)
-        
-        # Filter by program type if not 'all'
-        if program_type.lower() != 'all':
-            query = query.filter(models.JurisdictionPlan.program_type == program_type.lower())
+            effective_week = index.default_week()
 
-        # Get all matching jurisdiction plans
-        plans = query.all()
-        
-        # Get all zip codes data for the postal codes
-        zip_codes = {}
-        if postal_codes:
-            zip_codes_query = db.query(models.ZipCode).filter(
-                models.ZipCode.postal_code.in_(postal_codes)
+        # Union of the stations' plans, remembering which requested stations each plan belongs to
+        requested_by = {}
+        main_plans = set()
+        stations = {}
+        for delivery_station in dict.fromkeys(delivery_stations):
+            plans, metadata = resolve_node_plans(
+                index,
+                delivery_station,
+                effective_week=effective_week,
+                program_type=program_type,
+                recursive=recursive,
+                depth=depth,
+                component=component
             )
-            zip_codes = {zc.postal_code: zc for zc in zip_codes_query.all()}
-        
-        # Get population data if requested
-        populations = {}
-        if include_population:
-            pop_query = db.query(models.ZipDemographics).filter(
-                models.ZipDemographics.postal_code.in_(postal_codes)
-            ).order_by(models.ZipDemographics.year)
-            
-            for pop in pop_query.all():
-                if pop.postal_code not in populations:
-                    populations[pop.postal_code] = []
-                populations[pop.postal_code].append({
-                    "year": pop.year,
-                    "population": pop.population
-                })
-
-        # Create features list for GeoJSON
-        features = []
-        
-        # Process each jurisdiction plan
-        for plan in plans:
-            properties = {
-                "postal_code": plan.postal_code,
-                "delivery_station": plan.delivery_station,
-                "program_type": plan.program_type,
-                "effective_week": plan.effective_week,
-                "plan_identifier": plan.plan_identifier,
-                "dw_update_datetime": plan.dw_update_datetime
-            }
-            
-            # Add zip code data if available
-            if plan.postal_code in zip_codes:
-                zip_code = zip_codes[plan.postal_code]
-                properties.update({
-                    "lat": zip_code.lat,
-                    "long": zip_code.long
-                })
-            
-            # Add population data if requested and available
-            if include_population and plan.postal_code in populations:
-                properties["demographics"] = populations[plan.postal_code]
-
-            feature = {
-                "type": "Feature",
-                "properties": properties
+            hops = metadata["station_hops"]
+            for plan in plans:
+                requested_by.setdefault(plan, []).append(delivery_station)
+                if hops.get(plan.delivery_station, 0) == 0:
+                    main_plans.add(plan)
+            stations[delivery_station] = {
+                key: value for key, value in metadata.items()
+                if key not in ("delivery_station", "effective_week", "program_type")
             }
 
-            # Add geometry if requested and available
-            if include_geometry and plan.postal_code in zip_codes:
-                zip_code = zip_codes[plan.postal_code]
-                if zip_code.geometry is not None:
-                    try:
-                        geojson_result = db.execute(
-                            text("SELECT ST_AsGeoJSON(geometry) FROM zip_codes WHERE postal_code = :postal_code"),
-                            {"postal_code": plan.postal_code}
-                        ).scalar()
-                        
-                        if geojson_result:
-                            feature["geometry"] = json.loads(geojson_result)
-                    except Exception as e:
-                        print(f"Error converting geometry for postal code {plan.postal_code}: {e}")
-                        feature["geometry"] = None
+        postal_codes = set(plan.postal_code for plan in requested_by)
+        zip_codes = get_zip_code_attributes(db, postal_codes)
+        geometries = get_geometries(db, postal_codes, detail) if include_geometry else {}
+        demographics = get_demographics(db, postal_codes) if include_population else {}
 
+        features = []
+        for plan, requested_stations in requested_by.items():
+            feature = build_plan_feature(plan, zip_codes)
+            feature["properties"]["is_main_station"] = plan in main_plans
+            feature["properties"]["requested_stations"] = requested_stations
+            # Unlocated feature; the geometry is geometries[postal_code]
+            feature["geometry"] = None
             features.append(feature)
 
-        # Create metadata
-        metadata = {
-            "postal_codes": postal_codes,
+        response = {
+            "type": "FeatureCollection",
+            "features": features,
+            "geometries": geometries,
+        }
+        if include_population:
+            response["demographics"] = demographics
+        response["metadata"] = {
             "effective_week": effective_week,
             "program_type": program_type,
             "total_features": len(features),
-            "unique_delivery_stations": len(set(plan.delivery_station for plan in plans))
+            "total_postal_codes": len(postal_codes),
+            "total_geometries": len(geometries),
+            "total_delivery_stations": len(set(plan.delivery_station for plan in requested_by)),
+            "stations": stations
         }
+        logger.debug("Built /nodes/batch response", extra={
+            "requested_stations": len(stations),
+            "features": len(features),
+            "postal_codes": len(postal_codes)
+        })
+        return response
+    except Exception:
+        logger.exception("Error in get_node_batch_data")
+        raise
+
+def node_reverse_metadata(postal_codes, effective_week: str, program_type: str, plans, features):
+    """Metadata of a /node-reverse/ response"""
+    return {
+        "postal_codes": postal_codes,
+        "effective_week": effective_week,
+        "program_type": program_type,
+        "total_features": len(features),
+        "unique_delivery_stations": len(set(plan.delivery_station for plan in plans))
+    }
+
+def get_node_reverse_data(
+    db: Session,
+    postal_codes: list[str],
+    effective_week: str = None,
+    program_type: str = 'all',
+    include_geometry: bool = True,
+    include_population: bool = False,
+    detail: GeometryDetail = FULL_DETAIL
+):
+    """
+    Get delivery station coverage data for given postal codes with optional geometry and population data.
+    Returns data in GeoJSON format.
+    """
+    try:
+        # Plans are served from the in-memory plan index
+        index = plan_index.get_index(db)
+
+        # Get the minimum effective week if none provided
+        if not effective_week:
+            effective_week = index.default_week()
+
+        # Get all jurisdiction plans for the postal codes
+        postal_codes = [str(code).strip() for code in postal_codes]
+        plans = index.plans_for_postal_codes(effective_week, program_type, postal_codes)
+
+        # Create features list for GeoJSON
+        features = list(iter_plan_features(
+            db,
+            plans,
+            include_geometry=include_geometry,
+            include_population=include_population,
+            detail=detail
+        ))
 
         # Create and return FeatureCollection with metadata
         return {
             "type": "FeatureCollection",
             "features": features,
-            "metadata": metadata
+            "metadata": node_reverse_metadata(postal_codes, effective_week, program_type, plans, features)
         }
-    except Exception as e:
-        print(f"Error in get_node_reverse_data: {e}")
+    except Exception:
+        logger.exception("Error in get_node_reverse_data")
         raise 
 
 def get_effective_weeks(db: Session):
     """
-    Retrieve all unique effective weeks from the jurisdiction_plans table.
+    Retrieve all unique effective weeks from the jurisdiction plan index.
     Returns them sorted in ascending order.
     """
-    # Query for unique effective weeks
-    result = db.query(models.JurisdictionPlan.effective_week)\
-        .distinct()\
-        .order_by(models.JurisdictionPlan.effective_week)\
-        .all()
-    
-    # Extract the effective week values from the result tuples
-    weeks = [row[0] for row in result]
-    
-    return weeks 
\ No newline at end of file
+    return list(plan_index.get_index(db).weeks)
+
+def search_stations(
+    db: Session,
+    query: str,
+    effective_week: str = None,
+    program_type: str = 'all',
+    limit: int = 10
+):
+    """
+    Autocomplete delivery station names of a week from the in-memory plan index, ranked
+    exact > prefix > substring, so clients can resolve one station before requesting /node/.
+    Raises ValueError for a week without plans.
+    """
+    started = time.perf_counter()
+    index = plan_index.get_index(db)
+    if not effective_week:
+        effective_week = index.default_week()
+    if effective_week not in index.weeks:
+        raise ValueError(f"No jurisdiction plans for effective week {effective_week}")
+
+    matches = index.search_stations(effective_week, program_type, query, limit)
+    return {
+        "query": query,
+        "effective_week": effective_week,
+        "program_type": program_type.lower(),
+        "stations": [match._asdict() for match in matches],
+        "metadata": {
+            "total_matches": len(matches),
+            "duration_ms": round((time.perf_counter() - started) * 1000, 3)
+        }
+    }
+
+def get_plan_diff(
+    db: Session,
+    week_a: str,
+    week_b: str,
+    program_type: str = 'all',
+    year: int = None
+):
+    """
+    Get the postal codes whose delivery stations changed between two effective weeks,
+    with the stations before and after and the population affected.
+    The comparison runs on the in-memory plan index and is cached there per week pair.
+    """
+    index = plan_index.get_index(db)
+    missing = [week for week in (week_a, week_b) if week not in index.weeks]
+    if missing:
+        raise ValueError(f"No jurisdiction plans for effective week {', '.join(missing)}")
+
+    diff = index.diff_weeks(week_a, week_b, program_type)
+
+    # Default to the latest year of demographics
+    if not year:
+        year = repository_for(db).latest_year()
+    demographics = get_demographics(db, [postal_code for postal_code, _, _ in diff], year) if diff else {}
+
+    changes = []
+    summary = {"added": 0, "removed": 0, "reassigned": 0}
+    affected_population = 0.0
+    for postal_code, before, after in diff:
+        change = "added" if not before else "removed" if not after else "reassigned"
+        summary[change] += 1
+        population = next(iter(demographics.get(postal_code, [])), {}).get("population")
+        affected_population += population or 0.0
+        changes.append({
+            "postal_code": postal_code,
+            "change": change,
+            "from_stations": list(before),
+            "to_stations": list(after),
+            "population": population
+        })
+
+    return {
+        "week_a": week_a,
+        "week_b": week_b,
+        "program_type": program_type,
+        "population_year": year,
+        "total_changed_postal_codes": len(changes),
+        "affected_population": affected_population,
+        "summary": summary,
+        "changes": changes
+    }
+
+def get_tile(
+    db: Session,
+    z: int,
+    x: int,
+    y: int,
+    effective_week: str = None,
+    program_type: str = 'all',
+    year: int = None
+):
+    """
+    Get a Mapbox Vector Tile of ZIP code polygons with delivery station and population attributes.
+    Tiles are generated with ST_AsMVT from the geometry tier matching the zoom level and cached
+    per (effective_week, program_type, year, z, x, y).
+    """
+    # Get the minimum effective week if none provided
+    if not effective_week:
+        effective_week = plan_index.get_index(db).default_week()
+
+    key = (effective_week, program_type.lower(), year, z, x, y)
+    tile = tile_cache.get(key)
+    if tile is not None:
+        return tile
+
+    repository = repository_for(db)
+
+    # Default to the latest year of demographics
+    if not year:
+        year = repository.latest_year()
+
+    tile = repository.tile(z, x, y, effective_week, program_type.lower(), year)
+    tile_cache.put(key, tile)
+    return tile
+
+def build_boundary_feature(row):
+    """GeoJSON feature for a station_boundaries row"""
+    return {
+        "type": "Feature",
+        "properties": {
+            "delivery_station": row.delivery_station,
+            "effective_week": row.effective_week,
+            "program_type": row.program_type,
+            "total_postal_codes": row.total_postal_codes,
+            "population": row.population,
+            "population_year": row.population_year,
+            "area_km2": round(row.area_km2, 3) if row.area_km2 is not None else None,
+            "perimeter_km": round(row.perimeter_km, 3) if row.perimeter_km is not None else None,
+            "computed_at": row.computed_at
+        },
+        "geometry": RawJSON(row.geometry.encode("utf-8")) if row.geometry else None
+    }
+
+def get_station_boundary(
+    db: Session,
+    delivery_station: str,
+    effective_week: str = None,
+    program_type: str = 'all',
+    detail: GeometryDetail = FULL_DETAIL
+):
+    """
+    Get the dissolved service area of a delivery station as an encoded GeoJSON feature.
+    Served from the station_boundaries table built at ingest and cached per
+    (effective_week, program_type, delivery_station, level). Returns None for unknown stations.
+    """
+    # Get the minimum effective week if none provided
+    if not effective_week:
+        effective_week = plan_index.get_index(db).default_week()
+
+    key = (effective_week, program_type.lower(), delivery_station, detail.cache_level)
+    data = boundary_cache.get(key)
+    if data is not None:
+        return data
+
+    rows = repository_for(db).station_boundaries(effective_week, program_type.lower(), detail, delivery_station)
+    if not rows:
+        return None
+
+    data = render_feature(build_boundary_feature(rows[0]))
+    boundary_cache.put(key, data)
+    return data
+
+def get_station_boundaries(
+    db: Session,
+    effective_week: str = None,
+    program_type: str = 'all',
+    detail: GeometryDetail = FULL_DETAIL
+):
+    """
+    Get the dissolved service areas of every delivery station in a week as an encoded
+    GeoJSON FeatureCollection, cached per (effective_week, program_type, level).
+    """
+    # Get the minimum effective week if none provided
+    if not effective_week:
+        effective_week = plan_index.get_index(db).default_week()
+
+    key = (effective_week, program_type.lower(), None, detail.cache_level)
+    data = boundary_cache.get(key)
+    if data is not None:
+        return data
+
+    rows = repository_for(db).station_boundaries(effective_week, program_type.lower(), detail)
+    features = [build_boundary_feature(row) for row in rows]
+
+    data = render_feature_collection({
+        "type": "FeatureCollection",
+        "features": features,
+        "metadata": {
+            "effective_week": effective_week,
+            "program_type": program_type,
+            "total_delivery_stations": len(features),
+            "total_postal_codes": sum(row.total_postal_codes for row in rows)
+        }
+    })
+    boundary_cache.put(key, data)
+    return data
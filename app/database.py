@@ -1,9 +1,9 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import QueuePool
 import os
 from dotenv import load_dotenv
+from .pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool, install_statement_timeout
 
 # Load environment variables
 load_dotenv()
@@ -11,25 +11,76 @@ load_dotenv()
 # Load DATABASE_URL from environment
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-# Create SQLAlchemy engine
-engine = create_engine(
-    DATABASE_URL,
-    poolclass=QueuePool,
-    pool_size=5,
-    max_overflow=10,
-    pool_timeout=30
-)
+# Data backend: "postgis" (default), or "geoparquet" to serve the files exported by
+# `init_db.py export-parquet` from memory without a database (see geoparquet.py)
+DATA_BACKEND = os.getenv("DATA_BACKEND", "postgis").lower()
+GEOPARQUET_BACKEND = DATA_BACKEND == "geoparquet"
+
+# Connection pool settings
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Recycle connections older than this many seconds (-1 disables)
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# Test connections with a lightweight ping on checkout
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+# Create SQLAlchemy engine (the GeoParquet backend runs without one when DATABASE_URL is unset)
+engine = None
+if DATABASE_URL or not GEOPARQUET_BACKEND:
+    engine = create_engine(
+        DATABASE_URL,
+        poolclass=InstrumentedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING
+    )
+    install_statement_timeout(engine)
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Optional async engine (asyncpg), used by the GeoJSON endpoints when DB_ASYNC is enabled
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "yes") and not GEOPARQUET_BACKEND
+
+# Defaults to DATABASE_URL with the asyncpg driver
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or (
+    make_url(DATABASE_URL).set(drivername="postgresql+asyncpg").render_as_string(hide_password=False)
+    if DATABASE_URL else None
+)
+
+async_engine = None
+AsyncSessionLocal = None
+if DB_ASYNC:
+    # Imported lazily: the asyncio extension needs greenlet, and the driver needs asyncpg
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        poolclass=InstrumentedAsyncQueuePool,
+        pool_size=int(os.getenv("ASYNC_POOL_SIZE", "20")),
+        max_overflow=int(os.getenv("ASYNC_MAX_OVERFLOW", "20")),
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING
+    )
+    install_statement_timeout(async_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
 # Create Base class
 Base = declarative_base()
 
-# Dependency to get DB session
+# Dependency to get DB session (or the GeoParquet repository, which crud accepts in its place)
 def get_db():
+    if GEOPARQUET_BACKEND:
+        from .geoparquet import get_repository
+        yield get_repository()
+        return
+
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
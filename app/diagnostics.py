@@ -0,0 +1,121 @@
+import contextvars
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+# Attributes present on every LogRecord; anything else was passed via `extra=`
+_RESERVED_RECORD_ATTRS = set(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "asctime"}
+
+# Per-request SQL statement counter (None when no request is being tracked)
+_query_count = contextvars.ContextVar("query_count", default=None)
+
+def diagnostics_enabled() -> bool:
+    """Check whether diagnostics mode is switched on for every request via API_DIAGNOSTICS"""
+    return os.getenv("API_DIAGNOSTICS", "false").lower() in ("1", "true", "yes")
+
+class StructuredFormatter(logging.Formatter):
+    """Format log records as single-line JSON, including any `extra=` fields"""
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+def configure_logging():
+    """
+    Configure the `app` logger from environment variables.
+    LOG_LEVEL sets the level (default INFO); LOG_FORMAT selects 'json' (default) or 'text'.
+    """
+    logger = logging.getLogger("app")
+    if getattr(logger, "_configured", False):
+        return logger
+
+    handler = logging.StreamHandler()
+    if os.getenv("LOG_FORMAT", "json").lower() == "text":
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    else:
+        handler.setFormatter(StructuredFormatter())
+
+    logger.addHandler(handler)
+    logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    logger.propagate = False
+    logger._configured = True
+    return logger
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    counter = _query_count.get()
+    if counter is not None:
+        counter["queries"] += 1
+
+def install_query_counter(engine):
+    """Count every SQL statement executed on the engine against the active tracker"""
+    if not event.contains(engine, "before_cursor_execute", _count_query):
+        event.listen(engine, "before_cursor_execute", _count_query)
+
+class QueryTracker:
+    """Result of track_queries(): statement count and elapsed time for a block"""
+
+    def __init__(self, counter):
+        self._counter = counter
+        self.started = time.perf_counter()
+        self.duration_ms = None
+
+    @property
+    def queries(self):
+        return self._counter["queries"]
+
+@contextmanager
+def track_queries():
+    """
+    Track the number of SQL statements executed within the block.
+    Requires install_query_counter() to have been called on the engine.
+    """
+    counter = {"queries": 0}
+    token = _query_count.set(counter)
+    tracker = QueryTracker(counter)
+    try:
+        yield tracker
+    finally:
+        tracker.duration_ms = round((time.perf_counter() - tracker.started) * 1000, 2)
+        _query_count.reset(token)
+
+def check_geometries(db: Session, postal_codes: list[str] = None):
+    """
+    Run geometry validity checks for the requested ZIP codes as one batched query.
+    Returns a summary with missing, invalid and empty-geometry postal codes.
+    """
+    query = """
+        SELECT postal_code,
+               geometry IS NOT NULL AS has_geometry,
+               ST_IsValid(geometry) AS is_valid,
+               GeometryType(geometry) AS geometry_type
+        FROM zip_codes
+    """
+    params = {}
+    if postal_codes:
+        query += " WHERE postal_code = ANY(:postal_codes)"
+        params["postal_codes"] = list(postal_codes)
+
+    rows = db.execute(text(query), params).all()
+    found = {row.postal_code for row in rows}
+
+    return {
+        "checked": len(rows),
+        "missing": sorted(set(postal_codes) - found) if postal_codes else [],
+        "without_geometry": sorted(row.postal_code for row in rows if not row.has_geometry),
+        "invalid_geometry": sorted(row.postal_code for row in rows if row.has_geometry and not row.is_valid),
+        "geometry_types": sorted({row.geometry_type for row in rows if row.geometry_type}),
+    }
@@ -0,0 +1,98 @@
+import os
+import threading
+from collections import OrderedDict
+
+class ByteLRUCache:
+    """
+    Thread-safe LRU cache of pre-serialized bytes with a total byte budget.
+    Least recently used entries are evicted once the stored values exceed max_bytes.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return the cached bytes for key (marking it most recently used), or None"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def get_many(self, keys):
+        """Return {key: bytes} for the keys that are cached"""
+        found = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                found[key] = value
+        return found
+
+    def put(self, key, value: bytes):
+        """Store bytes under key; values larger than the whole budget are not cached"""
+        size = len(value)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= len(previous)
+
+            self._entries[key] = value
+            self.current_bytes += size
+
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= len(evicted)
+                self.evictions += 1
+
+    def invalidate(self, predicate):
+        """Drop the entries whose key matches predicate(key); returns how many were dropped"""
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                self.current_bytes -= len(self._entries.pop(key))
+            return len(keys)
+
+    def clear(self):
+        """Drop all entries (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        """Hit/miss counters and memory usage"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "current_bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None
+            }
+
+# Shared cache of GeoJSON geometry bytes keyed by (postal_code, level)
+geometry_cache = ByteLRUCache(int(os.getenv("GEOMETRY_CACHE_MAX_BYTES", str(256 * 1024 * 1024))))
+
+# Shared cache of Mapbox Vector Tiles keyed by (effective_week, program_type, year, z, x, y)
+tile_cache = ByteLRUCache(int(os.getenv("TILE_CACHE_MAX_BYTES", str(64 * 1024 * 1024))))
+
+# Shared cache of encoded station boundary responses keyed by
+# (effective_week, program_type, delivery_station or None for every station, level)
+boundary_cache = ByteLRUCache(int(os.getenv("BOUNDARY_CACHE_MAX_BYTES", str(64 * 1024 * 1024))))
+
+# Shared cache of encoded JSON responses for endpoints whose data only changes at ingest
+response_cache = ByteLRUCache(int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(8 * 1024 * 1024))))
@@ -0,0 +1,356 @@
+import logging
+import math
+import os
+import threading
+import time
+from pathlib import Path
+from typing import NamedTuple, Optional
+import mapbox_vector_tile
+import numpy as np
+import pandas as pd
+import shapely
+from mapbox_vector_tile.encoder import on_invalid_geometry_make_valid
+from . import plan_index
+from .lod import FULL_DETAIL, GeometryDetail, resolve_detail
+from .repository import Repository, cache_geometry_rows, get_cached_geometries, group_demographics
+
+logger = logging.getLogger(__name__)
+
+# Directory holding the files written by `python init_db.py export-parquet`
+GEOPARQUET_DIR = os.getenv("GEOPARQUET_DIR", "data/geoparquet")
+
+# Mean Earth radius in meters, for haversine distances
+EARTH_RADIUS_M = 6371008.8
+
+# Web Mercator (EPSG:3857) sphere radius, and the latitude where the projection is cut off
+WEB_MERCATOR_RADIUS_M = 6378137.0
+WEB_MERCATOR_MAX_LAT = 85.0511287798066
+
+# Tile extent and clipping buffer in tile units, like ST_AsMVTGeom(..., 4096, 64, true)
+TILE_EXTENT = 4096
+TILE_BUFFER = 64
+
+def read_table(directory, table, columns=None):
+    """Read `<directory>/<table>.parquet` into a DataFrame (None if the file does not exist)"""
+    path = Path(directory) / f"{table}.parquet"
+    if not path.exists():
+        return None
+    return pd.read_parquet(path, columns=columns)
+
+def records(frame):
+    """Rows of a DataFrame as named tuples of plain Python values (None for nulls)"""
+    frame = frame.astype(object).where(frame.notna(), None)
+    for row in frame.itertuples(index=False):
+        yield row._make(value.to_pydatetime() if isinstance(value, pd.Timestamp) else value for value in row)
+
+def to_geojson(geometry, precision: int) -> str:
+    """GeoJSON for a shapely geometry with coordinates rounded to `precision` decimal digits"""
+    return shapely.to_geojson(shapely.transform(geometry, lambda coordinates: np.round(coordinates, precision)))
+
+def haversine_m(lat, lon, lats, lons):
+    """Great-circle distances in meters from one point to arrays of points"""
+    lat, lon, lats, lons = map(np.radians, (lat, lon, lats, lons))
+    a = np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+def tile_bounds(z: int, x: int, y: int):
+    """(minx, miny, maxx, maxy) of a tile in Web Mercator meters, like ST_TileEnvelope"""
+    half_width = math.pi * WEB_MERCATOR_RADIUS_M
+    size = 2 * half_width / 2 ** z
+    minx = -half_width + x * size
+    maxy = half_width - y * size
+    return minx, maxy - size, minx + size, maxy
+
+def to_web_mercator(coordinates):
+    """Project an (n, 2) array of lon/lat coordinates to Web Mercator meters"""
+    lon = np.radians(coordinates[:, 0])
+    lat = np.radians(np.clip(coordinates[:, 1], -WEB_MERCATOR_MAX_LAT, WEB_MERCATOR_MAX_LAT))
+    return np.column_stack((lon, np.log(np.tan(np.pi / 4 + lat / 2)))) * WEB_MERCATOR_RADIUS_M
+
+def from_web_mercator(x, y):
+    """Lon/lat of a point in Web Mercator meters"""
+    lon = math.degrees(x / WEB_MERCATOR_RADIUS_M)
+    lat = math.degrees(2 * math.atan(math.exp(y / WEB_MERCATOR_RADIUS_M)) - math.pi / 2)
+    return lon, lat
+
+class ZipCodeRow(NamedTuple):
+    """postal_code/lat/long row, attribute-compatible with the database rows"""
+    postal_code: str
+    lat: Optional[float]
+    long: Optional[float]
+
+class NearbyRow(NamedTuple):
+    """ZipCodeRow with the distance to the searched point"""
+    postal_code: str
+    lat: Optional[float]
+    long: Optional[float]
+    distance_m: float
+
+class BoundaryRow(NamedTuple):
+    """station_boundaries row with the geometry as GeoJSON, like station_boundaries_query()"""
+    effective_week: str
+    program_type: str
+    delivery_station: str
+    total_postal_codes: int
+    population: Optional[float]
+    population_year: Optional[int]
+    area_km2: Optional[float]
+    perimeter_km: Optional[float]
+    computed_at: Optional[object]
+    geometry: Optional[str]
+
+class GeoParquetRepository(Repository):
+    """
+    Read-only repository serving GeoParquet/Parquet files exported by init_db.py from memory.
+    ZIP attributes and demographics are held column-wise; point lookups use a shapely STRtree
+    over the full-resolution ZIP polygons. Simplified geometry tiers are read on first use.
+    """
+
+    def __init__(self, directory: str = GEOPARQUET_DIR):
+        started = time.perf_counter()
+        self.directory = directory
+
+        zip_codes = read_table(directory, "zip_codes", ["postal_code", "lat", "long", "geometry"])
+        if zip_codes is None:
+            raise FileNotFoundError(f"No zip_codes.parquet in {directory}; run `python init_db.py export-parquet`")
+        zip_codes = zip_codes.sort_values("postal_code", ignore_index=True)
+        self._postal_codes = zip_codes["postal_code"].to_numpy(dtype=object)
+        self._positions = {postal_code: position for position, postal_code in enumerate(self._postal_codes)}
+        self._lat = zip_codes["lat"].to_numpy(dtype=float)
+        self._long = zip_codes["long"].to_numpy(dtype=float)
+        self._rows = [ZipCodeRow(*row) for row in records(zip_codes[["postal_code", "lat", "long"]])]
+        self._geometries = {"geometry": shapely.from_wkb(zip_codes["geometry"].to_numpy())}
+        self._geometries_lock = threading.Lock()
+        self._tree = shapely.STRtree(self._geometries["geometry"])
+
+        # Sorted by year like demographics_query(); a stable sort keeps postal codes in order
+        demographics = read_table(directory, "zip_demographics")
+        if demographics is None:
+            demographics = pd.DataFrame(columns=["postal_code", "year", "population"])
+        self._demographics = demographics.sort_values("year", kind="stable", ignore_index=True)
+
+        self._zip_code_stats = read_table(directory, "zip_code_stats")
+        self._year_stats = read_table(directory, "zip_demographics_year_stats")
+        self._boundaries = read_table(directory, "station_boundaries", [
+            "effective_week", "program_type", "delivery_station", "total_postal_codes",
+            "population", "population_year", "area_km2", "perimeter_km", "computed_at"
+        ])
+        self._boundary_geometries = {}
+
+        logger.info("Loaded GeoParquet data", extra={
+            "directory": directory,
+            "zip_codes": len(self._postal_codes),
+            "demographics": len(self._demographics),
+            "duration_ms": round((time.perf_counter() - started) * 1000, 2)
+        })
+
+    def _tier(self, column: str):
+        """Geometry array of a tier of zip_codes, read from the file on first use"""
+        geometries = self._geometries.get(column)
+        if geometries is None:
+            with self._geometries_lock:
+                geometries = self._geometries.get(column)
+                if geometries is None:
+                    table = read_table(self.directory, "zip_codes", ["postal_code", column])
+                    table = table.sort_values("postal_code", ignore_index=True)
+                    geometries = self._geometries[column] = shapely.from_wkb(table[column].to_numpy())
+        return geometries
+
+    def zip_code_attributes(self, postal_codes=None, batch_size: int = None):
+        if postal_codes is None:
+            positions = range(len(self._postal_codes))
+        else:
+            positions = [self._positions[code] for code in postal_codes if code in self._positions]
+
+        rows = [self._rows[position] for position in positions]
+        if not batch_size:
+            return [rows]
+        return (rows[start:start + batch_size] for start in range(0, len(rows), batch_size))
+
+    def geometries(self, postal_codes, detail: GeometryDetail = FULL_DETAIL):
+        geometries, missing = get_cached_geometries(postal_codes, detail)
+        if missing:
+            tier = self._tier(detail.column)
+            rows = []
+            for postal_code in missing:
+                position = self._positions.get(postal_code)
+                if position is not None and tier[position] is not None:
+                    rows.append((postal_code, to_geojson(tier[position], detail.precision)))
+            cache_geometry_rows(rows, geometries, detail)
+        return geometries
+
+    def demographics(self, postal_codes=None, year: int = None):
+        rows = self._demographics
+        if postal_codes is not None:
+            rows = rows[rows["postal_code"].isin(list(postal_codes))]
+        if year:
+            rows = rows[rows["year"] == year]
+        return group_demographics(rows.itertuples(index=False))
+
+    def plan_rows(self, weeks=None):
+        # Re-read on every (re)load, so replacing the file and calling POST /plans/reload picks it up
+        plans = read_table(self.directory, "jurisdiction_plans", [
+            "plan_identifier", "program_type", "postal_code",
+            "delivery_station", "effective_week", "dw_update_datetime"
+        ])
+        if plans is None:
+            return []
+        if weeks is not None:
+            plans = plans[plans["effective_week"].isin(list(weeks))]
+        # Timestamps as datetimes (None for missing), like the database rows
+        updated = plans["dw_update_datetime"].astype(object).where(plans["dw_update_datetime"].notna(), None)
+        updated = [value.to_pydatetime() if value is not None else None for value in updated]
+        return zip(
+            plans["plan_identifier"], plans["program_type"], plans["postal_code"],
+            plans["delivery_station"], plans["effective_week"], updated
+        )
+
+    def nearby_zip_codes(self, lat: float, lon: float, radius: float = None, limit: int = 10):
+        # Exact distances to every centroid are cheap at ZIP code scale, so no candidate pass is needed
+        distances = haversine_m(lat, lon, self._lat, self._long)
+        candidates = np.flatnonzero(~np.isnan(distances))
+        if radius is not None:
+            candidates = candidates[distances[candidates] <= radius]
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(distances[candidates], limit)[:limit]]
+        candidates = candidates[np.argsort(distances[candidates], kind="stable")]
+        return [NearbyRow(*self._rows[position], float(distances[position])) for position in candidates]
+
+    def locate_postal_codes(self, points):
+        postal_codes = [None] * len(points)
+        if not points:
+            return postal_codes
+
+        coordinates = np.array([(lon, lat) for lat, lon in points], dtype=float)
+        point_indexes, zip_indexes = self._tree.query(shapely.points(coordinates), predicate="intersects")
+        # Points on a shared boundary resolve to the lowest postal code, like the PostGIS query
+        for point_index, zip_index in zip(point_indexes, zip_indexes):
+            postal_code = self._postal_codes[zip_index]
+            current = postal_codes[point_index]
+            if current is None or postal_code < current:
+                postal_codes[point_index] = postal_code
+        return postal_codes
+
+    def available_years(self):
+        if self._year_stats is None:
+            return []
+        return sorted(int(year) for year in self._year_stats["year"])
+
+    def latest_year(self):
+        years = self.available_years()
+        return years[-1] if years else None
+
+    def zip_code_stats(self):
+        if self._zip_code_stats is None or self._zip_code_stats.empty:
+            return None
+        return next(records(self._zip_code_stats))
+
+    def year_stats(self, year: int):
+        if self._year_stats is None:
+            return None
+        return next(records(self._year_stats[self._year_stats["year"] == year]), None)
+
+    def _boundary_tier(self, column: str):
+        geometries = self._boundary_geometries.get(column)
+        if geometries is None:
+            with self._geometries_lock:
+                geometries = self._boundary_geometries.get(column)
+                if geometries is None:
+                    table = read_table(self.directory, "station_boundaries", [column])
+                    geometries = self._boundary_geometries[column] = shapely.from_wkb(table[column].to_numpy())
+        return geometries
+
+    def station_boundaries(self, effective_week: str, program_type: str, detail: GeometryDetail, delivery_station: str = None):
+        if self._boundaries is None:
+            raise ValueError("Station boundaries were not exported; run `python init_db.py export-parquet`")
+
+        boundaries = self._boundaries
+        mask = (boundaries["effective_week"] == effective_week) & (boundaries["program_type"] == program_type)
+        if delivery_station is not None:
+            mask &= boundaries["delivery_station"] == delivery_station
+        positions = np.flatnonzero(mask.to_numpy())
+        positions = positions[np.argsort(boundaries["delivery_station"].to_numpy()[positions], kind="stable")]
+
+        tier = self._boundary_tier(detail.column)
+        rows = []
+        for position, row in zip(positions, records(boundaries.iloc[positions])):
+            geometry = tier[position]
+            rows.append(BoundaryRow(*row, geometry=to_geojson(geometry, detail.precision) if geometry is not None else None))
+        return rows
+
+    def tile(self, z: int, x: int, y: int, effective_week: str, program_type: str, year: int):
+        minx, miny, maxx, maxy = tile_bounds(z, x, y)
+        # Candidates intersect the tile on the full-resolution polygons, like `geometry && bounds`
+        west, south = from_web_mercator(minx, miny)
+        east, north = from_web_mercator(maxx, maxy)
+        positions = np.sort(self._tree.query(shapely.box(west, south, east, north)))
+
+        # Project to tile units, clip to the buffered tile and snap to the integer grid, like ST_AsMVTGeom
+        scale = TILE_EXTENT / (maxx - minx)
+        tier = self._tier(resolve_detail(zoom=z).column)
+        geometries = shapely.transform(tier[positions], lambda coordinates: (to_web_mercator(coordinates) - (minx, miny)) * scale)
+        geometries = shapely.clip_by_rect(geometries, -TILE_BUFFER, -TILE_BUFFER, TILE_EXTENT + TILE_BUFFER, TILE_EXTENT + TILE_BUFFER)
+        geometries = shapely.set_precision(geometries, 1.0)
+        keep = ~shapely.is_missing(geometries) & ~shapely.is_empty(geometries)
+        positions, geometries = positions[keep], geometries[keep]
+        if not len(positions):
+            return b""
+
+        postal_codes = self._postal_codes[positions]
+        stations = {}
+        for plan in plan_index.get_index(self).plans_for_postal_codes(effective_week, program_type, postal_codes):
+            stations.setdefault(plan.postal_code, set()).add(plan.delivery_station)
+        demographics = self._demographics
+        demographics = demographics[(demographics["year"] == year) & demographics["postal_code"].isin(list(postal_codes))]
+        # Missing ACS values are NaN; the attribute is left out like a NULL in ST_AsMVT
+        population = {
+            postal_code: value
+            for postal_code, value in zip(demographics["postal_code"].tolist(), demographics["population"].tolist())
+            if value == value
+        }
+
+        features = []
+        for postal_code, geometry in zip(postal_codes, geometries):
+            properties = {"postal_code": postal_code}
+            if postal_code in stations:
+                properties["delivery_station"] = ",".join(sorted(stations[postal_code]))
+            if postal_code in population:
+                properties["population"] = population[postal_code]
+            features.append({"geometry": geometry, "properties": properties})
+
+        return mapbox_vector_tile.encode({"name": "zip_codes", "features": features}, default_options={
+            "extents": TILE_EXTENT,
+            "on_invalid_geometry": on_invalid_geometry_make_valid
+        })
+
+    def check_geometries(self, postal_codes=None):
+        if postal_codes:
+            positions = [self._positions[code] for code in postal_codes if code in self._positions]
+        else:
+            positions = range(len(self._postal_codes))
+        geometries = self._geometries["geometry"][list(positions)]
+        has_geometry = ~shapely.is_missing(geometries)
+        is_valid = shapely.is_valid(geometries)
+        checked = self._postal_codes[list(positions)]
+
+        return {
+            "checked": len(checked),
+            "missing": sorted(set(postal_codes) - set(checked)) if postal_codes else [],
+            "without_geometry": sorted(checked[~has_geometry]),
+            "invalid_geometry": sorted(checked[has_geometry & ~is_valid]),
+            "geometry_types": sorted({
+                geometry.geom_type.upper() for geometry in geometries[has_geometry]
+            }),
+        }
+
+_repository = None
+_repository_lock = threading.Lock()
+
+def get_repository() -> GeoParquetRepository:
+    """Return the process-wide GeoParquet repository, loading the files on first use"""
+    global _repository
+    if _repository is None:
+        with _repository_lock:
+            if _repository is None:
+                _repository = GeoParquetRepository()
+    return _repository
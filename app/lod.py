@@ -0,0 +1,57 @@
+import math
+from typing import NamedTuple, Optional
+
+# Precomputed geometry tiers on zip_codes: (column, ST_SimplifyPreserveTopology tolerance in degrees).
+# The simplified columns are built by init_db.build_geometry_lods(); ordered finest to coarsest.
+GEOMETRY_TIERS = [
+    ("geometry", 0.0),
+    ("geometry_lod1", 0.0001),
+    ("geometry_lod2", 0.001),
+    ("geometry_lod3", 0.01),
+]
+
+# PostGIS ST_AsGeoJSON default number of decimal digits
+DEFAULT_PRECISION = 9
+
+class GeometryDetail(NamedTuple):
+    """Which precomputed geometry tier to serve and how many decimal digits to emit"""
+    column: str = "geometry"
+    precision: int = DEFAULT_PRECISION
+
+    @property
+    def cache_level(self) -> str:
+        """Geometry cache level key for this detail"""
+        return f"{self.column}:{self.precision}"
+
+FULL_DETAIL = GeometryDetail()
+
+def tolerance_for_zoom(zoom: int) -> float:
+    """Size of one pixel of a 256px web map tile at the given zoom, in degrees"""
+    return 360.0 / (256 * 2 ** zoom)
+
+def precision_for_zoom(zoom: int) -> int:
+    """Decimal digits needed to resolve one pixel at the given zoom (plus one guard digit)"""
+    return min(DEFAULT_PRECISION, max(1, math.ceil(-math.log10(tolerance_for_zoom(zoom))) + 1))
+
+def resolve_detail(
+    simplify_tolerance: Optional[float] = None,
+    zoom: Optional[int] = None,
+    precision: Optional[int] = None
+) -> GeometryDetail:
+    """
+    Pick the coarsest precomputed tier whose tolerance does not exceed the requested one.
+    An explicit simplify_tolerance wins over zoom; precision defaults from zoom when given.
+    """
+    if simplify_tolerance is None and zoom is not None:
+        simplify_tolerance = tolerance_for_zoom(zoom)
+
+    column = GEOMETRY_TIERS[0][0]
+    if simplify_tolerance is not None:
+        for tier_column, tier_tolerance in GEOMETRY_TIERS:
+            if tier_tolerance <= simplify_tolerance:
+                column = tier_column
+
+    if precision is None:
+        precision = precision_for_zoom(zoom) if zoom is not None else DEFAULT_PRECISION
+
+    return GeometryDetail(column, precision)
@@ -1,15 +1,56 @@
-from fastapi import FastAPI, Depends, Query
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from . import crud, models, schemas
-from .database import engine, get_db
+from typing import Any, Dict, List, Optional
+from . import async_crud, crud, diagnostics, plan_events, plan_index, schemas
+from .database import DB_ASYNC, async_engine, engine, get_db
+from .geometry_cache import boundary_cache, geometry_cache, response_cache, tile_cache
+from .lod import resolve_detail
+from .pool import pool_stats, statement_timeout
+from .responses import FeatureCollectionResponse, dumps, stream_feature_collection, stream_ndjson
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from contextlib import asynccontextmanager
+import hashlib
+import logging
+
+# Configure structured logging and per-request query counting
+logger = diagnostics.configure_logging()
+if engine is not None:
+    diagnostics.install_query_counter(engine)
+if async_engine is not None:
+    diagnostics.install_query_counter(async_engine.sync_engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Load the jurisdiction plan index at startup (falls back to loading on first use)
+    and listen for plan change notifications from incremental ingests.
+    """
+    db_dependency = get_db()
+    try:
+        plan_index.get_index(next(db_dependency))
+    except Exception:
+        logger.exception("Could not load jurisdiction plan index at startup")
+    finally:
+        db_dependency.close()
+
+    listener = None
+    if plan_events.listener_enabled():
+        listener = plan_events.PlanChangeListener()
+        listener.start()
+    yield
+    if listener is not None:
+        listener.stop()
+    if async_engine is not None:
+        await async_engine.dispose()
 
 # Create FastAPI app
 app = FastAPI(
     title="ZIP Code API",
     description="API for accessing ZIP code boundaries and demographics data",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -21,77 +62,223 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
+@app.middleware("http")
+async def log_request_diagnostics(request: Request, call_next):
+    """Log SQL statement count and duration per request (DEBUG level, or always in diagnostics mode)"""
+    with diagnostics.track_queries() as tracker:
+        response = await call_next(request)
+
+    if diagnostics.diagnostics_enabled() or logger.isEnabledFor(logging.DEBUG):
+        logger.info("Request completed", extra={
+            "path": request.url.path,
+            "status_code": response.status_code,
+            "query_count": tracker.queries,
+            "duration_ms": tracker.duration_ms
+        })
+        response.headers["X-Query-Count"] = str(tracker.queries)
+    return response
+
+def stream_features(iter_features, stream_format: str, metadata: dict = None):
+    """
+    Stream features produced by iter_features(db) as chunked GeoJSON or NDJSON.
+    The generator uses its own session, which stays open until the last chunk is sent.
+    """
+    def generate():
+        db_dependency = get_db()
+        try:
+            features = iter_features(next(db_dependency))
+            if stream_format == "ndjson":
+                yield from stream_ndjson(features)
+            else:
+                yield from stream_feature_collection(features, metadata)
+        finally:
+            db_dependency.close()
+
+    media_type = "application/x-ndjson" if stream_format == "ndjson" else "application/json"
+    return StreamingResponse(generate(), media_type=media_type)
+
+async def cached_json(request: Request, key, compute, *args):
+    """
+    Serve a JSON body from the in-process response cache with an ETag.
+    compute(*args) runs in the threadpool only on a cache miss; a matching If-None-Match gets a 304.
+    """
+    body = response_cache.get(key)
+    if body is None:
+        body = dumps(await run_in_threadpool(compute, *args))
+        response_cache.put(key, body)
+
+    etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in (tag.strip().removeprefix("W/") for tag in request.headers.get("if-none-match", "").split(",")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 @app.get("/")
 def read_root():
     return {"message": "Welcome to the ZIP Code API"}
 
-@app.get("/zip-codes/", response_model=schemas.GeoJSONResponse)
-def get_zip_codes(
+@app.get("/zip-codes/", response_model=schemas.GeoJSONResponse, dependencies=[Depends(statement_timeout("zip_codes", 30000))])
+async def get_zip_codes(
     postal_codes: Optional[str] = Query(None, description="Comma-separated list of postal codes (e.g., '98004,98005,98006')"),
     year: Optional[int] = None,
     include_demographics: bool = False,
     include_geometry: bool = True,
+    debug: bool = Query(False, description="Run and log geometry diagnostics for the requested ZIP codes"),
+    simplify_tolerance: Optional[float] = Query(None, ge=0, description="Simplification tolerance in degrees; the coarsest precomputed tier within it is served"),
+    zoom: Optional[int] = Query(None, ge=0, le=24, description="Web map zoom level used to pick the geometry tier and precision"),
+    precision: Optional[int] = Query(None, ge=0, le=15, description="Number of decimal digits in geometry coordinates"),
+    stream: Optional[str] = Query(None, pattern="^(json|ndjson)$", description="Stream features incrementally: 'json' for a chunked FeatureCollection, 'ndjson' for newline-delimited features"),
     db: Session = Depends(get_db)
 ):
     """
     Get ZIP code data with optional demographics and geometry.
     Returns data in GeoJSON format.
     """
-    # Debug: Print received parameters
-    print(f"Received request with parameters:")
-    print(f"  postal_codes: {postal_codes}")
-    print(f"  year: {year}")
-    print(f"  include_demographics: {include_demographics}")
-    print(f"  include_geometry: {include_geometry}")
-    
     # Parse comma-separated postal codes
     postal_codes_list = None
     if postal_codes:
         postal_codes_list = [code.strip() for code in postal_codes.split(',')]
-        # Debug: Print each postal code and its type
-        for code in postal_codes_list:
-            print(f"  Processing postal code: {code} (type: {type(code)})")
     
-    return crud.get_zip_codes(
-        db=db,
+    if stream:
+        return stream_features(
+            lambda stream_db: crud.iter_zip_code_features(
+                stream_db,
+                postal_codes=postal_codes_list,
+                year=year,
+                include_demographics=include_demographics,
+                include_geometry=include_geometry,
+                detail=resolve_detail(simplify_tolerance, zoom, precision),
+                batch_size=crud.STREAM_BATCH_SIZE
+            ),
+            stream
+        )
+    
+    params = dict(
         postal_codes=postal_codes_list,
         year=year,
         include_demographics=include_demographics,
-        include_geometry=include_geometry
+        include_geometry=include_geometry,
+        debug=debug,
+        detail=resolve_detail(simplify_tolerance, zoom, precision)
     )
+    if DB_ASYNC:
+        return FeatureCollectionResponse(await async_crud.get_zip_codes(**params))
+    return FeatureCollectionResponse(await run_in_threadpool(crud.get_zip_codes, db=db, **params))
 
-@app.get("/years/", response_model=List[int])
-def get_available_years(db: Session = Depends(get_db)):
+@app.get("/zip-codes/nearby", response_model=schemas.NearbyZipCodesResponse, dependencies=[Depends(statement_timeout("nearby", 5000))])
+async def get_nearby_zip_codes(
+    lat: float = Query(..., ge=-90, le=90, description="Latitude of the point to search around"),
+    lon: float = Query(..., ge=-180, le=180, description="Longitude of the point to search around"),
+    radius: Optional[float] = Query(None, gt=0, description="Only return ZIP codes whose centroid is within this many meters"),
+    limit: int = Query(10, ge=1, le=1000, description="Maximum number of ZIP codes to return (k nearest)"),
+    year: Optional[int] = None,
+    include_demographics: bool = False,
+    include_geometry: bool = True,
+    simplify_tolerance: Optional[float] = Query(None, ge=0, description="Simplification tolerance in degrees; the coarsest precomputed tier within it is served"),
+    zoom: Optional[int] = Query(None, ge=0, le=24, description="Web map zoom level used to pick the geometry tier and precision"),
+    precision: Optional[int] = Query(None, ge=0, le=15, description="Number of decimal digits in geometry coordinates"),
+    db: Session = Depends(get_db)
+):
+    """
+    Get the ZIP codes nearest to a point, ordered by distance from their centroid.
+    Returns data in GeoJSON format; every feature carries distance_m.
+    """
+    return FeatureCollectionResponse(await run_in_threadpool(
+        crud.get_nearby_zip_codes,
+        db=db,
+        lat=lat,
+        lon=lon,
+        radius=radius,
+        limit=limit,
+        year=year,
+        include_demographics=include_demographics,
+        include_geometry=include_geometry,
+        detail=resolve_detail(simplify_tolerance, zoom, precision)
+    ))
+
+@app.get("/years/", response_model=List[int], dependencies=[Depends(statement_timeout("years", 5000))])
+async def get_available_years(request: Request, db: Session = Depends(get_db)):
     """
     Get list of available years in demographics data
     """
-    return crud.get_available_years(db)
+    return await cached_json(request, ("years",), crud.get_available_years, db)
 
-@app.get("/effective-weeks/", response_model=List[str])
-def get_effective_weeks(db: Session = Depends(get_db)):
+@app.get("/effective-weeks/", response_model=List[str], dependencies=[Depends(statement_timeout("effective_weeks", 5000))])
+async def get_effective_weeks(request: Request, db: Session = Depends(get_db)):
     """
     Get list of unique effective weeks from jurisdiction plans
     """
-    return crud.get_effective_weeks(db)
+    index = plan_index.loaded_index() or await run_in_threadpool(plan_index.get_index, db)
+    # Keyed by the index version, so a reload never serves stale weeks
+    return await cached_json(request, ("effective-weeks", index.version), lambda: index.weeks)
 
-@app.get("/stats/")
-def get_stats(
+@app.get("/stations/search", response_model=schemas.StationSearchResponse, dependencies=[Depends(statement_timeout("station_search", 5000))])
+async def search_stations(
+    q: str = Query(..., min_length=1, max_length=50, description="Text to match against delivery station names (case-insensitive)"),
+    week: Optional[str] = Query(None, description="Week in YYYY-WW format (e.g., '2025-01'). If not provided, uses earliest available week."),
+    program_type: str = Query('all', description="Filter by program type: 'core', 'ssd', or 'all'"),
+    limit: int = Query(10, ge=1, le=50, description="Maximum number of stations to return"),
+    db: Session = Depends(get_db)
+):
+    """
+    Autocomplete delivery stations: stations of the week whose name contains `q`, ranked
+    exact match first, then prefix matches, then other substrings
+    """
+    # The first search of a week builds its StationSearchIndex, so it runs off the event loop
+    try:
+        return await run_in_threadpool(crud.search_stations, db, q, week, program_type, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.get("/diff", dependencies=[Depends(statement_timeout("diff", 5000))])
+async def get_plan_diff(
+    request: Request,
+    week_a: str = Query(..., description="Effective week to compare from (YYYY-WW)"),
+    week_b: str = Query(..., description="Effective week to compare to (YYYY-WW)"),
+    program_type: str = Query('all', description="Filter by program type: 'core', 'ssd', or 'all'"),
+    year: Optional[int] = Query(None, description="Demographics year for the affected population. If not provided, uses the latest year."),
+    db: Session = Depends(get_db)
+):
+    """
+    Get the postal codes whose delivery station changed between two effective weeks,
+    with the stations before and after and the affected population
+    """
+    index = plan_index.loaded_index() or await run_in_threadpool(plan_index.get_index, db)
+    # Keyed by the index version, so a reload never serves a stale diff
+    key = ("diff", index.version, week_a, week_b, program_type.lower(), year)
+    try:
+        return await cached_json(request, key, crud.get_plan_diff, db, week_a, week_b, program_type, year)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.get("/stats/", dependencies=[Depends(statement_timeout("stats", 15000))])
+async def get_stats(
+    request: Request,
     year: Optional[int] = None,
     db: Session = Depends(get_db)
 ):
     """
     Get basic statistics about ZIP codes and demographics
     """
-    return crud.get_zip_code_stats(db, year)
+    try:
+        return await cached_json(request, ("stats", year), crud.get_zip_code_stats, db, year)
+    except ValueError as e:
+        raise HTTPException(status_code=503, detail=str(e))
 
-@app.get("/node/", response_model=schemas.NodeResponse)
-def get_node(
+@app.get("/node/", response_model=schemas.NodeResponse, dependencies=[Depends(statement_timeout("node", 20000))])
+async def get_node(
     delivery_station: str = Query(..., description="Delivery station name to search for"),
     effective_week: Optional[str] = Query(None, description="Week in YYYY-WW format (e.g., '2025-01'). If not provided, uses earliest available week."),
     program_type: str = Query('all', description="Filter by program type: 'core', 'ssd', or 'all'"),
     geometry: bool = Query(True, description="Include geometry data in the response"),
     population: bool = Query(False, description="Include historical population data"),
     recursive: bool = Query(False, description="If true, includes all delivery stations that cover the same postal codes as the main station"),
+    depth: Optional[int] = Query(None, ge=1, description="Number of hops to expand over the station overlap graph (implies recursive; default 1)"),
+    component: bool = Query(False, description="If true, includes the whole connected component of stations sharing postal codes"),
+    simplify_tolerance: Optional[float] = Query(None, ge=0, description="Simplification tolerance in degrees; the coarsest precomputed tier within it is served"),
+    zoom: Optional[int] = Query(None, ge=0, le=24, description="Web map zoom level used to pick the geometry tier and precision"),
+    precision: Optional[int] = Query(None, ge=0, le=15, description="Number of decimal digits in geometry coordinates"),
+    stream: Optional[str] = Query(None, pattern="^(json|ndjson)$", description="Stream features incrementally: 'json' for a chunked FeatureCollection, 'ndjson' for newline-delimited features"),
     db: Session = Depends(get_db)
 ):
     """
@@ -99,25 +286,80 @@ def get_node(
     Returns data in GeoJSON format with additional metadata.
     
     If recursive=True, also returns data for all delivery stations that cover the same postal codes
-    as the main delivery station.
+    as the main delivery station. Use depth for multi-hop expansion or component=True for the
+    full connected component.
     """
-    return crud.get_node_data(
-        db=db,
+    if stream:
+        plans, metadata = await run_in_threadpool(
+            crud.get_node_plans,
+            db,
+            delivery_station,
+            effective_week=effective_week,
+            program_type=program_type,
+            recursive=recursive,
+            depth=depth,
+            component=component
+        )
+        return stream_features(
+            lambda stream_db: crud.iter_plan_features(
+                stream_db,
+                plans,
+                include_geometry=geometry,
+                include_population=population,
+                detail=resolve_detail(simplify_tolerance, zoom, precision),
+                main_station=delivery_station,
+                batch_size=crud.STREAM_BATCH_SIZE
+            ),
+            stream,
+            metadata
+        )
+    
+    params = dict(
         delivery_station=delivery_station,
         effective_week=effective_week,
         program_type=program_type,
         include_geometry=geometry,
         include_population=population,
-        recursive=recursive
+        recursive=recursive,
+        depth=depth,
+        component=component,
+        detail=resolve_detail(simplify_tolerance, zoom, precision)
     )
+    if DB_ASYNC:
+        return FeatureCollectionResponse(await async_crud.get_node_data(**params))
+    return FeatureCollectionResponse(await run_in_threadpool(crud.get_node_data, db=db, **params))
 
-@app.get("/node-reverse/", response_model=schemas.NodeResponse)
-def get_node_reverse(
+@app.post("/nodes/batch", response_model=schemas.NodeBatchResponse, dependencies=[Depends(statement_timeout("nodes_batch", 30000))])
+async def get_nodes_batch(request: schemas.NodeBatchRequest, db: Session = Depends(get_db)):
+    """
+    Get coverage for several delivery stations in one request. Plans, ZIP attributes, geometries
+    and demographics are looked up once for the union of the stations; features reference
+    the shared `geometries` (and `demographics`) dictionaries by postal code.
+    """
+    return FeatureCollectionResponse(await run_in_threadpool(
+        crud.get_node_batch_data,
+        db,
+        request.delivery_stations,
+        effective_week=request.effective_week,
+        program_type=request.program_type,
+        include_geometry=request.geometry,
+        include_population=request.population,
+        recursive=request.recursive,
+        depth=request.depth,
+        component=request.component,
+        detail=resolve_detail(request.simplify_tolerance, request.zoom, request.precision)
+    ))
+
+@app.get("/node-reverse/", response_model=schemas.NodeResponse, dependencies=[Depends(statement_timeout("node_reverse", 10000))])
+async def get_node_reverse(
     postal_codes: str = Query(..., description="Comma-separated list of postal codes (e.g., '98004,98005,98006')"),
     effective_week: Optional[str] = Query(None, description="Week in YYYY-WW format (e.g., '2025-01'). If not provided, uses earliest available week."),
     program_type: str = Query('all', description="Filter by program type: 'core', 'ssd', or 'all'"),
     geometry: bool = Query(True, description="Include geometry data in the response"),
     population: bool = Query(False, description="Include historical population data"),
+    simplify_tolerance: Optional[float] = Query(None, ge=0, description="Simplification tolerance in degrees; the coarsest precomputed tier within it is served"),
+    zoom: Optional[int] = Query(None, ge=0, le=24, description="Web map zoom level used to pick the geometry tier and precision"),
+    precision: Optional[int] = Query(None, ge=0, le=15, description="Number of decimal digits in geometry coordinates"),
     db: Session = Depends(get_db)
 ):
     """
@@ -127,11 +369,154 @@ def get_node_reverse(
     # Parse comma-separated postal codes
     postal_codes_list = [code.strip() for code in postal_codes.split(',')]
     
-    return crud.get_node_reverse_data(
-        db=db,
+    params = dict(
         postal_codes=postal_codes_list,
         effective_week=effective_week,
         program_type=program_type,
         include_geometry=geometry,
-        include_population=population
-    ) 
\ No newline at end of file
+        include_population=population,
+        detail=resolve_detail(simplify_tolerance, zoom, precision)
+    )
+    if DB_ASYNC:
+        return FeatureCollectionResponse(await async_crud.get_node_reverse_data(**params))
+    return FeatureCollectionResponse(await run_in_threadpool(crud.get_node_reverse_data, db=db, **params))
+
+@app.get("/node/{delivery_station}/boundary", response_model=Dict[str, Any], dependencies=[Depends(statement_timeout("boundary", 5000))])
+def get_station_boundary(
+    delivery_station: str,
+    effective_week: Optional[str] = Query(None, description="The effective week for the jurisdiction plans. If not provided, uses the minimum effective week."),
+    program_type: str = Query('all', description="Filter by program type ('ssd', 'core', or 'all')"),
+    simplify_tolerance: Optional[float] = Query(None, ge=0, description="Simplification tolerance in degrees; the coarsest precomputed tier within it is served"),
+    zoom: Optional[int] = Query(None, ge=0, le=24, description="Web map zoom level used to pick the geometry tier and precision"),
+    precision: Optional[int] = Query(None, ge=0, le=15, description="Number of decimal digits in geometry coordinates"),
+    db: Session = Depends(get_db)
+):
+    """
+    Get the dissolved service area of a delivery station as a single GeoJSON feature,
+    with its area, perimeter, postal code count and population total.
+    """
+    try:
+        feature = crud.get_station_boundary(
+            db,
+            delivery_station,
+            effective_week=effective_week,
+            program_type=program_type,
+            detail=resolve_detail(simplify_tolerance, zoom, precision)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if feature is None:
+        raise HTTPException(status_code=404, detail=f"No boundary for delivery station {delivery_station}")
+    return Response(content=feature, media_type="application/json")
+
+@app.get("/boundaries/", response_model=schemas.NodeResponse, dependencies=[Depends(statement_timeout("boundaries", 10000))])
+def get_station_boundaries(
+    effective_week: Optional[str] = Query(None, description="The effective week for the jurisdiction plans. If not provided, uses the minimum effective week."),
+    program_type: str = Query('all', description="Filter by program type ('ssd', 'core', or 'all')"),
+    simplify_tolerance: Optional[float] = Query(None, ge=0, description="Simplification tolerance in degrees; the coarsest precomputed tier within it is served"),
+    zoom: Optional[int] = Query(None, ge=0, le=24, description="Web map zoom level used to pick the geometry tier and precision"),
+    precision: Optional[int] = Query(None, ge=0, le=15, description="Number of decimal digits in geometry coordinates"),
+    db: Session = Depends(get_db)
+):
+    """
+    Get the dissolved service areas of every delivery station in a week (the station network map).
+    Returns data in GeoJSON format, one feature per station.
+    """
+    try:
+        content = crud.get_station_boundaries(
+            db,
+            effective_week=effective_week,
+            program_type=program_type,
+            detail=resolve_detail(simplify_tolerance, zoom, precision)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return Response(content=content, media_type="application/json")
+
+@app.post("/locate", response_model=schemas.LocateResponse, dependencies=[Depends(statement_timeout("locate", 30000))])
+async def locate(request: schemas.LocateRequest, db: Session = Depends(get_db)):
+    """
+    Resolve a batch of points to the ZIP code containing each one and the delivery
+    stations serving it in the given week. Results are returned in request order.
+    """
+    result = await run_in_threadpool(
+        crud.get_locations,
+        db=db,
+        points=request.points,
+        effective_week=request.effective_week,
+        program_type=request.program_type
+    )
+    return Response(content=dumps(result), media_type="application/json")
+
+@app.post("/plans/reload", response_model=schemas.PlanIndexStatus, dependencies=[Depends(statement_timeout("plans_reload", 120000))])
+def reload_plans(
+    effective_weeks: Optional[str] = Query(None, description="Comma-separated list of effective weeks to reload. If not provided, reloads all plans."),
+    db: Session = Depends(get_db)
+):
+    """
+    Reload the in-memory jurisdiction plan index from the database.
+    Call after init_db has loaded new plan data; the new snapshot is swapped in atomically.
+    Incremental ingests notify the API of the changed weeks, which are reloaded automatically.
+    """
+    if effective_weeks:
+        weeks = [week.strip() for week in effective_weeks.split(',')]
+        index = plan_events.apply_plan_changes(weeks)
+    else:
+        index = plan_events.reload_all(db)
+    return {
+        "version": index.version,
+        "loaded_at": index.loaded_at,
+        "total_plans": index.total_plans,
+        "effective_weeks": index.weeks
+    }
+
+@app.get("/cache/stats")
+def get_cache_stats():
+    """
+    Get hit/miss counters and memory usage of the in-process caches
+    """
+    return {
+        "geometry": geometry_cache.stats(),
+        "tiles": tile_cache.stats(),
+        "boundaries": boundary_cache.stats(),
+        "responses": response_cache.stats()
+    }
+
+@app.get("/pool/stats")
+def get_pool_stats():
+    """
+    Get occupancy, overflow and checkout wait metrics of the database connection pools
+    """
+    return {
+        "sync": pool_stats(engine) if engine is not None else None,
+        "async": pool_stats(async_engine.sync_engine) if async_engine is not None else None
+    }
+
+@app.get(
+    "/tiles/{z}/{x}/{y}.mvt",
+    response_class=Response,
+    responses={200: {"content": {"application/vnd.mapbox-vector-tile": {}}}},
+    dependencies=[Depends(statement_timeout("tiles", 5000))]
+)
+def get_tile(
+    z: int,
+    x: int,
+    y: int,
+    effective_week: Optional[str] = Query(None, description="Week in YYYY-WW format (e.g., '2025-01'). If not provided, uses earliest available week."),
+    program_type: str = Query('all', description="Filter by program type: 'core', 'ssd', or 'all'"),
+    year: Optional[int] = Query(None, description="Demographics year for the population attribute. If not provided, uses the latest year."),
+    db: Session = Depends(get_db)
+):
+    """
+    Get a Mapbox Vector Tile of ZIP code polygons in the `zip_codes` layer.
+    Each feature carries postal_code, delivery_station (comma-separated if several) and population.
+    """
+    if not 0 <= z <= 24 or not 0 <= x < 2 ** z or not 0 <= y < 2 ** z:
+        raise HTTPException(status_code=400, detail=f"Invalid tile coordinates {z}/{x}/{y}")
+
+    tile = crud.get_tile(db, z, x, y, effective_week, program_type, year)
+    return Response(
+        content=tile,
+        media_type="application/vnd.mapbox-vector-tile",
+        headers={"Cache-Control": "public, max-age=3600"}
+    )
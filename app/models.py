@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Index, MetaData, TIMESTAMP
+from sqlalchemy import BigInteger, Column, Integer, String, Float, Index, MetaData, TIMESTAMP
 from geoalchemy2 import Geometry
 from .database import Base
 
@@ -10,13 +10,20 @@ class ZipCode(Base):
     # Combine schema and index into a single __table_args__
     __table_args__ = (
         Index('idx_zip_codes_geometry', 'geometry', postgresql_using='gist'),
+        Index('idx_zip_codes_centroid', 'centroid', postgresql_using='gist'),
         {'schema': 'public'}
     )
     
     postal_code = Column(String, primary_key=True)
-    lat = Column(String)
-    long = Column(String)
+    lat = Column(Float)
+    long = Column(Float)
     geometry = Column(Geometry('MULTIPOLYGON', srid=4326))
+    # Census internal point (lat/long) for KNN proximity queries
+    centroid = Column(Geometry('POINT', srid=4326))
+    # Simplified level-of-detail tiers built by init_db (see lod.GEOMETRY_TIERS)
+    geometry_lod1 = Column(Geometry('MULTIPOLYGON', srid=4326))
+    geometry_lod2 = Column(Geometry('MULTIPOLYGON', srid=4326))
+    geometry_lod3 = Column(Geometry('MULTIPOLYGON', srid=4326))
 
 class ZipDemographics(Base):
     __tablename__ = "zip_demographics"
@@ -34,8 +41,12 @@ class ZipDemographics(Base):
 class JurisdictionPlan(Base):
     __tablename__ = "jurisdiction_plans"
     
+    # Station lookups filter on (week, program, station), reverse lookups on (week, postal codes)
     __table_args__ = (
-        {'schema': 'public'}
+        Index('idx_jurisdiction_plans_week_program_station', 'effective_week', 'program_type', 'delivery_station'),
+        Index('idx_jurisdiction_plans_week_postal_code', 'effective_week', 'postal_code'),
+        # One list partition per effective week, attached by init_db
+        {'schema': 'public', 'postgresql_partition_by': 'LIST (effective_week)'}
     )
     
     plan_identifier = Column(String(100), primary_key=True)
@@ -43,4 +54,64 @@ class JurisdictionPlan(Base):
     postal_code = Column(String(10), primary_key=True)
     delivery_station = Column(String(50))
     effective_week = Column(String(8), primary_key=True)
-    dw_update_datetime = Column(TIMESTAMP) 
\ No newline at end of file
+    dw_update_datetime = Column(TIMESTAMP)
+
+class ZipCodeStats(Base):
+    """Single-row summary of zip_codes and zip_demographics, precomputed by init_db"""
+    __tablename__ = "zip_code_stats"
+    
+    __table_args__ = (
+        {'schema': 'public'}
+    )
+    
+    total_zip_codes = Column(BigInteger, primary_key=True)
+    lat_min = Column(Float)
+    lat_max = Column(Float)
+    long_min = Column(Float)
+    long_max = Column(Float)
+    total_years_available = Column(BigInteger)
+    earliest_year = Column(BigInteger)
+    latest_year = Column(BigInteger)
+    computed_at = Column(TIMESTAMP)
+
+class ZipDemographicsYearStats(Base):
+    """Per-year population statistics, precomputed by init_db"""
+    __tablename__ = "zip_demographics_year_stats"
+    
+    __table_args__ = (
+        {'schema': 'public'}
+    )
+    
+    year = Column(BigInteger, primary_key=True)
+    zip_codes_with_demographics = Column(BigInteger)
+    avg_population = Column(Float)
+    min_population = Column(Float)
+    max_population = Column(Float)
+    stddev_population = Column(Float)
+    q1 = Column(Float)
+    median = Column(Float)
+    q3 = Column(Float)
+
+class StationBoundary(Base):
+    """Dissolved service area of a delivery station per (effective_week, program_type), precomputed by init_db"""
+    __tablename__ = "station_boundaries"
+    
+    __table_args__ = (
+        {'schema': 'public'}
+    )
+    
+    effective_week = Column(String(8), primary_key=True)
+    # 'ssd', 'core', or 'all' for the union over both program types
+    program_type = Column(String(10), primary_key=True)
+    delivery_station = Column(String(50), primary_key=True)
+    total_postal_codes = Column(BigInteger)
+    population = Column(Float)
+    population_year = Column(BigInteger)
+    area_km2 = Column(Float)
+    perimeter_km = Column(Float)
+    geometry = Column(Geometry('MULTIPOLYGON', srid=4326))
+    # Simplified level-of-detail tiers (see lod.GEOMETRY_TIERS)
+    geometry_lod1 = Column(Geometry('MULTIPOLYGON', srid=4326))
+    geometry_lod2 = Column(Geometry('MULTIPOLYGON', srid=4326))
+    geometry_lod3 = Column(Geometry('MULTIPOLYGON', srid=4326))
+    computed_at = Column(TIMESTAMP)
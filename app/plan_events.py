@@ -0,0 +1,156 @@
+import json
+import logging
+import os
+import select
+import threading
+from . import plan_index
+from .database import GEOPARQUET_BACKEND, engine, get_db
+from .geometry_cache import boundary_cache, geometry_cache, response_cache, tile_cache
+
+logger = logging.getLogger(__name__)
+
+# Postgres NOTIFY channel used by `init_db.py ingest-plans`; the payload is
+# {"effective_weeks": [...]} listing the weeks whose plans changed
+PLAN_CHANGES_CHANNEL = "jurisdiction_plans_changed"
+
+# NOTIFY channel used by init_db.py once the precomputed ZIP code statistics are rebuilt
+STATISTICS_CHANGES_CHANNEL = "zip_statistics_changed"
+
+# NOTIFY channel used by init_db.py once a new zip_codes table is swapped in or migrated
+ZIP_CODES_CHANGES_CHANNEL = "zip_codes_changed"
+
+# Channels the listener subscribes to
+CHANNELS = [PLAN_CHANGES_CHANNEL, STATISTICS_CHANGES_CHANNEL, ZIP_CODES_CHANGES_CHANNEL]
+
+# Delay before the listener reconnects after losing its connection, doubled after every failed
+# attempt up to the maximum
+LISTENER_RETRY_SECONDS = float(os.getenv("PLAN_CHANGE_LISTENER_RETRY_SECONDS", "1"))
+LISTENER_MAX_RETRY_SECONDS = float(os.getenv("PLAN_CHANGE_LISTENER_MAX_RETRY_SECONDS", "60"))
+
+def listener_enabled() -> bool:
+    """Check whether the API should listen for plan change notifications (PLAN_CHANGE_LISTENER)"""
+    # There is nothing to listen to without a database
+    if GEOPARQUET_BACKEND:
+        return False
+    return os.getenv("PLAN_CHANGE_LISTENER", "true").lower() in ("1", "true", "yes")
+
+def apply_plan_changes(effective_weeks):
+    """Reload the changed weeks into the plan index and drop their cached tiles and boundaries"""
+    effective_weeks = set(effective_weeks)
+    db_dependency = get_db()
+    try:
+        index = plan_index.reload_weeks(next(db_dependency), effective_weeks)
+    finally:
+        db_dependency.close()
+
+    # Tile cache keys start with the effective week
+    dropped = tile_cache.invalidate(lambda key: key[0] in effective_weeks)
+    # Boundary cache keys start with the effective week too
+    boundaries_dropped = boundary_cache.invalidate(lambda key: key[0] in effective_weeks)
+    logger.info("Applied jurisdiction plan changes", extra={
+        "effective_weeks": sorted(effective_weeks),
+        "version": index.version,
+        "tiles_dropped": dropped,
+        "boundaries_dropped": boundaries_dropped
+    })
+    return index
+
+def apply_statistics_changes():
+    """Drop cached /stats/ and /years/ responses after the statistics tables were rebuilt"""
+    response_cache.clear()
+    logger.info("Applied ZIP code statistics changes")
+
+def apply_zip_code_changes():
+    """Drop cached geometries and tiles after zip_codes was reloaded or migrated"""
+    geometry_cache.clear()
+    tile_cache.clear()
+    logger.info("Applied ZIP code changes")
+
+def reload_all(db):
+    """Reload every week into the plan index and drop every cache built from the database"""
+    index = plan_index.reload(db)
+    # Tiles carry delivery station attributes, so they must be regenerated; geometries are
+    # dropped too, so a full reload also picks up a reloaded zip_codes table
+    tile_cache.clear()
+    boundary_cache.clear()
+    geometry_cache.clear()
+    response_cache.clear()
+    return index
+
+class PlanChangeListener(threading.Thread):
+    """Background thread that LISTENs for plan and statistics change notifications and applies them"""
+
+    def __init__(self, poll_seconds: float = 5.0):
+        super().__init__(name="plan-change-listener", daemon=True)
+        self.poll_seconds = poll_seconds
+        self._stopped = threading.Event()
+        self._listening = False
+
+    def stop(self):
+        self._stopped.set()
+
+    def run(self):
+        # Reconnect with backoff until stopped, e.g. after a dropped connection or a Postgres restart
+        retry_seconds = LISTENER_RETRY_SECONDS
+        resync = False
+        while not self._stopped.is_set():
+            try:
+                self._listen(resync)
+            except Exception:
+                # Back off while the database stays unreachable, start over once it was listening again
+                if self._listening:
+                    retry_seconds = LISTENER_RETRY_SECONDS
+                logger.exception("Plan change listener failed, reconnecting", extra={"retry_in_seconds": retry_seconds})
+                self._stopped.wait(retry_seconds)
+                retry_seconds = min(retry_seconds * 2, LISTENER_MAX_RETRY_SECONDS)
+                resync = True
+
+    def _listen(self, resync: bool):
+        """LISTEN on a new connection and apply notifications until stopped; errors are raised"""
+        self._listening = False
+        # A dedicated connection, detached from the pool so it does not hold a pool slot
+        connection = engine.raw_connection()
+        connection.detach()
+        dbapi_connection = connection.dbapi_connection
+        try:
+            dbapi_connection.autocommit = True
+            with dbapi_connection.cursor() as cursor:
+                for channel in CHANNELS:
+                    cursor.execute(f"LISTEN {channel}")
+            logger.info("Listening for data changes", extra={"channels": CHANNELS})
+
+            if resync:
+                # Notifications sent while disconnected are lost, so everything is reloaded
+                self._reload_all()
+            self._listening = True
+
+            while not self._stopped.is_set():
+                if select.select([dbapi_connection], [], [], self.poll_seconds) == ([], [], []):
+                    continue
+                dbapi_connection.poll()
+                while dbapi_connection.notifies:
+                    notification = dbapi_connection.notifies.pop(0)
+                    if notification.channel == STATISTICS_CHANGES_CHANNEL:
+                        apply_statistics_changes()
+                    elif notification.channel == ZIP_CODES_CHANGES_CHANNEL:
+                        apply_zip_code_changes()
+                    else:
+                        self._handle(notification.payload)
+        finally:
+            connection.close()
+
+    def _reload_all(self):
+        db_dependency = get_db()
+        try:
+            index = reload_all(next(db_dependency))
+        finally:
+            db_dependency.close()
+        logger.info("Reloaded all data after reconnecting", extra={"version": index.version})
+
+    def _handle(self, payload):
+        try:
+            effective_weeks = json.loads(payload)["effective_weeks"]
+            if effective_weeks:
+                apply_plan_changes(effective_weeks)
+        except Exception:
+            logger.exception("Could not apply jurisdiction plan change", extra={"payload": payload})
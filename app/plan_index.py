@@ -0,0 +1,450 @@
+import bisect
+import itertools
+import logging
+import re
+import threading
+import time
+from array import array
+from datetime import datetime
+from typing import NamedTuple, Optional
+from sqlalchemy.orm import Session
+from .repository import repository_for
+
+logger = logging.getLogger(__name__)
+
+# Matches every spelling of the "Additional Zips" pseudo-station (same as ILIKE 'additional%zips')
+ADDITIONAL_ZIPS_PATTERN = re.compile(r"^additional.*zips$", re.IGNORECASE | re.DOTALL)
+
+ADDITIONAL_ZIPS_STATIONS = ("ADDITIONAL-ZIPS", "Additional Zips")
+
+def is_additional_zips(delivery_station: str) -> bool:
+    """Check whether a delivery station name is a variation of Additional Zips"""
+    return bool(ADDITIONAL_ZIPS_PATTERN.match(delivery_station))
+
+class Plan(NamedTuple):
+    """A single jurisdiction plan row, attribute-compatible with models.JurisdictionPlan"""
+    plan_identifier: str
+    program_type: str
+    postal_code: str
+    delivery_station: str
+    effective_week: str
+    dw_update_datetime: Optional[datetime]
+
+class _Partition:
+    """Plans for one (effective_week, program_type), stored column-wise and sorted by postal code id"""
+
+    __slots__ = ("effective_week", "program_type", "postal_codes", "stations",
+                 "identifiers", "updated", "station_rows")
+
+    def __init__(self, effective_week, program_type, rows):
+        self.effective_week = effective_week
+        self.program_type = program_type
+
+        rows.sort()
+        self.postal_codes = array("I", (row[0] for row in rows))
+        self.stations = array("I", (row[1] for row in rows))
+        self.identifiers = array("I", (row[2] for row in rows))
+        self.updated = array("I", (row[3] for row in rows))
+
+        station_rows = {}
+        for position, station_id in enumerate(self.stations):
+            station_rows.setdefault(station_id, array("I")).append(position)
+        self.station_rows = station_rows
+
+    def __len__(self):
+        return len(self.postal_codes)
+
+    def postal_code_rows(self, postal_code_id):
+        """Row positions for a postal code id, found by binary search"""
+        start = bisect.bisect_left(self.postal_codes, postal_code_id)
+        end = bisect.bisect_right(self.postal_codes, postal_code_id, start)
+        return range(start, end)
+
+class StationMatch(NamedTuple):
+    """A delivery station matching a search, with how it matched"""
+    delivery_station: str
+    # 'exact', 'prefix' or 'substring'
+    match: str
+    total_postal_codes: int
+    program_types: tuple
+
+class StationSearchIndex:
+    """
+    Autocomplete index over the distinct delivery stations of one week. Lowercased names are kept
+    sorted, so prefix matches are a contiguous range found by binary search; substring matches
+    intersect the postings of the query's trigrams and verify the candidates.
+    """
+
+    __slots__ = ("names", "keys", "postal_codes", "program_types", "trigrams")
+
+    def __init__(self, stations):
+        # stations: {name: (total_postal_codes, program_types)}
+        self.names = sorted(stations, key=lambda name: (name.lower(), name))
+        self.keys = [name.lower() for name in self.names]
+        self.postal_codes = [stations[name][0] for name in self.names]
+        self.program_types = [stations[name][1] for name in self.names]
+
+        trigrams = {}
+        for position, key in enumerate(self.keys):
+            for start in range(len(key) - 2):
+                trigrams.setdefault(key[start:start + 3], set()).add(position)
+        self.trigrams = trigrams
+
+    def __len__(self):
+        return len(self.names)
+
+    def _match(self, position, match):
+        return StationMatch(self.names[position], match, self.postal_codes[position], self.program_types[position])
+
+    def search(self, query: str, limit: int = 10):
+        """
+        Stations containing `query` (case-insensitive), ranked exact match first, then prefix
+        matches, then other substrings by how early the query occurs; ties sort by name.
+        """
+        query = query.strip().lower()
+        if not query:
+            return []
+
+        # Prefix matches, in name order (an exact match sorts first)
+        start = bisect.bisect_left(self.keys, query)
+        end = start
+        while end < min(len(self.keys), start + limit) and self.keys[end].startswith(query):
+            end += 1
+        matches = [
+            self._match(position, 'exact' if self.keys[position] == query else 'prefix')
+            for position in range(start, end)
+        ]
+        if len(matches) >= limit:
+            return matches
+
+        # Queries of three or more characters only verify stations sharing all their trigrams
+        if len(query) >= 3:
+            postings = [self.trigrams.get(query[i:i + 3]) for i in range(len(query) - 2)]
+            candidates = set.intersection(*postings) if all(postings) else set()
+        else:
+            candidates = range(len(self.keys))
+
+        substrings = []
+        for position in candidates:
+            offset = self.keys[position].find(query)
+            if offset > 0:
+                substrings.append((offset, self.keys[position], position))
+        substrings.sort()
+        matches.extend(self._match(position, 'substring') for _, _, position in substrings[:limit - len(matches)])
+        return matches
+
+class PlanIndex:
+    """
+    Immutable in-memory snapshot of jurisdiction plans keyed by (effective_week, program_type).
+    Each partition stores ids into one table of interned values in compact arrays, so the
+    API can answer station and postal code lookups without querying jurisdiction_plans.
+    """
+
+    def __init__(self, values, value_ids, partitions, version):
+        self._values = values
+        self._value_ids = value_ids
+        self._partitions = partitions
+        self.version = version
+        self.loaded_at = datetime.now()
+        self.weeks = sorted({week for week, _ in partitions})
+        self.total_plans = sum(len(partition) for partition in partitions.values())
+        self._station_graphs = {}
+        self._station_graphs_lock = threading.Lock()
+        self._diffs = {}
+        self._station_searches = {}
+
+    def default_week(self) -> Optional[str]:
+        """Earliest available effective week (what the API uses when none is given)"""
+        return self.weeks[0] if self.weeks else None
+
+    def program_types(self, effective_week: str):
+        """Program types with plans in the given week"""
+        return sorted(program_type for week, program_type in self._partitions if week == effective_week)
+
+    def partitions(self, effective_week: str, program_type: str = 'all'):
+        """Partitions for a week, either one program type or all of them"""
+        if program_type.lower() != 'all':
+            partition = self._partitions.get((effective_week, program_type.lower()))
+            return [partition] if partition is not None else []
+        return [self._partitions[(effective_week, pt)] for pt in self.program_types(effective_week)]
+
+    def _plan(self, partition, position):
+        values = self._values
+        return Plan(
+            plan_identifier=values[partition.identifiers[position]],
+            program_type=partition.program_type,
+            postal_code=values[partition.postal_codes[position]],
+            delivery_station=values[partition.stations[position]],
+            effective_week=partition.effective_week,
+            dw_update_datetime=values[partition.updated[position]]
+        )
+
+    def stations(self, effective_week: str, program_type: str = 'all'):
+        """Distinct delivery stations with plans in the given week"""
+        return sorted({
+            self._values[station_id]
+            for partition in self.partitions(effective_week, program_type)
+            for station_id in partition.station_rows
+        })
+
+    def match_stations(self, effective_week: str, program_type: str, search: str):
+        """
+        Delivery stations whose name contains `search` (case-insensitive, like ILIKE '%search%'),
+        excluding all variations of Additional Zips.
+        """
+        search = search.lower()
+        return [
+            station for station in self.stations(effective_week, program_type)
+            if search in station.lower() and not is_additional_zips(station)
+        ]
+
+    def search_stations(self, effective_week: str, program_type: str, query: str, limit: int = 10):
+        """
+        Ranked delivery stations of a week matching `query` (see StationSearchIndex.search),
+        excluding all variations of Additional Zips. The search index is built on first use
+        per week and program type and cached for the lifetime of this snapshot.
+        """
+        key = (effective_week, program_type.lower())
+        search_index = self._station_searches.get(key)
+        if search_index is None:
+            # Racing builders compute the same result, so no lock is needed
+            search_index = self._station_searches[key] = self._build_station_search(effective_week, program_type)
+        return search_index.search(query, limit)
+
+    def _build_station_search(self, effective_week, program_type):
+        postal_codes = {}
+        program_types = {}
+        for partition in self.partitions(effective_week, program_type):
+            for station_id, positions in partition.station_rows.items():
+                postal_codes.setdefault(station_id, set()).update(partition.postal_codes[position] for position in positions)
+                program_types.setdefault(station_id, set()).add(partition.program_type)
+
+        return StationSearchIndex({
+            self._values[station_id]: (len(station_postal_codes), tuple(sorted(program_types[station_id])))
+            for station_id, station_postal_codes in postal_codes.items()
+            if not is_additional_zips(self._values[station_id])
+        })
+
+    def plans_for_stations(self, effective_week: str, program_type: str, stations):
+        """All plans served by the given delivery stations"""
+        plans = []
+        for partition in self.partitions(effective_week, program_type):
+            for station in stations:
+                station_id = self._value_ids.get(station)
+                for position in partition.station_rows.get(station_id, ()):
+                    plans.append(self._plan(partition, position))
+        return plans
+
+    def plans_for_postal_codes(self, effective_week: str, program_type: str, postal_codes):
+        """All plans covering the given postal codes"""
+        plans = []
+        for partition in self.partitions(effective_week, program_type):
+            for postal_code in postal_codes:
+                postal_code_id = self._value_ids.get(postal_code)
+                if postal_code_id is None:
+                    continue
+                for position in partition.postal_code_rows(postal_code_id):
+                    plans.append(self._plan(partition, position))
+        return plans
+
+    def stations_for_postal_codes(self, effective_week: str, program_type: str, postal_codes):
+        """Distinct delivery stations covering any of the given postal codes"""
+        return set(plan.delivery_station for plan in self.plans_for_postal_codes(effective_week, program_type, postal_codes))
+
+    def station_graph(self, effective_week: str, program_type: str = 'all'):
+        """
+        Station adjacency graph for a week: {station: {neighbor: shared postal code count}}.
+        Two stations are adjacent when they cover at least one common postal code.
+        Built on first use and cached for the lifetime of this snapshot.
+        """
+        key = (effective_week, program_type.lower())
+        graph = self._station_graphs.get(key)
+        if graph is not None:
+            return graph
+
+        with self._station_graphs_lock:
+            graph = self._station_graphs.get(key)
+            if graph is None:
+                graph = self._build_station_graph(effective_week, program_type)
+                self._station_graphs[key] = graph
+        return graph
+
+    def _build_station_graph(self, effective_week, program_type):
+        postal_code_stations = {}
+        for partition in self.partitions(effective_week, program_type):
+            for postal_code_id, station_id in zip(partition.postal_codes, partition.stations):
+                postal_code_stations.setdefault(postal_code_id, set()).add(station_id)
+
+        weights = {}
+        for station_ids in postal_code_stations.values():
+            if len(station_ids) < 2:
+                continue
+            for station_a in station_ids:
+                for station_b in station_ids:
+                    if station_a != station_b:
+                        weights[(station_a, station_b)] = weights.get((station_a, station_b), 0) + 1
+
+        graph = {}
+        for (station_a, station_b), shared in weights.items():
+            graph.setdefault(self._values[station_a], {})[self._values[station_b]] = shared
+        return graph
+
+    def postal_code_stations(self, effective_week: str, program_type: str = 'all'):
+        """{postal code id: set of station ids} covering each postal code in a week"""
+        stations = {}
+        for partition in self.partitions(effective_week, program_type):
+            for postal_code_id, station_id in zip(partition.postal_codes, partition.stations):
+                stations.setdefault(postal_code_id, set()).add(station_id)
+        return stations
+
+    def diff_weeks(self, week_a: str, week_b: str, program_type: str = 'all'):
+        """
+        Postal codes whose delivery stations differ between two weeks, as a list of
+        (postal_code, stations in week_a, stations in week_b) sorted by postal code.
+        A postal code missing from one week has an empty tuple for it.
+        Computed on first use per week pair and cached for the lifetime of this snapshot.
+        """
+        key = (week_a, week_b, program_type.lower())
+        diff = self._diffs.get(key)
+        if diff is not None:
+            return diff
+
+        stations_a = self.postal_code_stations(week_a, program_type)
+        stations_b = self.postal_code_stations(week_b, program_type)
+        values = self._values
+        diff = []
+        for postal_code_id in stations_a.keys() | stations_b.keys():
+            before = stations_a.get(postal_code_id, set())
+            after = stations_b.get(postal_code_id, set())
+            if before != after:
+                diff.append((
+                    values[postal_code_id],
+                    tuple(sorted(values[station_id] for station_id in before)),
+                    tuple(sorted(values[station_id] for station_id in after))
+                ))
+        diff.sort()
+        # Racing builders compute the same result, so no lock is needed
+        self._diffs[key] = diff
+        return diff
+
+    def expand_stations(self, effective_week: str, program_type: str, stations, depth: Optional[int] = None):
+        """
+        Walk the station graph outward from `stations`, never entering Additional Zips.
+        Returns {station: hop count}; depth=None walks the whole connected component.
+        """
+        graph = self.station_graph(effective_week, program_type)
+        hops = {station: 0 for station in stations}
+        frontier = list(stations)
+        hop = 0
+        while frontier and (depth is None or hop < depth):
+            hop += 1
+            next_frontier = []
+            for station in frontier:
+                for neighbor in graph.get(station, ()):
+                    if neighbor not in hops and not is_additional_zips(neighbor):
+                        hops[neighbor] = hop
+                        next_frontier.append(neighbor)
+            frontier = next_frontier
+        return hops
+
+def build_index(rows, version: int = 0, base: PlanIndex = None, weeks=None) -> PlanIndex:
+    """
+    Build a PlanIndex from an iterable of (plan_identifier, program_type, postal_code,
+    delivery_station, effective_week, dw_update_datetime) rows.
+    With `base` and `weeks`, the rows replace only those weeks and every other partition
+    (and its cached station graphs) is carried over from `base`.
+    """
+    values = list(base._values) if base is not None else []
+    value_ids = dict(base._value_ids) if base is not None else {}
+
+    def intern(value):
+        value_id = value_ids.get(value)
+        if value_id is None:
+            value_id = value_ids[value] = len(values)
+            values.append(value)
+        return value_id
+
+    grouped = {}
+    for plan_identifier, program_type, postal_code, delivery_station, effective_week, dw_update_datetime in rows:
+        grouped.setdefault((effective_week, program_type), []).append((
+            intern(postal_code),
+            intern(delivery_station),
+            intern(plan_identifier),
+            intern(dw_update_datetime)
+        ))
+
+    partitions = {}
+    if base is not None:
+        weeks = set(weeks)
+        partitions = {key: partition for key, partition in base._partitions.items() if key[0] not in weeks}
+    partitions.update(
+        (key, _Partition(key[0], key[1], partition_rows))
+        for key, partition_rows in grouped.items()
+    )
+
+    index = PlanIndex(values, value_ids, partitions, version)
+    if base is not None:
+        # Station graphs of untouched weeks are still valid (value ids are preserved)
+        index._station_graphs.update(
+            (key, graph) for key, graph in base._station_graphs.items() if key[0] not in weeks
+        )
+        index._diffs.update(
+            (key, diff) for key, diff in base._diffs.items() if key[0] not in weeks and key[1] not in weeks
+        )
+        index._station_searches.update(
+            (key, search_index) for key, search_index in base._station_searches.items() if key[0] not in weeks
+        )
+    return index
+
+def load_index(db: Session, version: int = 0, base: PlanIndex = None, weeks=None) -> PlanIndex:
+    """
+    Load jurisdiction plans from the repository behind `db` into a new PlanIndex.
+    With `base` and `weeks`, only those effective weeks are queried and replaced.
+    """
+    started = time.perf_counter()
+    rows = repository_for(db).plan_rows(weeks if base is not None else None)
+    index = build_index(rows, version, base, weeks)
+    logger.info("Loaded jurisdiction plan index", extra={
+        "version": index.version,
+        "plans": index.total_plans,
+        "weeks": len(index.weeks),
+        "reloaded_weeks": sorted(weeks) if base is not None else None,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 2)
+    })
+    return index
+
+_current_index = None
+_reload_lock = threading.Lock()
+_versions = itertools.count(1)
+
+def reload(db: Session) -> PlanIndex:
+    """Rebuild the plan index from the database and swap it in atomically"""
+    global _current_index
+    with _reload_lock:
+        index = load_index(db, next(_versions))
+        _current_index = index
+    return index
+
+def reload_weeks(db: Session, weeks) -> PlanIndex:
+    """Reload only the given effective weeks and swap the new snapshot in atomically"""
+    global _current_index
+    with _reload_lock:
+        if _current_index is None:
+            index = load_index(db, next(_versions))
+        else:
+            index = load_index(db, next(_versions), base=_current_index, weeks=weeks)
+        _current_index = index
+    return index
+
+def loaded_index() -> Optional[PlanIndex]:
+    """Return the current plan index without loading it (None before the first load)"""
+    return _current_index
+
+def get_index(db: Session) -> PlanIndex:
+    """Return the current plan index, loading it on first use"""
+    global _current_index
+    if _current_index is None:
+        with _reload_lock:
+            if _current_index is None:
+                _current_index = load_index(db, next(_versions))
+    return _current_index
@@ -0,0 +1,150 @@
+import contextvars
+import logging
+import os
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+logger = logging.getLogger(__name__)
+
+# Checkouts that wait longer than this for a connection are logged as warnings
+SLOW_CHECKOUT_MS = float(os.getenv("DB_SLOW_CHECKOUT_MS", "100"))
+
+# Default Postgres statement_timeout; per-endpoint budgets are set with statement_timeout()
+DEFAULT_STATEMENT_TIMEOUT_MS = int(os.getenv("STATEMENT_TIMEOUT_MS", "30000"))
+
+# statement_timeout budget of the current request (None uses DEFAULT_STATEMENT_TIMEOUT_MS)
+_statement_timeout = contextvars.ContextVar("statement_timeout_ms", default=None)
+
+class PoolMetrics:
+    """Thread-safe counters of connection checkouts and the time spent waiting for them"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.slow_checkouts = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+
+    def record(self, wait_ms: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+                if wait_ms >= SLOW_CHECKOUT_MS:
+                    self.slow_checkouts += 1
+            self.wait_ms_total += wait_ms
+            self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+
+    def stats(self):
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "slow_checkouts": self.slow_checkouts,
+                "slow_checkout_ms": SLOW_CHECKOUT_MS,
+                "wait_ms_total": round(self.wait_ms_total, 2),
+                "wait_ms_avg": round(self.wait_ms_total / attempts, 3) if attempts else None,
+                "wait_ms_max": round(self.wait_ms_max, 2)
+            }
+
+class _InstrumentedPoolMixin:
+    """Times every connection checkout and logs the ones slower than SLOW_CHECKOUT_MS"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            wait_ms = (time.perf_counter() - started) * 1000
+            self.metrics.record(wait_ms, timed_out=True)
+            logger.error("Connection pool checkout timed out", extra={"wait_ms": round(wait_ms, 2), **self.usage()})
+            raise
+
+        wait_ms = (time.perf_counter() - started) * 1000
+        self.metrics.record(wait_ms)
+        if wait_ms >= SLOW_CHECKOUT_MS:
+            logger.warning("Slow connection pool checkout", extra={"wait_ms": round(wait_ms, 2), **self.usage()})
+        return connection
+
+    def recreate(self):
+        # Keep the counters when the pool is recreated (engine.dispose(), invalidation)
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def usage(self):
+        """Current pool occupancy"""
+        return {
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "checked_in": self.checkedin(),
+            "overflow": max(self.overflow(), 0),
+            "max_overflow": self._max_overflow
+        }
+
+    def stats(self):
+        """Pool settings, occupancy and checkout counters"""
+        return {
+            **self.usage(),
+            "timeout": self._timeout,
+            "recycle": self._recycle,
+            "pre_ping": self._pre_ping,
+            **self.metrics.stats()
+        }
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    """QueuePool with checkout metrics"""
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool with checkout metrics"""
+
+def pool_stats(engine):
+    """Metrics of an engine's connection pool (None for uninstrumented pools)"""
+    pool = engine.pool
+    return pool.stats() if isinstance(pool, _InstrumentedPoolMixin) else None
+
+def _apply_statement_timeout(dbapi_connection, connection_record, connection_proxy):
+    """Set statement_timeout on checkout to the current request's budget, skipping unchanged values"""
+    timeout = _statement_timeout.get()
+    if timeout is None:
+        timeout = DEFAULT_STATEMENT_TIMEOUT_MS
+    if connection_record.info.get("statement_timeout") == timeout:
+        return
+
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"SET statement_timeout = {int(timeout)}")
+    finally:
+        cursor.close()
+    # Commit so the rollback on checkin does not revert the setting
+    dbapi_connection.commit()
+    connection_record.info["statement_timeout"] = timeout
+
+def install_statement_timeout(engine):
+    """Apply the per-request statement_timeout budget to connections checked out of the engine"""
+    if not event.contains(engine, "checkout", _apply_statement_timeout):
+        event.listen(engine, "checkout", _apply_statement_timeout)
+
+def statement_timeout(endpoint: str, default_ms: int):
+    """
+    FastAPI dependency setting the Postgres statement_timeout budget for a request.
+    The budget can be overridden with STATEMENT_TIMEOUT_<ENDPOINT>_MS; 0 disables the timeout.
+    """
+    timeout = int(os.getenv(f"STATEMENT_TIMEOUT_{endpoint.upper()}_MS", str(default_ms)))
+
+    async def set_statement_timeout():
+        # Async so the value is set in the request's own context, which the handler inherits
+        _statement_timeout.set(timeout)
+        return timeout
+
+    return set_statement_timeout
@@ -0,0 +1,359 @@
+from abc import ABC, abstractmethod
+import itertools
+import math
+import os
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+from . import diagnostics, models
+from .geometry_cache import geometry_cache
+from .lod import FULL_DETAIL, GeometryDetail, resolve_detail
+from .responses import RawJSON
+
+def zip_code_attributes_query(postal_codes=None):
+    """Statement selecting postal_code/lat/long (never the geometry), optionally for a set of postal codes"""
+    query = select(
+        models.ZipCode.postal_code,
+        models.ZipCode.lat,
+        models.ZipCode.long
+    )
+
+    if postal_codes is not None:
+        query = query.where(models.ZipCode.postal_code.in_(postal_codes))
+
+    return query
+
+def geometry_query(detail: GeometryDetail):
+    """Statement selecting ST_AsGeoJSON for the geometry tier of `detail`"""
+    # The column name comes from the fixed list of tiers in lod.GEOMETRY_TIERS
+    return text(f"""
+        SELECT postal_code, ST_AsGeoJSON({detail.column}, :precision)
+        FROM zip_codes
+        WHERE postal_code = ANY(:postal_codes)
+          AND {detail.column} IS NOT NULL
+    """)
+
+def get_cached_geometries(postal_codes, detail: GeometryDetail = FULL_DETAIL):
+    """
+    Look up geometries in the shared geometry cache.
+    Returns ({postal_code: RawJSON} for hits, [postal codes still to fetch]).
+    """
+    level = detail.cache_level
+    cached = geometry_cache.get_many((postal_code, level) for postal_code in postal_codes)
+    geometries = {postal_code: RawJSON(data) for (postal_code, _), data in cached.items()}
+    return geometries, list(set(postal_codes) - geometries.keys())
+
+def cache_geometry_rows(rows, geometries: dict, detail: GeometryDetail = FULL_DETAIL):
+    """Store (postal_code, geojson) rows in the geometry cache and add them to `geometries`"""
+    level = detail.cache_level
+    for postal_code, geojson in rows:
+        if geojson:
+            data = geojson.encode("utf-8")
+            geometry_cache.put((postal_code, level), data)
+            geometries[postal_code] = RawJSON(data)
+    return geometries
+
+def demographics_query(postal_codes=None, year: int = None):
+    """Statement selecting demographics ordered by year, optionally filtered by postal codes and year"""
+    query = select(
+        models.ZipDemographics.postal_code,
+        models.ZipDemographics.year,
+        models.ZipDemographics.population
+    )
+
+    if postal_codes is not None:
+        query = query.where(models.ZipDemographics.postal_code.in_(postal_codes))
+
+    if year:
+        query = query.where(models.ZipDemographics.year == year)
+
+    return query.order_by(models.ZipDemographics.year)
+
+def group_demographics(rows):
+    """Group demographics rows into {postal_code: [{"year", "population"}, ...]}"""
+    demographics = {}
+    for row in rows:
+        demographics.setdefault(row.postal_code, []).append({
+            "year": row.year,
+            # Missing ACS values are stored as NaN, which is not valid JSON
+            "population": row.population if row.population == row.population else None
+        })
+    return demographics
+
+# KNN candidates fetched per requested result; the index orders by planar (degree) distance,
+# so a few extra candidates are re-ranked by true distance in meters
+NEARBY_CANDIDATE_FACTOR = 4
+
+# Meters per degree of latitude, used to turn a radius into an index-friendly bounding box
+METERS_PER_DEGREE = 111320.0
+
+def nearby_zip_codes_query(radius: float = None):
+    """
+    KNN statement for the ZIP codes whose centroid is nearest to (:lat, :lon).
+    `centroid <-> point` is answered from the GiST index; with a radius, a bounding box
+    prefilter (also indexed) and an exact geodesic distance check are applied.
+    """
+    radius_filter = ""
+    if radius is not None:
+        radius_filter = """
+            WHERE centroid && ST_Expand(ST_SetSRID(ST_MakePoint(:lon, :lat), 4326), :radius_degrees)
+        """
+    return text(f"""
+        SELECT postal_code, lat, long, distance_m
+        FROM (
+            SELECT
+                postal_code, lat, long,
+                ST_Distance(centroid::geography, ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)::geography) AS distance_m
+            FROM zip_codes
+            {radius_filter}
+            ORDER BY centroid <-> ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)
+            LIMIT :candidates
+        ) candidates
+        WHERE CAST(:radius AS double precision) IS NULL OR distance_m <= :radius
+        ORDER BY distance_m
+        LIMIT :limit
+    """)
+
+def radius_degrees(lat: float, radius: float) -> float:
+    """Degrees covering `radius` meters in every direction around latitude `lat`"""
+    # Longitude degrees shrink with cos(lat); clamp near the poles
+    return radius / (METERS_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+
+# Points resolved per point-in-polygon statement by /locate
+LOCATE_BATCH_SIZE = int(os.getenv("LOCATE_BATCH_SIZE", "5000"))
+
+def locate_postal_codes_query():
+    """
+    Point-in-polygon statement resolving a batch of points (:lons, :lats arrays) to ZIP codes.
+    Each point probes the GiST index on zip_codes.geometry; points on a shared boundary
+    resolve to the lowest postal code, and points outside every ZIP are left out.
+    """
+    return text("""
+        SELECT points.position, zip.postal_code
+        FROM unnest(CAST(:lons AS double precision[]), CAST(:lats AS double precision[]))
+            WITH ORDINALITY AS points(lon, lat, position)
+        CROSS JOIN LATERAL (
+            SELECT postal_code
+            FROM zip_codes
+            WHERE ST_Intersects(geometry, ST_SetSRID(ST_MakePoint(points.lon, points.lat), 4326))
+            ORDER BY postal_code
+            LIMIT 1
+        ) zip
+    """)
+
+def station_boundaries_query(detail: GeometryDetail, delivery_station: str = None):
+    """Statement selecting precomputed station boundaries of a week and program type as GeoJSON"""
+    station_filter = "AND delivery_station = :delivery_station" if delivery_station is not None else ""
+    # The column name comes from the fixed list of tiers in lod.GEOMETRY_TIERS
+    return text(f"""
+        SELECT
+            delivery_station, effective_week, program_type, total_postal_codes,
+            population, population_year, area_km2, perimeter_km, computed_at,
+            ST_AsGeoJSON({detail.column}, :precision) AS geometry
+        FROM station_boundaries
+        WHERE effective_week = :effective_week
+          AND program_type = :program_type
+          {station_filter}
+        ORDER BY delivery_station
+    """)
+
+def tile_query(column: str):
+    """ST_AsMVT statement for one tile of ZIP code polygons from the given geometry tier"""
+    # The column name comes from the fixed list of tiers in lod.GEOMETRY_TIERS
+    return text(f"""
+        WITH bounds AS (
+            SELECT ST_TileEnvelope(:z, :x, :y) AS geom_3857,
+                   ST_Transform(ST_TileEnvelope(:z, :x, :y), 4326) AS geom_4326
+        ),
+        features AS (
+            SELECT z.postal_code,
+                   s.delivery_station,
+                   d.population,
+                   ST_AsMVTGeom(ST_Transform(z.{column}, 3857), bounds.geom_3857, 4096, 64, true) AS geom
+            FROM zip_codes z
+            JOIN bounds ON z.geometry && bounds.geom_4326
+            LEFT JOIN LATERAL (
+                SELECT string_agg(DISTINCT jp.delivery_station, ',') AS delivery_station
+                FROM jurisdiction_plans jp
+                WHERE jp.postal_code = z.postal_code
+                  AND jp.effective_week = :effective_week
+                  AND (:program_type = 'all' OR jp.program_type = :program_type)
+            ) s ON true
+            LEFT JOIN zip_demographics d
+                ON d.postal_code = z.postal_code AND d.year = :year
+        )
+        SELECT ST_AsMVT(features, 'zip_codes', 4096, 'geom')
+        FROM features
+        WHERE geom IS NOT NULL
+    """)
+
+class Repository(ABC):
+    """
+    Read access to ZIP codes, demographics and jurisdiction plans used by the crud functions.
+    SqlRepository queries PostGIS; geoparquet.GeoParquetRepository serves files exported by
+    init_db.py from memory.
+    """
+
+    @abstractmethod
+    def zip_code_attributes(self, postal_codes=None, batch_size: int = None):
+        """Batches (lists) of postal_code/lat/long rows, for all ZIP codes or the given ones"""
+
+    @abstractmethod
+    def geometries(self, postal_codes, detail: GeometryDetail = FULL_DETAIL):
+        """{postal_code: RawJSON} GeoJSON geometries of a geometry tier (ZIPs without geometry omitted)"""
+
+    @abstractmethod
+    def demographics(self, postal_codes=None, year: int = None):
+        """{postal_code: [{"year", "population"}, ...]} ordered by year"""
+
+    @abstractmethod
+    def plan_rows(self, weeks=None):
+        """Jurisdiction plan rows (see plan_index.build_index), for every week or only the given ones"""
+
+    @abstractmethod
+    def nearby_zip_codes(self, lat: float, lon: float, radius: float = None, limit: int = 10):
+        """postal_code/lat/long/distance_m rows of the ZIP centroids nearest to a point, by distance"""
+
+    @abstractmethod
+    def locate_postal_codes(self, points):
+        """Postal codes containing each (lat, lon) pair (None outside every ZIP), aligned with `points`"""
+
+    @abstractmethod
+    def available_years(self):
+        """Years with demographics, ascending"""
+
+    @abstractmethod
+    def latest_year(self):
+        """Latest year with demographics"""
+
+    @abstractmethod
+    def zip_code_stats(self):
+        """The precomputed zip_code_stats row (None before it is computed)"""
+
+    @abstractmethod
+    def year_stats(self, year: int):
+        """The precomputed zip_demographics_year_stats row of a year (None without data)"""
+
+    @abstractmethod
+    def station_boundaries(self, effective_week: str, program_type: str, detail: GeometryDetail, delivery_station: str = None):
+        """Precomputed station boundary rows of a week with GeoJSON geometry, ordered by station"""
+
+    @abstractmethod
+    def tile(self, z: int, x: int, y: int, effective_week: str, program_type: str, year: int):
+        """Mapbox Vector Tile bytes of ZIP code polygons"""
+
+    @abstractmethod
+    def check_geometries(self, postal_codes=None):
+        """Geometry validity report (see diagnostics.check_geometries)"""
+
+class SqlRepository(Repository):
+    """Repository backed by PostGIS through a SQLAlchemy session"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def zip_code_attributes(self, postal_codes=None, batch_size: int = None):
+        # Geometry is fetched separately, in one batch
+        query = self.db.query(
+            models.ZipCode.postal_code,
+            models.ZipCode.lat,
+            models.ZipCode.long
+        )
+        if postal_codes is not None:
+            query = query.filter(models.ZipCode.postal_code.in_(list(postal_codes)))
+
+        if batch_size:
+            # Server-side cursor: rows are read from Postgres batch by batch
+            return itertools.batched(query.yield_per(batch_size), batch_size)
+        return [query.all()]
+
+    def geometries(self, postal_codes, detail: GeometryDetail = FULL_DETAIL):
+        geometries, missing = get_cached_geometries(postal_codes, detail)
+        if missing:
+            result = self.db.execute(geometry_query(detail), {"postal_codes": missing, "precision": detail.precision})
+            cache_geometry_rows(result, geometries, detail)
+        return geometries
+
+    def demographics(self, postal_codes=None, year: int = None):
+        return group_demographics(self.db.execute(demographics_query(postal_codes, year)))
+
+    def plan_rows(self, weeks=None):
+        query = self.db.query(
+            models.JurisdictionPlan.plan_identifier,
+            models.JurisdictionPlan.program_type,
+            models.JurisdictionPlan.postal_code,
+            models.JurisdictionPlan.delivery_station,
+            models.JurisdictionPlan.effective_week,
+            models.JurisdictionPlan.dw_update_datetime
+        )
+        if weeks is not None:
+            query = query.filter(models.JurisdictionPlan.effective_week.in_(list(weeks)))
+        return query.yield_per(50000)
+
+    def nearby_zip_codes(self, lat: float, lon: float, radius: float = None, limit: int = 10):
+        return self.db.execute(nearby_zip_codes_query(radius), {
+            "lat": lat,
+            "lon": lon,
+            "radius": radius,
+            "radius_degrees": radius_degrees(lat, radius) if radius is not None else None,
+            "candidates": limit * NEARBY_CANDIDATE_FACTOR,
+            "limit": limit
+        }).all()
+
+    def locate_postal_codes(self, points):
+        # LOCATE_BATCH_SIZE points per query
+        postal_codes = [None] * len(points)
+        statement = locate_postal_codes_query()
+        for start in range(0, len(points), LOCATE_BATCH_SIZE):
+            batch = points[start:start + LOCATE_BATCH_SIZE]
+            rows = self.db.execute(statement, {
+                "lats": [lat for lat, _ in batch],
+                "lons": [lon for _, lon in batch]
+            })
+            for position, postal_code in rows:
+                # WITH ORDINALITY positions start at 1
+                postal_codes[start + position - 1] = postal_code
+        return postal_codes
+
+    def available_years(self):
+        years = self.db.query(models.ZipDemographicsYearStats.year)\
+            .order_by(models.ZipDemographicsYearStats.year)\
+            .all()
+        return [year[0] for year in years]
+
+    def latest_year(self):
+        return self.db.query(func.max(models.ZipDemographicsYearStats.year)).scalar()
+
+    def zip_code_stats(self):
+        return self.db.query(models.ZipCodeStats).first()
+
+    def year_stats(self, year: int):
+        return self.db.query(models.ZipDemographicsYearStats)\
+            .filter(models.ZipDemographicsYearStats.year == year)\
+            .first()
+
+    def station_boundaries(self, effective_week: str, program_type: str, detail: GeometryDetail, delivery_station: str = None):
+        return self.db.execute(station_boundaries_query(detail, delivery_station), {
+            "effective_week": effective_week,
+            "program_type": program_type,
+            "delivery_station": delivery_station,
+            "precision": detail.precision
+        }).all()
+
+    def tile(self, z: int, x: int, y: int, effective_week: str, program_type: str, year: int):
+        # The geometry tier follows the zoom level
+        tile = self.db.execute(tile_query(resolve_detail(zoom=z).column), {
+            "z": z,
+            "x": x,
+            "y": y,
+            "effective_week": effective_week,
+            "program_type": program_type,
+            "year": year
+        }).scalar()
+        return bytes(tile) if tile else b""
+
+    def check_geometries(self, postal_codes=None):
+        return diagnostics.check_geometries(self.db, postal_codes)
+
+def repository_for(db) -> Repository:
+    """The repository behind a get_db() dependency: a Session is wrapped, a Repository is used as-is"""
+    return db if isinstance(db, Repository) else SqlRepository(db)
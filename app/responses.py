@@ -0,0 +1,156 @@
+import json
+from datetime import date, datetime
+from typing import Any
+from fastapi.responses import Response
+
+# orjson is optional: it encodes datetimes and pre-serialized fragments natively in C.
+# Without it, the stdlib encoder is used and RawJSON geometries are spliced in by hand.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_BACKEND = "orjson" if orjson is not None else "json"
+
+class RawJSON:
+    """Pre-serialized JSON bytes that are spliced into a response as-is"""
+
+    __slots__ = ("data",)
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+    def __eq__(self, other):
+        return isinstance(other, RawJSON) and other.data == self.data
+
+    def __hash__(self):
+        return hash(self.data)
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, RawJSON):
+        return json.loads(value.data)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def _orjson_default(value):
+    if isinstance(value, RawJSON):
+        return orjson.Fragment(value.data)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def stdlib_dumps(value: Any) -> bytes:
+    """Encode a value as compact JSON bytes with the stdlib encoder"""
+    return json.dumps(
+        value,
+        default=_default,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":")
+    ).encode("utf-8")
+
+def orjson_dumps(value: Any) -> bytes:
+    """Encode a value as compact JSON bytes with orjson; RawJSON becomes an orjson.Fragment"""
+    return orjson.dumps(value, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS)
+
+def dumps(value: Any) -> bytes:
+    """Encode a value as compact JSON bytes, handling datetimes and RawJSON"""
+    if orjson is not None:
+        return orjson_dumps(value)
+    return stdlib_dumps(value)
+
+def stdlib_render_feature(feature: dict) -> bytes:
+    """Encode a GeoJSON feature with the stdlib encoder, splicing a RawJSON geometry in as-is"""
+    geometry = feature.get("geometry")
+    if not isinstance(geometry, RawJSON):
+        return stdlib_dumps(feature)
+
+    encoded = stdlib_dumps({key: value for key, value in feature.items() if key != "geometry"})
+    separator = b"" if encoded == b"{}" else b","
+    return encoded[:-1] + separator + b'"geometry":' + geometry.data + b"}"
+
+def stdlib_render_geometries(geometries: dict) -> bytes:
+    """Encode a {key: geometry} dictionary with the stdlib encoder, splicing RawJSON geometries in as-is"""
+    return b"{" + b",".join(
+        stdlib_dumps(key) + b":" + (geometry.data if isinstance(geometry, RawJSON) else stdlib_dumps(geometry))
+        for key, geometry in geometries.items()
+    ) + b"}"
+
+def stdlib_render_feature_collection(content: dict) -> bytes:
+    """Encode a FeatureCollection dict with the stdlib encoder, feature by feature"""
+    parts = [b"{"]
+    for position, (key, value) in enumerate(content.items()):
+        if position:
+            parts.append(b",")
+        parts.append(stdlib_dumps(key))
+        parts.append(b":")
+        if key == "features":
+            parts.append(b"[")
+            parts.append(b",".join(stdlib_render_feature(feature) for feature in value))
+            parts.append(b"]")
+        elif key == "geometries":
+            # Geometry dictionary shared by the features (POST /nodes/batch)
+            parts.append(stdlib_render_geometries(value))
+        else:
+            parts.append(stdlib_dumps(value))
+    parts.append(b"}")
+    return b"".join(parts)
+
+def render_feature(feature: dict) -> bytes:
+    """Encode a GeoJSON feature without re-encoding its RawJSON geometry"""
+    if orjson is not None:
+        return orjson_dumps(feature)
+    return stdlib_render_feature(feature)
+
+def render_feature_collection(content: dict) -> bytes:
+    """Encode a FeatureCollection dict without re-encoding its RawJSON geometries"""
+    if orjson is not None:
+        return orjson_dumps(content)
+    return stdlib_render_feature_collection(content)
+
+class FeatureCollectionResponse(Response):
+    """
+    JSON response for GeoJSON FeatureCollections, encoded with orjson when available.
+    Geometries held as RawJSON are written straight into the output instead of being
+    parsed and re-encoded. Routes return this response directly, which skips the
+    response_model validation pass while the model still documents the OpenAPI schema.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return render_feature_collection(content)
+
+# Target size of the chunks written by the streaming encoders
+STREAM_CHUNK_BYTES = 64 * 1024
+
+def _chunked(parts):
+    """Group small byte strings into chunks of roughly STREAM_CHUNK_BYTES"""
+    buffer = []
+    size = 0
+    for part in parts:
+        buffer.append(part)
+        size += len(part)
+        if size >= STREAM_CHUNK_BYTES:
+            yield b"".join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b"".join(buffer)
+
+def _feature_collection_parts(features, metadata):
+    yield b'{"type":"FeatureCollection","features":['
+    for position, feature in enumerate(features):
+        if position:
+            yield b","
+        yield render_feature(feature)
+    yield b"]"
+    if metadata is not None:
+        yield b',"metadata":' + dumps(metadata)
+    yield b"}"
+
+def stream_feature_collection(features, metadata: dict = None):
+    """Encode an iterable of features incrementally as one FeatureCollection document"""
+    return _chunked(_feature_collection_parts(features, metadata))
+
+def stream_ndjson(features):
+    """Encode an iterable of features incrementally as newline-delimited GeoJSON"""
+    return _chunked(render_feature(feature) + b"\n" for feature in features)
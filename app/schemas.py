@@ -2,11 +2,12 @@ from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 from geojson import Feature, FeatureCollection
 from datetime import datetime
+import os
 
 class ZipCodeBase(BaseModel):
     postal_code: str
-    lat: str
-    long: str
+    lat: float
+    long: float
 
 class ZipDemographicsBase(BaseModel):
     postal_code: str
@@ -39,4 +40,69 @@ class NodeResponse(BaseModel):
             Feature: lambda f: f.__geo_interface__,
             FeatureCollection: lambda fc: fc.__geo_interface__,
             datetime: lambda dt: dt.isoformat()
-        } 
\ No newline at end of file
+        }
+
+# Maximum number of delivery stations accepted by one /nodes/batch request
+NODES_BATCH_MAX_STATIONS = int(os.getenv("NODES_BATCH_MAX_STATIONS", "100"))
+
+class NodeBatchRequest(BaseModel):
+    delivery_stations: List[str] = Field(..., min_length=1, max_length=NODES_BATCH_MAX_STATIONS)
+    effective_week: Optional[str] = None
+    program_type: str = 'all'
+    geometry: bool = True
+    population: bool = False
+    recursive: bool = False
+    depth: Optional[int] = Field(None, ge=1)
+    component: bool = False
+    simplify_tolerance: Optional[float] = Field(None, ge=0)
+    zoom: Optional[int] = Field(None, ge=0, le=24)
+    precision: Optional[int] = Field(None, ge=0, le=15)
+
+class NodeBatchResponse(BaseModel):
+    type: str = "FeatureCollection"
+    features: List[Dict[str, Any]]
+    # Geometries (and demographics, when requested) keyed by postal code
+    geometries: Dict[str, Any]
+    demographics: Optional[Dict[str, Any]] = None
+    metadata: Dict[str, Any]
+
+class NearbyZipCodesResponse(BaseModel):
+    type: str = "FeatureCollection"
+    features: List[Dict[str, Any]]
+    metadata: Dict[str, Any]
+
+# Maximum number of points accepted by one /locate request
+LOCATE_MAX_POINTS = int(os.getenv("LOCATE_MAX_POINTS", "10000"))
+
+class LocatePoint(BaseModel):
+    lat: float = Field(..., ge=-90, le=90)
+    lon: float = Field(..., ge=-180, le=180)
+    id: Optional[str] = None
+
+class LocateRequest(BaseModel):
+    points: List[LocatePoint] = Field(..., min_length=1, max_length=LOCATE_MAX_POINTS)
+    effective_week: Optional[str] = None
+    program_type: str = 'all'
+
+class LocateResponse(BaseModel):
+    results: List[Dict[str, Any]]
+    metadata: Dict[str, Any]
+
+class StationSearchMatch(BaseModel):
+    delivery_station: str
+    match: str
+    total_postal_codes: int
+    program_types: List[str]
+
+class StationSearchResponse(BaseModel):
+    query: str
+    effective_week: str
+    program_type: str
+    stations: List[StationSearchMatch]
+    metadata: Dict[str, Any]
+
+class PlanIndexStatus(BaseModel):
+    version: int
+    loaded_at: datetime
+    total_plans: int
+    effective_weeks: List[str]
@@ -0,0 +1,198 @@
+"""
+Benchmarks for the ZIP Code API.
+
+Database scenarios run against DATABASE_URL and report wall time and SQL statement
+counts; the encoding scenario uses synthetic features and needs no database.
+
+    python benchmark.py zip-codes --count 500
+    python benchmark.py locate --points 10000
+    python benchmark.py encode --features 5000
+"""
+import argparse
+import json
+import random
+import statistics
+from datetime import datetime
+from sqlalchemy import text
+
+def _legacy_zip_codes_probes(db, postal_codes):
+    """
+    Replay the per-ZIP query pattern /zip-codes/ used before diagnostics were made opt-in:
+    one .first() lookup per requested code, then ST_IsValid, ST_AsText and ST_AsGeoJSON per row.
+    """
+    from app import models
+
+    for code in postal_codes:
+        db.query(models.ZipCode).filter(models.ZipCode.postal_code == code).first()
+
+    for zip_code in db.query(models.ZipCode).filter(models.ZipCode.postal_code.in_(postal_codes)).all():
+        for probe in ("ST_IsValid(geometry::geometry)", "ST_AsText(geometry)", "ST_AsGeoJSON(geometry)"):
+            db.execute(
+                text(f"SELECT {probe} FROM zip_codes WHERE postal_code = :postal_code"),
+                {"postal_code": zip_code.postal_code}
+            ).scalar()
+
+def _run(label, fn, repeat, **extra):
+    """Run fn `repeat` times and print median wall time and statement count"""
+    from app import diagnostics
+
+    timings = []
+    queries = 0
+    for _ in range(repeat):
+        with diagnostics.track_queries() as tracker:
+            fn()
+        timings.append(tracker.duration_ms)
+        queries = tracker.queries
+
+    print(json.dumps({
+        "scenario": label,
+        "median_ms": round(statistics.median(timings), 2),
+        "min_ms": round(min(timings), 2),
+        "queries": queries,
+        **extra
+    }))
+
+def bench_zip_codes(args):
+    """Compare the legacy per-ZIP probe pattern with the current /zip-codes/ default path"""
+    from app import crud, diagnostics, models
+    from app.database import SessionLocal, engine
+
+    diagnostics.install_query_counter(engine)
+    db = SessionLocal()
+    try:
+        postal_codes = [
+            row[0] for row in db.query(models.ZipCode.postal_code)
+            .order_by(models.ZipCode.postal_code)
+            .limit(args.count)
+            .all()
+        ]
+        print(f"Benchmarking /zip-codes/ with {len(postal_codes)} ZIP codes")
+
+        _run("before: per-ZIP probes", lambda: _legacy_zip_codes_probes(db, postal_codes), args.repeat)
+        _run("after: default path", lambda: crud.get_zip_codes(db, postal_codes=postal_codes), args.repeat)
+        _run("after: debug=true", lambda: crud.get_zip_codes(db, postal_codes=postal_codes, debug=True), args.repeat)
+    finally:
+        db.close()
+
+def bench_locate(args):
+    """Measure /locate throughput in points per second on points sampled around ZIP centroids"""
+    from types import SimpleNamespace
+    from app import crud, diagnostics, models, plan_index, repository
+    from app.database import SessionLocal, engine
+
+    diagnostics.install_query_counter(engine)
+    db = SessionLocal()
+    try:
+        centroids = db.query(models.ZipCode.lat, models.ZipCode.long).all()
+        rng = random.Random(args.seed)
+        # Jitter around the census internal points so most points land inside a ZIP code
+        points = [
+            SimpleNamespace(id=str(i), lat=lat + rng.uniform(-0.01, 0.01), lon=lon + rng.uniform(-0.01, 0.01))
+            for i, (lat, lon) in enumerate(rng.choices(centroids, k=args.points))
+        ]
+        # Load the plan index up front so it is not part of the measurement
+        plan_index.get_index(db)
+        print(f"Benchmarking /locate with {len(points)} points")
+
+        for batch_size in args.batch_sizes:
+            repository.LOCATE_BATCH_SIZE = batch_size
+            timings = []
+            for _ in range(args.repeat):
+                with diagnostics.track_queries() as tracker:
+                    result = crud.get_locations(db, points)
+                timings.append(tracker.duration_ms)
+            median_ms = statistics.median(timings)
+            print(json.dumps({
+                "scenario": f"locate: batch size {batch_size}",
+                "median_ms": round(median_ms, 2),
+                "points_per_second": round(len(points) / (median_ms / 1000), 1),
+                "queries": tracker.queries,
+                "located_points": result["metadata"]["located_points"]
+            }))
+    finally:
+        db.close()
+
+def _synthetic_node_response(feature_count, vertices):
+    """A /node/-shaped response with square-ish polygons of `vertices` points per feature"""
+    from app.responses import RawJSON
+
+    features = []
+    for i in range(feature_count):
+        ring = [[-122.0 + i * 1e-4 + (j % 2) * 0.0123456789, 47.0 + j * 0.0001234567] for j in range(vertices)]
+        ring.append(ring[0])
+        geometry = json.dumps({"type": "MultiPolygon", "coordinates": [[ring]]}, separators=(",", ":"))
+        features.append({
+            "type": "Feature",
+            "properties": {
+                "postal_code": f"{i:05d}",
+                "delivery_station": "DAB5",
+                "program_type": "ssd",
+                "effective_week": "2025-01",
+                "plan_identifier": "amzl_ssd_2025-01-01 00:00:00",
+                "dw_update_datetime": datetime(2025, 1, 1, 8, 30),
+                "is_main_station": True,
+                "lat": "+47.6167",
+                "long": "-122.2000"
+            },
+            "geometry": RawJSON(geometry.encode("utf-8"))
+        })
+
+    metadata = {"delivery_station": "DAB5", "effective_week": "2025-01", "total_postal_codes": feature_count}
+    return {"type": "FeatureCollection", "features": features, "metadata": metadata}
+
+def bench_encode(args):
+    """Compare response_model validation + JSONResponse with the FeatureCollectionResponse encoders"""
+    from app import responses, schemas
+
+    content = _synthetic_node_response(args.features, args.vertices)
+    # The pre-splicing path carried parsed geometry dicts through validation
+    parsed = {
+        **content,
+        "features": [{**feature, "geometry": json.loads(feature["geometry"].data)} for feature in content["features"]]
+    }
+
+    def validated_json_response():
+        model = schemas.NodeResponse.model_validate(parsed)
+        return json.dumps(
+            model.model_dump(mode="json"),
+            ensure_ascii=False,
+            allow_nan=False,
+            separators=(",", ":")
+        ).encode("utf-8")
+
+    print(f"Encoding {args.features} features with {args.vertices} vertices each")
+    size = len(validated_json_response())
+    _run("before: response_model validation + JSONResponse", validated_json_response, args.repeat, bytes=size)
+    _run("after: stdlib with RawJSON splicing", lambda: responses.stdlib_render_feature_collection(content), args.repeat, bytes=size)
+    if responses.orjson is not None:
+        _run("after: orjson with fragments", lambda: responses.orjson_dumps(content), args.repeat, bytes=size)
+    else:
+        print("orjson is not installed; skipping the orjson scenario")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ZIP Code API")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    zip_codes = subparsers.add_parser("zip-codes", help="Benchmark /zip-codes/ query patterns")
+    zip_codes.add_argument("--count", type=int, default=500, help="Number of ZIP codes to request")
+    zip_codes.add_argument("--repeat", type=int, default=5, help="Runs per scenario")
+    zip_codes.set_defaults(func=bench_zip_codes)
+
+    locate = subparsers.add_parser("locate", help="Benchmark /locate point-in-polygon throughput")
+    locate.add_argument("--points", type=int, default=10000, help="Number of points to resolve")
+    locate.add_argument("--batch-sizes", type=int, nargs="+", default=[1000, 5000], help="Points per query to compare")
+    locate.add_argument("--seed", type=int, default=0, help="Random seed for the sampled points")
+    locate.add_argument("--repeat", type=int, default=5, help="Runs per scenario")
+    locate.set_defaults(func=bench_locate)
+
+    encode = subparsers.add_parser("encode", help="Benchmark GeoJSON response encoding")
+    encode.add_argument("--features", type=int, default=5000, help="Number of features in the response")
+    encode.add_argument("--vertices", type=int, default=200, help="Vertices per polygon")
+    encode.add_argument("--repeat", type=int, default=5, help="Runs per scenario")
+    encode.set_defaults(func=bench_encode)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -69,6 +69,45 @@ export default function JurisdictionForm({ onSubmit }: JurisdictionFormProps) {
     fetchEffectiveWeeks();
   }, []);
 
+  // Fetch ranked station suggestions from /stations/search as the user types (debounced)
+  useEffect(() => {
+    const query = formData.delivery_station.trim();
+    if (!query || !formData.effective_week) {
+      setStationSuggestions([]);
+      return;
+    }
+
+    const controller = new AbortController();
+    const timer = setTimeout(async () => {
+      try {
+        const params = new URLSearchParams({
+          q: query,
+          week: formData.effective_week,
+          program_type: formData.program_type,
+          limit: '8'
+        });
+        const response = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/stations/search?${params}`, {
+          signal: controller.signal
+        });
+        if (!response.ok) {
+          throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        const result = await response.json();
+        setStationSuggestions(result.stations.map((station: { delivery_station: string }) => station.delivery_station));
+      } catch (error) {
+        if ((error as Error).name !== 'AbortError') {
+          console.error('Error fetching station suggestions:', error);
+          setStationSuggestions([]);
+        }
+      }
+    }, 150);
+
+    return () => {
+      clearTimeout(timer);
+      controller.abort();
+    };
+  }, [formData.delivery_station, formData.effective_week, formData.program_type]);
+
   // Validate delivery station
   const validateDeliveryStation = (value: string): string | undefined => {
     if (!value) {
@@ -94,6 +133,13 @@ export default function JurisdictionForm({ onSubmit }: JurisdictionFormProps) {
     // Validate and set errors
     const error = validateDeliveryStation(upperValue);
     setErrors(prev => ({ ...prev, delivery_station: error }));
+    setShowStationSuggestions(true);
+  };
+
+  // Pick a suggested station
+  const handleStationSelect = (station: string) => {
+    handleStationInput(station);
+    setShowStationSuggestions(false);
   };
 
   const handleSubmit = async (e: React.FormEvent) => {
@@ -131,6 +177,8 @@ export default function JurisdictionForm({ onSubmit }: JurisdictionFormProps) {
             type="text"
             value={formData.delivery_station}
             onChange={(e) => handleStationInput(e.target.value)}
+            onFocus={() => setShowStationSuggestions(true)}
+            onBlur={() => setShowStationSuggestions(false)}
             className={`amazon-input ${
               isDirty && errors.delivery_station
                 ? 'border-[#c40000] focus:border-[#c40000] focus:shadow-[0_0_3px_2px_rgba(196,0,0,0.5)]'
@@ -147,6 +195,23 @@ export default function JurisdictionForm({ onSubmit }: JurisdictionFormProps) {
               </svg>
             </div>
           )}
+          {showStationSuggestions && stationSuggestions.length > 0 && (
+            <ul className="absolute z-10 mt-1 w-full bg-white border border-[#a6a6a6] rounded shadow-md max-h-60 overflow-auto">
+              {stationSuggestions.map(station => (
+                <li
+                  key={station}
+                  // onMouseDown fires before the input's onBlur hides the list
+                  onMouseDown={(e) => {
+                    e.preventDefault();
+                    handleStationSelect(station);
+                  }}
+                  className="px-3 py-2 text-sm text-[#111111] cursor-pointer hover:bg-[#f3f3f3]"
+                >
+                  {station}
+                </li>
+              ))}
+            </ul>
+          )}
         </div>
         {isDirty && errors.delivery_station && (
           <p className="mt-1 text-sm text-[#c40000]">
@@ -1,14 +1,20 @@
-import geopandas as gpd
 import pandas as pd
 import psycopg2
-from sqlalchemy import create_engine
+import shapely
+import argparse
+import io
+import json
 import os
 import glob
-from geoalchemy2 import Geometry
+import re
+import time
+import numpy as np
+import pyogrio
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from dotenv import load_dotenv
-from sqlalchemy import text
-from sqlalchemy.types import String, TIMESTAMP
+from app.lod import GEOMETRY_TIERS
 
 def load_config():
     """Load configuration from environment variables or .env file"""
@@ -26,7 +32,9 @@ def load_config():
         },
         "data": {
             "zcta_filepath": os.getenv("ZCTA_FILEPATH", "data/tl_2022_us_zcta520.zip"),
-            "acsdp_pattern": os.getenv("ACSDP_PATTERN", "data/**/ACSDP5Y*.DP05-Data.csv")
+            "acsdp_pattern": os.getenv("ACSDP_PATTERN", "data/**/ACSDP5Y*.DP05-Data.csv"),
+            "ssd_jp_filepath": os.getenv("AMZL_SSD_JP_FILEPATH", "data/jp/amzl_ssd_jurisdiction_plan.csv"),
+            "core_jp_filepath": os.getenv("AMZL_CORE_JP_FILEPATH", "data/jp/amzl_core_jurisdiction_plan.csv")
         }
     }
     
@@ -37,6 +45,214 @@ def get_db_url(db_config):
     password_str = f":{db_config['password']}" if db_config['password'] else ""
     return f"postgresql://{db_config['user']}{password_str}@{db_config['host']}:{db_config['port']}/{db_config['database']}"
 
+# Rows sent per COPY statement; bounds the CSV buffer held in memory
+COPY_CHUNK_ROWS = 100000
+
+# Worker processes used to parse input files (defaults to the number of cores)
+INIT_DB_WORKERS = int(os.getenv("INIT_DB_WORKERS", "0")) or os.cpu_count() or 1
+
+# ZCTA features read per batch; bounds the number of geometries held in memory at once
+ZCTA_CHUNK_ROWS = int(os.getenv("ZCTA_CHUNK_ROWS", "5000"))
+
+# Table definitions; tables are loaded into "<table>_staging" and swapped in once complete
+TABLE_DDL = {
+    "zip_codes": f"""
+        CREATE TABLE {{table}} (
+            postal_code TEXT,
+            lat DOUBLE PRECISION,
+            long DOUBLE PRECISION,
+            centroid geometry(POINT, 4326),
+            {", ".join(f"{column} geometry(MULTIPOLYGON, 4326)" for column, _ in GEOMETRY_TIERS)}
+        )
+    """,
+    "zip_demographics": """
+        CREATE TABLE {table} (
+            postal_code TEXT,
+            year BIGINT,
+            population DOUBLE PRECISION
+        )
+    """,
+    # One list partition per effective_week (see create_plan_partitions / attach_plan_partition);
+    # the primary key includes the partition key, so each partition enforces it on its own
+    "jurisdiction_plans": """
+        CREATE TABLE {table} (
+            plan_identifier VARCHAR(100),
+            program_type VARCHAR(10),
+            postal_code VARCHAR(10),
+            delivery_station VARCHAR(50),
+            effective_week VARCHAR(8),
+            dw_update_datetime TIMESTAMP,
+            PRIMARY KEY (plan_identifier, postal_code, effective_week)
+        ) PARTITION BY LIST (effective_week)
+    """,
+    "station_boundaries": f"""
+        CREATE TABLE {{table}} (
+            effective_week VARCHAR(8),
+            program_type VARCHAR(10),
+            delivery_station VARCHAR(50),
+            total_postal_codes BIGINT,
+            population DOUBLE PRECISION,
+            population_year BIGINT,
+            area_km2 DOUBLE PRECISION,
+            perimeter_km DOUBLE PRECISION,
+            {", ".join(f"{column} geometry(MULTIPOLYGON, 4326)" for column, _ in GEOMETRY_TIERS)},
+            computed_at TIMESTAMP
+        )
+    """
+}
+
+# Indexes built on the staging table after the data is loaded: (name, CREATE INDEX statement).
+# On partitioned tables they are created on every partition, including ones attached later.
+TABLE_INDEXES = {
+    "zip_codes": [
+        ("idx_zip_codes_postal_code", "CREATE UNIQUE INDEX {name} ON {table} (postal_code)"),
+        ("idx_zip_codes_centroid", "CREATE INDEX {name} ON {table} USING gist (centroid)"),
+    ] + [
+        (f"idx_zip_codes_{column}", f"CREATE INDEX {{name}} ON {{table}} USING gist ({column})")
+        for column, _ in GEOMETRY_TIERS
+    ],
+    "zip_demographics": [
+        ("idx_zip_demographics_postal_code_year", "CREATE UNIQUE INDEX {name} ON {table} (postal_code, year)"),
+        ("idx_zip_demographics_year", "CREATE INDEX {name} ON {table} (year)"),
+    ],
+    "zip_code_stats": [],
+    "zip_demographics_year_stats": [
+        ("idx_zip_demographics_year_stats_year", "CREATE UNIQUE INDEX {name} ON {table} (year)"),
+    ],
+    "jurisdiction_plans": [
+        ("idx_jurisdiction_plans_week_program_station",
+         "CREATE INDEX {name} ON {table} (effective_week, program_type, delivery_station)"),
+        ("idx_jurisdiction_plans_week_postal_code", "CREATE INDEX {name} ON {table} (effective_week, postal_code)"),
+    ],
+    "station_boundaries": [
+        ("idx_station_boundaries_week_program_station",
+         "CREATE UNIQUE INDEX {name} ON {table} (effective_week, program_type, delivery_station)"),
+    ]
+}
+
+def get_connection(db_config):
+    """Open a psycopg2 connection for COPY-based loading"""
+    return psycopg2.connect(**db_config)
+
+def copy_dataframe(cur, table, df):
+    """Stream a DataFrame into a table with COPY ... FROM STDIN (CSV), in chunks of COPY_CHUNK_ROWS"""
+    columns = ", ".join(df.columns)
+    for start in range(0, len(df), COPY_CHUNK_ROWS):
+        buffer = io.StringIO()
+        # Missing values are written as empty unquoted fields, which COPY reads as NULL
+        df.iloc[start:start + COPY_CHUNK_ROWS].to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+        cur.copy_expert(f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+def rename_primary_key(cur, table, previous):
+    """Rename the primary key `table` got when it was created as `previous` ({previous}_pkey) to {table}_pkey"""
+    cur.execute("SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'p'", (table,))
+    row = cur.fetchone()
+    if row is not None and row[0] == f"{previous}_pkey":
+        cur.execute(f"ALTER TABLE {table} RENAME CONSTRAINT {row[0]} TO {table}_pkey")
+
+def swap_table(cur, table, staging):
+    """Replace the live table with the staging table and give its indexes and partitions their final names"""
+    cur.execute(f"DROP TABLE IF EXISTS {table}")
+    cur.execute(f"ALTER TABLE {staging} RENAME TO {table}")
+    rename_primary_key(cur, table, staging)
+    for name, _ in TABLE_INDEXES[table]:
+        cur.execute(f"ALTER INDEX {name}_staging RENAME TO {name}")
+    
+    # Partitions are named after their parent, so they keep the staging prefix through the rename
+    cur.execute("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = %s::regclass
+    """, (table,))
+    for (partition,) in cur.fetchall():
+        if partition.startswith(f"{staging}_"):
+            renamed = f"{table}_{partition[len(staging) + 1:]}"
+            cur.execute(f"ALTER TABLE {partition} RENAME TO {renamed}")
+            rename_primary_key(cur, renamed, partition)
+
+def load_table(db_config, table, chunks, prepare=None, setup=None, notify=None):
+    """
+    Load a DataFrame, or an iterable of DataFrame chunks, into `table` without taking it offline.
+    `setup(cur, staging)` runs on the empty staging table (e.g. to create partitions), the rows are
+    COPYed into it, `prepare(cur, staging)` runs on the loaded data, indexes are built, and the
+    staging table is swapped in within a single transaction, which also NOTIFYs the `notify` channel.
+    """
+    staging = f"{table}_staging"
+    conn = get_connection(db_config)
+    cur = conn.cursor()
+    
+    try:
+        started = time.perf_counter()
+        cur.execute(f"DROP TABLE IF EXISTS {staging}")
+        cur.execute(TABLE_DDL[table].format(table=staging))
+        if setup is not None:
+            setup(cur, staging)
+        if isinstance(chunks, pd.DataFrame):
+            chunks = [chunks]
+        rows = 0
+        for chunk in chunks:
+            copy_dataframe(cur, staging, chunk)
+            rows += len(chunk)
+        conn.commit()
+        copy_seconds = time.perf_counter() - started
+        
+        if prepare is not None:
+            prepare(cur, staging)
+            conn.commit()
+        
+        # Indexes are cheaper to build once over the loaded data than to maintain row by row
+        for name, statement in TABLE_INDEXES[table]:
+            cur.execute(statement.format(name=f"{name}_staging", table=staging))
+        cur.execute(f"ANALYZE {staging}")
+        conn.commit()
+        
+        swap_table(cur, table, staging)
+        if notify is not None:
+            cur.execute(f"NOTIFY {notify}")
+        conn.commit()
+        total_seconds = time.perf_counter() - started
+        
+        print(
+            f"Successfully loaded {table}: {rows:,} rows copied in {copy_seconds:.1f}s "
+            f"({rows / max(copy_seconds, 1e-9):,.0f} rows/s), {total_seconds:.1f}s including indexes and swap"
+        )
+    except Exception:
+        conn.rollback()
+        cur.execute(f"DROP TABLE IF EXISTS {staging}")
+        conn.commit()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+def parallel_map(fn, items, workers=None):
+    """
+    Yield fn(item) for each item, in order, computed in a process pool.
+    At most `workers` results are in flight, so memory stays bounded while the caller consumes them.
+    """
+    workers = workers or INIT_DB_WORKERS
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(fn, item))
+            if len(pending) >= workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def to_ewkb(geometries, srid=4326):
+    """Hex EWKB for a GeoSeries, with polygons promoted to multipolygons"""
+    geometries = np.asarray(geometries, dtype=object)
+    polygons = shapely.get_type_id(geometries) == shapely.GeometryType.POLYGON
+    if polygons.any():
+        geometries[polygons] = shapely.multipolygons(
+            geometries[polygons], indices=np.arange(polygons.sum())
+        )
+    geometries = shapely.set_srid(geometries, srid)
+    return shapely.to_wkb(geometries, hex=True, include_srid=True)
+
 def init_postgis(db_config):
     """Initialize PostGIS extension if not already enabled"""
     conn = psycopg2.connect(**db_config)
@@ -53,180 +269,860 @@ def init_postgis(db_config):
         cur.close()
         conn.close()
 
-def load_data(config):
-    """Load GeoDataFrames and DataFrames into PostgreSQL"""
-    # Create SQLAlchemy engine
-    engine = create_engine(get_db_url(config['database']))
+def read_zcta_chunk(task):
+    """Read one batch of ZCTA features as zip_codes rows, with geometry as hex EWKB (runs in a worker)"""
+    filepath, skip_features, max_features = task
+    gdf = pyogrio.read_dataframe(
+        filepath,
+        columns=['ZCTA5CE20', 'INTPTLAT20', 'INTPTLON20'],
+        skip_features=skip_features,
+        max_features=max_features
+    )
+    
+    # Geometry is sent as hex EWKB, which PostGIS parses directly from COPY input
+    return pd.DataFrame({
+        'postal_code': gdf['ZCTA5CE20'],
+        'lat': pd.to_numeric(gdf['INTPTLAT20']),
+        'long': pd.to_numeric(gdf['INTPTLON20']),
+        'geometry': to_ewkb(gdf.geometry.values)
+    })
+
+def iter_zcta_chunks(filepath):
+    """Read the ZCTA file in batches of ZCTA_CHUNK_ROWS features, parsed in parallel"""
+    total = pyogrio.read_info(filepath)['features']
+    tasks = ((filepath, start, ZCTA_CHUNK_ROWS) for start in range(0, total, ZCTA_CHUNK_ROWS))
+    return parallel_map(read_zcta_chunk, tasks)
+
+def acsdp_year(filepath):
+    """ACS year encoded in an ACSDP5Y<year>.DP05-Data.csv file name"""
+    return int(os.path.basename(filepath).split('.')[0].replace('ACSDP5Y', ''))
+
+def read_acsdp_file(filepath):
+    """Read one ACS DP05 file as zip_demographics rows (runs in a worker)"""
+    df = pd.read_csv(filepath, 
+                   usecols=["NAME", "DP05_0001E"],
+                   skiprows=[1])
     
+    df = pd.DataFrame({
+        'postal_code': df['NAME'].str.replace('ZCTA5 ', '', regex=False),
+        'year': acsdp_year(filepath),
+        'population': pd.to_numeric(df['DP05_0001E'], errors='coerce')
+    })
+    return df.sort_values(by='postal_code')
+
+def load_data(config):
+    """Load the ZCTA boundaries and ACS demographics into PostgreSQL with COPY"""
     try:
-        # Load and prepare geodataframe (gdf)
+        # Load zip_codes in parallel-parsed batches, building the simplified tiers before the swap
         zcta_filepath = config['data']['zcta_filepath']
-        gdf = gpd.read_file(zcta_filepath)
-        gdf = gdf[['ZCTA5CE20', 'INTPTLAT20', 'INTPTLON20', 'geometry']]
-        gdf = gdf.rename(columns={
-            'ZCTA5CE20': 'postal_code',
-            'INTPTLAT20': 'lat',
-            'INTPTLON20': 'long'
-        })
-        
-        # Load gdf to PostgreSQL
-        gdf.to_postgis(
-            name='zip_codes',
-            con=engine,
-            if_exists='replace',
-            index=False,
-            dtype={'geometry': Geometry('MULTIPOLYGON', srid=4326)}
-        )
-        print("Successfully loaded zip_codes table")
-        
-        # Load and prepare ACSDP data
-        acsdp_dfs = []
-        acsdp_filepaths = glob.glob(config['data']['acsdp_pattern'], recursive=True)
-        
-        for filepath in acsdp_filepaths:
-            df = pd.read_csv(filepath, 
-                           usecols=["NAME", "DP05_0001E"],
-                           skiprows=[1])
-            
-            year = os.path.basename(filepath).split('.')[0].replace('ACSDP5Y', '')
-            df['year'] = int(year)
-            df['NAME'] = df['NAME'].str.replace('ZCTA5 ', '')
-            df = df.rename(columns={"NAME": "postal_code", "DP05_0001E": "population"})
-            acsdp_dfs.append(df)
-        
-        acsdp_df = pd.concat(acsdp_dfs, ignore_index=True)
-        acsdp_df = acsdp_df[['postal_code', 'year', 'population']]
-        acsdp_df = acsdp_df.sort_values(by=['year', 'postal_code'], ascending=[True, True])
-        acsdp_df['population'] = pd.to_numeric(acsdp_df['population'], errors='coerce')
-        
-        # Load acsdp_df to PostgreSQL
-        acsdp_df.to_sql(
-            name='zip_demographics',
-            con=engine,
-            if_exists='replace',
-            index=False
+        load_table(
+            config['database'], 'zip_codes', iter_zcta_chunks(zcta_filepath),
+            prepare=build_derived_geometries, notify=ZIP_CODES_CHANGES_CHANNEL
         )
-        print("Successfully loaded zip_demographics table")
+        
+        # Parse each ACS year in its own process; years are loaded in ascending order
+        acsdp_filepaths = sorted(glob.glob(config['data']['acsdp_pattern'], recursive=True), key=acsdp_year)
+        load_table(config['database'], 'zip_demographics', parallel_map(read_acsdp_file, acsdp_filepaths))
         
     except Exception as e:
         print(f"Error loading data: {e}")
+
+# Precomputed statistics served by /stats/ and /years/ (see app/models.py)
+STATISTICS_QUERIES = {
+    "zip_code_stats": """
+        SELECT
+            z.total_zip_codes, z.lat_min, z.lat_max, z.long_min, z.long_max,
+            d.total_years_available, d.earliest_year, d.latest_year,
+            now() AS computed_at
+        FROM (
+            SELECT
+                COUNT(postal_code) AS total_zip_codes,
+                MIN(lat) AS lat_min,
+                MAX(lat) AS lat_max,
+                MIN(long) AS long_min,
+                MAX(long) AS long_max
+            FROM zip_codes
+        ) z
+        CROSS JOIN (
+            SELECT
+                COUNT(DISTINCT year) AS total_years_available,
+                MIN(year) AS earliest_year,
+                MAX(year) AS latest_year
+            FROM zip_demographics
+        ) d
+    """,
+    "zip_demographics_year_stats": """
+        SELECT
+            year,
+            COUNT(postal_code) AS zip_codes_with_demographics,
+            AVG(population) AS avg_population,
+            MIN(population) AS min_population,
+            MAX(population) AS max_population,
+            STDDEV(population) AS stddev_population,
+            percentile_cont(0.25) WITHIN GROUP (ORDER BY population) AS q1,
+            percentile_cont(0.5) WITHIN GROUP (ORDER BY population) AS median,
+            percentile_cont(0.75) WITHIN GROUP (ORDER BY population) AS q3
+        FROM zip_demographics
+        GROUP BY year
+    """
+}
+
+# Postgres NOTIFY channel the API listens on to drop its cached /stats/ and /years/ responses
+STATISTICS_CHANGES_CHANNEL = "zip_statistics_changed"
+
+def refresh_statistics(config):
+    """Rebuild the precomputed statistics tables, swap them in, and notify the API"""
+    conn = get_connection(config['database'])
+    cur = conn.cursor()
+    
+    try:
+        for table, query in STATISTICS_QUERIES.items():
+            started = time.perf_counter()
+            staging = f"{table}_staging"
+            cur.execute(f"DROP TABLE IF EXISTS {staging}")
+            cur.execute(f"CREATE TABLE {staging} AS {query}")
+            for name, statement in TABLE_INDEXES[table]:
+                cur.execute(statement.format(name=f"{name}_staging", table=staging))
+            swap_table(cur, table, staging)
+            print(f"Successfully refreshed {table} in {time.perf_counter() - started:.1f}s")
+        
+        # NOTIFY is delivered when the swap commits
+        cur.execute(f"NOTIFY {STATISTICS_CHANGES_CHANNEL}")
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        print(f"Error refreshing statistics: {e}")
     finally:
-        engine.dispose()
+        cur.close()
+        conn.close()
 
-def load_jurisdiction_plans(config):
-    """Load and transform jurisdiction plan data into PostgreSQL"""
-    engine = create_engine(get_db_url(config['database']))
+# Postgres NOTIFY channel the API listens on to drop its cached geometries and tiles
+ZIP_CODES_CHANGES_CHANNEL = "zip_codes_changed"
+
+# Centroid point from the Census internal point coordinates
+CENTROID_EXPRESSION = "ST_SetSRID(ST_MakePoint(long, lat), 4326)"
+
+def build_derived_geometries(cur, table):
+    """Build the centroid and the simplified level-of-detail geometry columns of a zip_codes table in one pass"""
+    # Topology-preserving simplification keeps every polygon valid
+    assignments = ", ".join([f"centroid = {CENTROID_EXPRESSION}"] + [
+        f"{column} = ST_Multi(ST_SimplifyPreserveTopology(geometry, {tolerance}))"
+        for column, tolerance in GEOMETRY_TIERS
+        if column != 'geometry'
+    ])
+    started = time.perf_counter()
+    cur.execute(f"UPDATE {table} SET {assignments}")
+    print(f"Built centroids and {len(GEOMETRY_TIERS) - 1} geometry levels of detail in {time.perf_counter() - started:.1f}s")
+
+def migrate_zip_codes(config):
+    """
+    Migrate an existing zip_codes table in place to numeric lat/long with an indexed centroid column
+    and the simplified level-of-detail geometry columns
+    """
+    conn = get_connection(config['database'])
+    cur = conn.cursor()
     
     try:
-        # Load SSD jurisdiction plan with explicit dtypes
-        ssd_df = pd.read_csv('data/jp/amzl_ssd_jurisdiction_plan.csv', 
-                            dtype={
-                                'zip_code': str,
-                                'country': str,
-                                'week': str,
-                                'delivery_station': str,
-                                'plan_id': str
-                            },
-                            parse_dates=['effective_date', 'upload_timestamp', 'dw_update_datetime_pst'])
-        
-        # Transform SSD data
-        ssd_transformed = pd.DataFrame({
-            'plan_identifier': 'amzl_ssd_' + ssd_df['dw_update_datetime_pst'].astype(str),
-            'program_type': 'ssd',
-            'postal_code': ssd_df['zip_code'],
-            'delivery_station': ssd_df['delivery_station'],
-            'effective_week': ssd_df['week'].apply(lambda x: f"2025-{x.replace('Wk ', '').zfill(2)}"),
-            'dw_update_datetime': pd.to_datetime(ssd_df['dw_update_datetime_pst'])
-        })
-        
-        # Load Core jurisdiction plan with explicit dtypes
-        core_df = pd.read_csv('data/jp/amzl_core_jurisdiction_plan.csv',
-                             dtype={
-                                 'postal_code': str,
-                                 'delivery_station': str,
-                                 'effective_week': str
-                             },
-                             parse_dates=['active_from', 'active_from_orig', 'active_until', 'dw_ingest_time'])
-        
-        # Transform Core data
-        core_transformed = pd.DataFrame({
-            'plan_identifier': 'amzl_core_' + core_df['dw_ingest_time'].astype(str),
-            'program_type': 'core',
-            'postal_code': core_df['postal_code'],
-            'delivery_station': core_df['delivery_station'],
-            'effective_week': core_df['effective_week'],
-            'dw_update_datetime': pd.to_datetime(core_df['dw_ingest_time'])
-        })
-        
-        # Get the intersection of effective weeks
-        ssd_weeks = set(ssd_transformed['effective_week'].unique())
-        core_weeks = set(core_transformed['effective_week'].unique())
-        valid_weeks = ssd_weeks.intersection(core_weeks)
-        
-        print(f"Found {len(valid_weeks)} overlapping weeks between SSD and Core data")
-        
-        # Filter both dataframes to only include overlapping weeks
-        ssd_transformed = ssd_transformed[ssd_transformed['effective_week'].isin(valid_weeks)]
-        core_transformed = core_transformed[core_transformed['effective_week'].isin(valid_weeks)]
-        
-        # Combine both dataframes
-        combined_df = pd.concat([ssd_transformed, core_transformed], ignore_index=True)
-        
-        # Create the table with proper data types
-        create_table_sql = text("""
-        CREATE TABLE IF NOT EXISTS jurisdiction_plans (
-            plan_identifier VARCHAR(100),
-            program_type VARCHAR(10),
-            postal_code VARCHAR(10),
-            delivery_station VARCHAR(50),
-            effective_week VARCHAR(8),
-            dw_update_datetime TIMESTAMP,
-            PRIMARY KEY (plan_identifier, postal_code, effective_week)
-        );
+        started = time.perf_counter()
+        added_columns = ", ".join(["ADD COLUMN IF NOT EXISTS centroid geometry(POINT, 4326)"] + [
+            f"ADD COLUMN IF NOT EXISTS {column} geometry(MULTIPOLYGON, 4326)"
+            for column, _ in GEOMETRY_TIERS
+            if column != 'geometry'
+        ])
+        cur.execute(f"""
+            ALTER TABLE zip_codes
+                ALTER COLUMN lat TYPE DOUBLE PRECISION USING lat::double precision,
+                ALTER COLUMN long TYPE DOUBLE PRECISION USING long::double precision,
+                {added_columns}
         """)
+        build_derived_geometries(cur, 'zip_codes')
+        for name, statement in TABLE_INDEXES['zip_codes']:
+            cur.execute(statement.replace("INDEX {name}", "INDEX IF NOT EXISTS {name}").format(name=name, table='zip_codes'))
+        cur.execute("ANALYZE zip_codes")
+        cur.execute(f"NOTIFY {ZIP_CODES_CHANGES_CHANNEL}")
+        conn.commit()
+        print(f"Successfully migrated zip_codes in {time.perf_counter() - started:.1f}s")
+    except Exception as e:
+        conn.rollback()
+        print(f"Error migrating zip_codes: {e}")
+        return
+    finally:
+        cur.close()
+        conn.close()
+    
+    refresh_statistics(config)
+
+def plan_identifiers(prefix, timestamps):
+    """
+    prefix + str(timestamp) for a column of upload timestamps.
+    Each upload shares one timestamp, so only the distinct values are formatted.
+    """
+    codes, uniques = pd.factorize(timestamps, use_na_sentinel=False)
+    labels = (prefix + pd.Index(uniques).astype(str)).to_numpy()
+    return pd.Series(labels[codes], index=timestamps.index)
+
+def read_jurisdiction_plans(ssd_filepath, core_filepath):
+    """Read and transform the SSD and Core jurisdiction plan CSVs into one DataFrame"""
+    # Load SSD jurisdiction plan with explicit dtypes (only the columns that are used)
+    ssd_df = pd.read_csv(ssd_filepath, 
+                        usecols=['zip_code', 'week', 'delivery_station', 'dw_update_datetime_pst'],
+                        dtype={
+                            'zip_code': str,
+                            'week': str,
+                            'delivery_station': str
+                        },
+                        parse_dates=['dw_update_datetime_pst'])
+    
+    # Transform SSD data ('Wk 3' -> '2025-03')
+    ssd_transformed = pd.DataFrame({
+        'plan_identifier': plan_identifiers('amzl_ssd_', ssd_df['dw_update_datetime_pst']),
+        'program_type': 'ssd',
+        'postal_code': ssd_df['zip_code'],
+        'delivery_station': ssd_df['delivery_station'],
+        'effective_week': '2025-' + ssd_df['week'].str.replace('Wk ', '', regex=False).str.zfill(2),
+        'dw_update_datetime': ssd_df['dw_update_datetime_pst']
+    })
+    
+    # Load Core jurisdiction plan with explicit dtypes (only the columns that are used)
+    core_df = pd.read_csv(core_filepath,
+                         usecols=['postal_code', 'delivery_station', 'effective_week', 'dw_ingest_time'],
+                         dtype={
+                             'postal_code': str,
+                             'delivery_station': str,
+                             'effective_week': str
+                         },
+                         parse_dates=['dw_ingest_time'])
+    
+    # Transform Core data
+    core_transformed = pd.DataFrame({
+        'plan_identifier': plan_identifiers('amzl_core_', core_df['dw_ingest_time']),
+        'program_type': 'core',
+        'postal_code': core_df['postal_code'],
+        'delivery_station': core_df['delivery_station'],
+        'effective_week': core_df['effective_week'],
+        'dw_update_datetime': core_df['dw_ingest_time']
+    })
+    
+    # Get the intersection of effective weeks
+    ssd_weeks = set(ssd_transformed['effective_week'].unique())
+    core_weeks = set(core_transformed['effective_week'].unique())
+    valid_weeks = ssd_weeks.intersection(core_weeks)
+    
+    print(f"Found {len(valid_weeks)} overlapping weeks between SSD and Core data")
+    
+    # Filter both dataframes to only include overlapping weeks
+    ssd_transformed = ssd_transformed[ssd_transformed['effective_week'].isin(valid_weeks)]
+    core_transformed = core_transformed[core_transformed['effective_week'].isin(valid_weeks)]
+    
+    # Combine both dataframes; the primary key columns are NOT NULL
+    combined_df = pd.concat([ssd_transformed, core_transformed], ignore_index=True)
+    combined_df = combined_df.dropna(subset=['plan_identifier', 'postal_code', 'effective_week'])
+    
+    return combined_df
+
+def plan_partition_name(table, effective_week):
+    """Name of the partition of `table` holding one effective week"""
+    return f"{table}_{re.sub(r'[^0-9a-z]+', '_', effective_week.lower()).strip('_')}"
+
+def plan_partitions(cur, table='jurisdiction_plans'):
+    """{effective_week: partition name} of the partitions attached to `table`"""
+    cur.execute("""
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = %s::regclass
+    """, (table,))
+    # Bounds read "FOR VALUES IN ('2025-01')"
+    return {re.search(r"\('(.*)'\)", bound).group(1): partition for partition, bound in cur.fetchall()}
+
+def is_partitioned(cur, table):
+    """Check whether `table` is a partitioned table"""
+    cur.execute("SELECT relkind FROM pg_class WHERE oid = %s::regclass", (table,))
+    return cur.fetchone()[0] == 'p'
+
+def create_plan_partitions(cur, table, weeks):
+    """Create the (empty) partitions of `table` for the given effective weeks"""
+    for effective_week in sorted(weeks):
+        cur.execute(
+            f"CREATE TABLE {plan_partition_name(table, effective_week)} PARTITION OF {table} FOR VALUES IN (%s)",
+            (effective_week,)
+        )
+
+def attach_plan_partition(cur, table, effective_week, source):
+    """
+    Load one new effective week from `source` into a standalone table and attach it as a partition.
+    The CHECK constraint matching the partition bound lets ATTACH skip its validation scan, and
+    ATTACH only takes a SHARE UPDATE EXCLUSIVE lock, so the live table keeps serving reads.
+    """
+    partition = plan_partition_name(table, effective_week)
+    cur.execute(f"CREATE TABLE {partition} (LIKE {table} INCLUDING DEFAULTS)")
+    cur.execute(f"INSERT INTO {partition} SELECT * FROM {source} WHERE effective_week = %s", (effective_week,))
+    rows = cur.rowcount
+    cur.execute(
+        f"ALTER TABLE {partition} ADD CONSTRAINT {partition}_bound "
+        f"CHECK (effective_week IS NOT NULL AND effective_week = %s)",
+        (effective_week,)
+    )
+    # Builds the partition's copies of the table's indexes
+    cur.execute(f"ALTER TABLE {table} ATTACH PARTITION {partition} FOR VALUES IN (%s)", (effective_week,))
+    cur.execute(f"ALTER TABLE {partition} DROP CONSTRAINT {partition}_bound")
+    cur.execute(f"ANALYZE {partition}")
+    return rows
+
+def load_plans_table(db_config, plans_df):
+    """Full load of jurisdiction_plans, with one partition per effective week"""
+    weeks = set(plans_df['effective_week'].dropna().unique())
+    load_table(
+        db_config, 'jurisdiction_plans', plans_df,
+        setup=lambda cur, staging: create_plan_partitions(cur, staging, weeks)
+    )
+
+def load_jurisdiction_plans(config):
+    """Load and transform jurisdiction plan data into PostgreSQL with COPY"""
+    try:
+        combined_df = read_jurisdiction_plans(
+            config['data']['ssd_jp_filepath'],
+            config['data']['core_jp_filepath']
+        )
         
-        with engine.connect() as connection:
-            connection.execute(create_table_sql)
-            connection.commit()
-            print("Successfully created jurisdiction_plans table")
+        conn = get_connection(config['database'])
+        cur = conn.cursor()
+        try:
+            combined_df = retained_plans(cur, combined_df)
+        finally:
+            cur.close()
+            conn.close()
         
         # Load combined data to PostgreSQL
-        combined_df.to_sql(
-            name='jurisdiction_plans',
-            con=engine,
-            if_exists='replace',
-            index=False,
-            dtype={
-                'plan_identifier': String(100),
-                'program_type': String(10),
-                'postal_code': String(10),
-                'delivery_station': String(50),
-                'effective_week': String(8),
-                'dw_update_datetime': TIMESTAMP
-            }
-        )
-        print("Successfully loaded jurisdiction_plans data")
+        load_plans_table(config['database'], combined_df)
         
     except Exception as e:
         print(f"Error loading jurisdiction plans: {e}")
+
+# Postgres NOTIFY channel the API listens on (see app/plan_events.py)
+PLAN_CHANGES_CHANNEL = "jurisdiction_plans_changed"
+
+def changed_plan_weeks(cur, plans_df):
+    """
+    Find the effective weeks of plans_df that are new or changed. A week has changed when its
+    (plan_identifier, latest dw_update_datetime, row count) partitions differ from the ones stored
+    in jurisdiction_plans, including stored partitions that are no longer in plans_df.
+    """
+    weeks = sorted(plans_df['effective_week'].unique())
+    cur.execute("""
+        SELECT plan_identifier, effective_week, MAX(dw_update_datetime), COUNT(*)
+        FROM jurisdiction_plans
+        WHERE effective_week = ANY(%s)
+        GROUP BY plan_identifier, effective_week
+    """, (weeks,))
+    stored = {}
+    for plan_identifier, effective_week, updated, rows in cur.fetchall():
+        stored.setdefault(effective_week, {})[plan_identifier] = (updated, rows)
+    
+    incoming = {}
+    grouped = plans_df.groupby(['plan_identifier', 'effective_week'])['dw_update_datetime'].agg(['max', 'size'])
+    for (plan_identifier, effective_week), (updated, rows) in grouped.iterrows():
+        updated = None if pd.isna(updated) else updated.to_pydatetime()
+        incoming.setdefault(effective_week, {})[plan_identifier] = (updated, rows)
+    return {effective_week for effective_week, partitions in incoming.items() if stored.get(effective_week) != partitions}
+
+def ingest_jurisdiction_plans(config, ssd_filepath=None, core_filepath=None):
+    """
+    Incrementally ingest jurisdiction plans: replace only the effective weeks that are new or
+    changed, in full, then NOTIFY the API with the affected weeks. The changed weeks end up with the
+    same rows as after a full load. Falls back to a full load when jurisdiction_plans does not exist yet.
+    """
+    started = time.perf_counter()
+    plans_df = read_jurisdiction_plans(
+        ssd_filepath or config['data']['ssd_jp_filepath'],
+        core_filepath or config['data']['core_jp_filepath']
+    )
+    
+    conn = get_connection(config['database'])
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT to_regclass('jurisdiction_plans')")
+        if cur.fetchone()[0] is None:
+            print("jurisdiction_plans does not exist yet; running a full load")
+            load_plans_table(config['database'], retained_plans(cur, plans_df))
+            refresh_station_boundaries(config)
+            return
+        
+        if not is_partitioned(cur, 'jurisdiction_plans'):
+            print("jurisdiction_plans is not partitioned yet; run `python init_db.py partition-plans` first")
+            return
+        
+        plans_df = retained_plans(cur, plans_df, plan_partitions(cur).keys())
+        weeks = sorted(changed_plan_weeks(cur, plans_df))
+        if not weeks:
+            print("No new or changed jurisdiction plan weeks")
+            return
+        
+        delta_df = plans_df[plans_df['effective_week'].isin(weeks)]
+        
+        # Replace the changed weeks in full and notify in one transaction; NOTIFY is delivered on commit.
+        # Re-exported weeks get a new plan_identifier, so their old rows must go too.
+        cur.execute("CREATE TEMP TABLE jurisdiction_plans_delta (LIKE jurisdiction_plans) ON COMMIT DROP")
+        copy_dataframe(cur, 'jurisdiction_plans_delta', delta_df)
+        cur.execute("DELETE FROM jurisdiction_plans WHERE effective_week = ANY(%s)", (weeks,))
+        deleted = cur.rowcount
+        
+        # New weeks are loaded into their own table and attached; existing weeks are updated in place
+        new_weeks = sorted(set(weeks) - plan_partitions(cur).keys())
+        for effective_week in new_weeks:
+            attach_plan_partition(cur, 'jurisdiction_plans', effective_week, 'jurisdiction_plans_delta')
+        cur.execute(
+            "INSERT INTO jurisdiction_plans SELECT * FROM jurisdiction_plans_delta WHERE effective_week <> ALL(%s)",
+            (new_weeks,)
+        )
+        
+        # Re-dissolve the boundaries of the changed weeks in the same transaction
+        cur.execute("SELECT to_regclass('station_boundaries')")
+        if cur.fetchone()[0] is not None:
+            cur.execute("DELETE FROM station_boundaries WHERE effective_week = ANY(%s)", (weeks,))
+            insert_station_boundaries(cur, 'station_boundaries', weeks)
+        else:
+            print("station_boundaries does not exist yet; run `python init_db.py refresh-boundaries`")
+        cur.execute("SELECT pg_notify(%s, %s)", (PLAN_CHANGES_CHANNEL, json.dumps({"effective_weeks": weeks})))
+        conn.commit()
+        
+        seconds = time.perf_counter() - started
+        print(
+            f"Ingested {len(weeks)} changed plan weeks ({', '.join(weeks)}): "
+            f"{len(delta_df):,} rows loaded, {deleted:,} replaced in {seconds:.1f}s "
+            f"({len(delta_df) / max(seconds, 1e-9):,.0f} rows/s)"
+        )
+        if new_weeks:
+            print(f"Attached partitions for new weeks {', '.join(new_weeks)}")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+    
+    if PLAN_RETENTION_WEEKS:
+        prune_jurisdiction_plans(config, PLAN_RETENTION_WEEKS)
+
+# Number of most recent effective weeks kept by `prune-plans` and after each ingest (0 keeps every week)
+PLAN_RETENTION_WEEKS = int(os.getenv("PLAN_RETENTION_WEEKS", "0"))
+
+# Schema that pruned jurisdiction_plans partitions are moved to, unless they are dropped
+PLAN_ARCHIVE_SCHEMA = os.getenv("PLAN_ARCHIVE_SCHEMA", "plans_archive")
+
+def archived_plan_partitions(cur):
+    """Names of the jurisdiction_plans partitions moved to PLAN_ARCHIVE_SCHEMA by prune-plans"""
+    cur.execute("SELECT tablename FROM pg_tables WHERE schemaname = %s", (PLAN_ARCHIVE_SCHEMA,))
+    return {row[0] for row in cur.fetchall()}
+
+def retained_plans(cur, plans_df, stored_weeks=(), keep=PLAN_RETENTION_WEEKS):
+    """
+    Drop the weeks of plans_df that were archived or fall outside the `keep` most recent weeks of
+    plans_df and `stored_weeks`, so pruned weeks are not loaded, notified and pruned again.
+    """
+    archived_partitions = archived_plan_partitions(cur)
+    weeks = set(plans_df['effective_week'].unique())
+    archived = {week for week in weeks if plan_partition_name('jurisdiction_plans', week) in archived_partitions}
+    # Weeks are zero-padded 'YYYY-WW' strings, so they sort chronologically
+    retained = sorted((weeks - archived) | set(stored_weeks))
+    if keep > 0:
+        retained = retained[-keep:]
+    skipped = sorted(weeks - set(retained))
+    if skipped:
+        print(f"Skipping {len(skipped)} archived or expired jurisdiction plan weeks ({', '.join(skipped)})")
+    return plans_df[plans_df['effective_week'].isin(retained)]
+
+def prune_jurisdiction_plans(config, keep=PLAN_RETENTION_WEEKS, drop=False):
+    """
+    Detach the partitions of every effective week but the `keep` most recent ones and move them
+    to PLAN_ARCHIVE_SCHEMA (or drop them), remove those weeks' station boundaries, and notify the API.
+    """
+    conn = get_connection(config['database'])
+    cur = conn.cursor()
+    
+    try:
+        started = time.perf_counter()
+        partitions = plan_partitions(cur)
+        # Weeks are zero-padded 'YYYY-WW' strings, so they sort chronologically
+        pruned = sorted(partitions)[:-keep] if keep > 0 else []
+        if not pruned:
+            print(f"No jurisdiction plan weeks to prune ({len(partitions)} weeks, keeping {keep})")
+            return
+        
+        if not drop:
+            cur.execute(f"CREATE SCHEMA IF NOT EXISTS {PLAN_ARCHIVE_SCHEMA}")
+        archived = archived_plan_partitions(cur)
+        for effective_week in pruned:
+            partition = partitions[effective_week]
+            cur.execute(f"ALTER TABLE jurisdiction_plans DETACH PARTITION {partition}")
+            # A week loaded again while an archived copy exists keeps the archived copy
+            if drop or partition in archived:
+                cur.execute(f"DROP TABLE {partition}")
+            else:
+                cur.execute(f"ALTER TABLE {partition} SET SCHEMA {PLAN_ARCHIVE_SCHEMA}")
+        
+        cur.execute("SELECT to_regclass('station_boundaries')")
+        if cur.fetchone()[0] is not None:
+            cur.execute("DELETE FROM station_boundaries WHERE effective_week = ANY(%s)", (pruned,))
+        # The API drops the pruned weeks from its plan index and caches
+        cur.execute("SELECT pg_notify(%s, %s)", (PLAN_CHANGES_CHANNEL, json.dumps({"effective_weeks": pruned})))
+        conn.commit()
+        
+        print(
+            f"{'Dropped' if drop else f'Archived to {PLAN_ARCHIVE_SCHEMA}'} {len(pruned)} jurisdiction plan weeks "
+            f"({pruned[0]} to {pruned[-1]}) in {time.perf_counter() - started:.1f}s"
+        )
+    except Exception as e:
+        conn.rollback()
+        print(f"Error pruning jurisdiction plans: {e}")
     finally:
-        engine.dispose()
+        cur.close()
+        conn.close()
+
+def partition_jurisdiction_plans(config):
+    """Convert an existing unpartitioned jurisdiction_plans table to one partition per effective week"""
+    conn = get_connection(config['database'])
+    cur = conn.cursor()
+    staging = "jurisdiction_plans_staging"
+    
+    try:
+        if is_partitioned(cur, 'jurisdiction_plans'):
+            print("jurisdiction_plans is already partitioned")
+            return
+        
+        started = time.perf_counter()
+        cur.execute(f"DROP TABLE IF EXISTS {staging}")
+        cur.execute(TABLE_DDL['jurisdiction_plans'].format(table=staging))
+        cur.execute("SELECT DISTINCT effective_week FROM jurisdiction_plans WHERE effective_week IS NOT NULL")
+        create_plan_partitions(cur, staging, [row[0] for row in cur.fetchall()])
+        cur.execute(f"""
+            INSERT INTO {staging}
+            SELECT plan_identifier, program_type, postal_code, delivery_station, effective_week, dw_update_datetime
+            FROM jurisdiction_plans
+            WHERE plan_identifier IS NOT NULL AND postal_code IS NOT NULL AND effective_week IS NOT NULL
+        """)
+        rows = cur.rowcount
+        for name, statement in TABLE_INDEXES['jurisdiction_plans']:
+            cur.execute(statement.format(name=f"{name}_staging", table=staging))
+        cur.execute(f"ANALYZE {staging}")
+        swap_table(cur, 'jurisdiction_plans', staging)
+        conn.commit()
+        print(f"Successfully partitioned jurisdiction_plans: {rows:,} rows in {time.perf_counter() - started:.1f}s")
+    except Exception as e:
+        conn.rollback()
+        print(f"Error partitioning jurisdiction_plans: {e}")
+    finally:
+        cur.close()
+        conn.close()
+
+# Dissolve each station's ZIP polygons per (effective_week, program_type), plus a program_type 'all'
+# row over both programs. Population totals use the latest year of demographics.
+STATION_BOUNDARIES_QUERY = """
+    WITH plans AS (
+        SELECT effective_week, program_type, delivery_station, postal_code
+        FROM jurisdiction_plans
+        {week_filter}
+        UNION
+        SELECT effective_week, 'all', delivery_station, postal_code
+        FROM jurisdiction_plans
+        {week_filter}
+    ),
+    latest AS (
+        SELECT MAX(year) AS year FROM zip_demographics
+    )
+    SELECT
+        p.effective_week,
+        p.program_type,
+        p.delivery_station,
+        COUNT(*) AS total_postal_codes,
+        SUM(d.population) AS population,
+        MAX(latest.year) AS population_year,
+        ST_Multi(ST_CollectionExtract(ST_Union(ST_MakeValid(z.geometry)), 3)) AS geometry,
+        now() AS computed_at
+    FROM plans p
+    CROSS JOIN latest
+    LEFT JOIN zip_codes z ON z.postal_code = p.postal_code
+    LEFT JOIN zip_demographics d ON d.postal_code = p.postal_code AND d.year = latest.year
+    GROUP BY p.effective_week, p.program_type, p.delivery_station
+"""
+
+def insert_station_boundaries(cur, table, weeks=None):
+    """Dissolve station boundaries into `table`, for every week or only the given ones"""
+    started = time.perf_counter()
+    week_filter = "WHERE effective_week = ANY(%(weeks)s)" if weeks is not None else ""
+    cur.execute(f"""
+        INSERT INTO {table} (
+            effective_week, program_type, delivery_station, total_postal_codes,
+            population, population_year, geometry, computed_at
+        )
+        {STATION_BOUNDARIES_QUERY.format(week_filter=week_filter)}
+    """, {"weeks": list(weeks) if weeks is not None else None})
+    stations = cur.rowcount
+    
+    # Area and perimeter are geodesic; simplified tiers are built like the zip_codes ones
+    assignments = ", ".join([
+        "area_km2 = ST_Area(geometry::geography) / 1e6",
+        "perimeter_km = ST_Perimeter(geometry::geography) / 1e3"
+    ] + [
+        f"{column} = ST_Multi(ST_SimplifyPreserveTopology(geometry, {tolerance}))"
+        for column, tolerance in GEOMETRY_TIERS
+        if column != 'geometry'
+    ])
+    cur.execute(f"UPDATE {table} SET {assignments} {week_filter}", {"weeks": list(weeks) if weeks is not None else None})
+    print(f"Dissolved {stations:,} station boundaries in {time.perf_counter() - started:.1f}s")
+
+def refresh_station_boundaries(config):
+    """Rebuild station_boundaries for every week, swap it in, and notify the API"""
+    conn = get_connection(config['database'])
+    cur = conn.cursor()
+    staging = "station_boundaries_staging"
+    
+    try:
+        cur.execute(f"DROP TABLE IF EXISTS {staging}")
+        cur.execute(TABLE_DDL['station_boundaries'].format(table=staging))
+        insert_station_boundaries(cur, staging)
+        for name, statement in TABLE_INDEXES['station_boundaries']:
+            cur.execute(statement.format(name=f"{name}_staging", table=staging))
+        cur.execute(f"ANALYZE {staging}")
+        swap_table(cur, 'station_boundaries', staging)
+        
+        # The API drops the cached boundaries of the notified weeks
+        cur.execute("SELECT array_agg(DISTINCT effective_week) FROM station_boundaries")
+        weeks = cur.fetchone()[0] or []
+        cur.execute("SELECT pg_notify(%s, %s)", (PLAN_CHANGES_CHANNEL, json.dumps({"effective_weeks": weeks})))
+        conn.commit()
+        print("Successfully refreshed station_boundaries")
+    except Exception as e:
+        conn.rollback()
+        print(f"Error refreshing station boundaries: {e}")
+    finally:
+        cur.close()
+        conn.close()
+
+def create_plan_indexes(config):
+    """
+    Build the jurisdiction_plans indexes that are missing, for databases loaded before they existed,
+    and drop the unused trigram index of earlier builds.
+    tests/test_query_plans.py checks that the API's statements use them.
+    """
+    conn = get_connection(config['database'])
+    cur = conn.cursor()
+    
+    try:
+        # Station search runs on the in-memory plan index, so the trigram index is not used
+        cur.execute("DROP INDEX IF EXISTS idx_jurisdiction_plans_delivery_station_trgm")
+        for name, statement in TABLE_INDEXES['jurisdiction_plans']:
+            started = time.perf_counter()
+            cur.execute(statement.replace("INDEX {name}", "INDEX IF NOT EXISTS {name}").format(
+                name=name, table='jurisdiction_plans'
+            ))
+            print(f"Ensured {name} in {time.perf_counter() - started:.1f}s")
+        cur.execute("ANALYZE jurisdiction_plans")
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        print(f"Error creating jurisdiction plan indexes: {e}")
+    finally:
+        cur.close()
+        conn.close()
+
+# Tables served by the GeoParquet backend (app/geoparquet.py)
+EXPORT_TABLES = [
+    "zip_codes", "zip_demographics", "zip_code_stats",
+    "zip_demographics_year_stats", "jurisdiction_plans", "station_boundaries"
+]
+
+def export_geoparquet(config, out_dir="data/geoparquet"):
+    """Export the tables the API serves to GeoParquet/Parquet files for DATA_BACKEND=geoparquet"""
+    # Imported lazily: pyarrow is only needed for the export
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # Postgres column types to Arrow types; numerics are exported as doubles
+    arrow_types = {
+        "text": pa.string(), "character varying": pa.string(),
+        "integer": pa.int32(), "bigint": pa.int64(), "smallint": pa.int16(),
+        "double precision": pa.float64(), "numeric": pa.float64(), "real": pa.float32(),
+        "boolean": pa.bool_(), "date": pa.date32(),
+        "timestamp without time zone": pa.timestamp("us"),
+        "timestamp with time zone": pa.timestamp("us", tz="UTC"),
+    }
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    conn = get_connection(config['database'])
+
+    try:
+        for table in EXPORT_TABLES:
+            started = time.perf_counter()
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT column_name, data_type, udt_name
+                    FROM information_schema.columns
+                    WHERE table_schema = 'public' AND table_name = %s
+                    ORDER BY ordinal_position
+                """, (table,))
+                columns = cur.fetchall()
+            if not columns:
+                print(f"Skipping {table}: table does not exist")
+                continue
+
+            # Geometries as WKB (GeoParquet's encoding), numerics as doubles
+            selects, fields, geometry_columns = [], [], []
+            for name, data_type, udt_name in columns:
+                if udt_name == "geometry":
+                    selects.append(f"ST_AsBinary({name}) AS {name}")
+                    fields.append(pa.field(name, pa.binary()))
+                    geometry_columns.append(name)
+                elif data_type == "numeric":
+                    selects.append(f"{name}::double precision AS {name}")
+                    fields.append(pa.field(name, pa.float64()))
+                else:
+                    selects.append(name)
+                    fields.append(pa.field(name, arrow_types.get(data_type, pa.string())))
+
+            schema = pa.schema(fields)
+            if geometry_columns:
+                primary = "geometry" if "geometry" in geometry_columns else geometry_columns[0]
+                schema = schema.with_metadata({"geo": json.dumps({
+                    "version": "1.0.0",
+                    "primary_column": primary,
+                    "columns": {name: {"encoding": "WKB", "geometry_types": []} for name in geometry_columns}
+                })})
+
+            # Written to a temporary file and renamed, so a running API never reads a partial file
+            path = out_dir / f"{table}.parquet"
+            partial = out_dir / f"{table}.parquet.partial"
+            rows = 0
+            # Named (server-side) cursor so large tables are streamed in chunks
+            with conn.cursor(name=f"export_{table}") as cur, pq.ParquetWriter(partial, schema) as writer:
+                cur.execute(f"SELECT {', '.join(selects)} FROM {table}")
+                while True:
+                    chunk = cur.fetchmany(COPY_CHUNK_ROWS)
+                    if not chunk:
+                        break
+                    df = pd.DataFrame(chunk, columns=[name for name, _, _ in columns])
+                    for name in geometry_columns:
+                        df[name] = df[name].map(lambda value: bytes(value) if value is not None else None)
+                    writer.write_table(pa.Table.from_pandas(df, schema=schema, preserve_index=False))
+                    rows += len(chunk)
+            conn.rollback()
+            os.replace(partial, path)
+            print(f"Exported {rows:,} rows of {table} to {path} in {time.perf_counter() - started:.1f}s")
+
+        print(f"Successfully exported GeoParquet data to {out_dir}")
+    except Exception as e:
+        print(f"Error exporting GeoParquet data: {e}")
+    finally:
+        conn.close()
+
+def watch_jurisdiction_plans(config, ssd_filepath=None, core_filepath=None, interval=30):
+    """Poll the plan CSVs and run an incremental ingest whenever one of them is modified"""
+    filepaths = [
+        ssd_filepath or config['data']['ssd_jp_filepath'],
+        core_filepath or config['data']['core_jp_filepath']
+    ]
+    
+    def modified_times():
+        return [os.path.getmtime(filepath) if os.path.exists(filepath) else None for filepath in filepaths]
+    
+    print(f"Watching {', '.join(filepaths)} every {interval}s (Ctrl+C to stop)")
+    last_seen = None
+    try:
+        while True:
+            current = modified_times()
+            if current != last_seen and None not in current:
+                try:
+                    ingest_jurisdiction_plans(config, *filepaths)
+                    last_seen = current
+                except Exception as e:
+                    print(f"Error ingesting jurisdiction plans: {e}")
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("Stopped watching jurisdiction plans")
 
 def main():
     """Main function to initialize database and load data"""
+    parser = argparse.ArgumentParser(description="Initialize the database or ingest jurisdiction plans")
+    subparsers = parser.add_subparsers(dest="command")
+    
+    ingest = subparsers.add_parser("ingest-plans", help="Incrementally ingest new or changed jurisdiction plans")
+    ingest.add_argument("--ssd", help="SSD jurisdiction plan CSV (default: AMZL_SSD_JP_FILEPATH)")
+    ingest.add_argument("--core", help="Core jurisdiction plan CSV (default: AMZL_CORE_JP_FILEPATH)")
+    ingest.add_argument("--watch", type=int, metavar="SECONDS", help="Keep polling the CSVs and ingest on every change")
+    
+    subparsers.add_parser("refresh-stats", help="Rebuild the precomputed /stats/ and /years/ tables")
+    subparsers.add_parser("refresh-boundaries", help="Rebuild the dissolved station boundaries for every week")
+    subparsers.add_parser("migrate-zip-codes", help="Convert zip_codes lat/long to numeric and add the centroid and level-of-detail columns")
+    
+    prune = subparsers.add_parser("prune-plans", help="Detach and archive jurisdiction plan weeks beyond the retention window")
+    prune.add_argument("--keep", type=int, default=PLAN_RETENTION_WEEKS or None, required=not PLAN_RETENTION_WEEKS,
+                       help="Most recent weeks to keep (default: PLAN_RETENTION_WEEKS)")
+    prune.add_argument("--drop", action="store_true", help=f"Drop pruned partitions instead of moving them to {PLAN_ARCHIVE_SCHEMA}")
+    subparsers.add_parser("partition-plans", help="Convert an unpartitioned jurisdiction_plans table to weekly partitions")
+    
+    subparsers.add_parser("create-indexes", help="Build missing jurisdiction_plans indexes on an existing database")
+    
+    export = subparsers.add_parser("export-parquet", help="Export the served tables to GeoParquet for DATA_BACKEND=geoparquet")
+    export.add_argument("--out", default=os.getenv("GEOPARQUET_DIR", "data/geoparquet"), help="Output directory (default: GEOPARQUET_DIR)")
+    args = parser.parse_args()
+    
     print("Loading configuration...")
     config = load_config()
     
+    if args.command == "ingest-plans":
+        if args.watch:
+            watch_jurisdiction_plans(config, args.ssd, args.core, args.watch)
+        else:
+            ingest_jurisdiction_plans(config, args.ssd, args.core)
+        return
+    
+    if args.command == "refresh-stats":
+        refresh_statistics(config)
+        return
+    
+    if args.command == "refresh-boundaries":
+        refresh_station_boundaries(config)
+        return
+    
+    if args.command == "migrate-zip-codes":
+        migrate_zip_codes(config)
+        return
+    
+    if args.command == "prune-plans":
+        prune_jurisdiction_plans(config, args.keep, args.drop)
+        return
+    
+    if args.command == "partition-plans":
+        partition_jurisdiction_plans(config)
+        return
+    
+    if args.command == "create-indexes":
+        create_plan_indexes(config)
+        return
+    
+    if args.command == "export-parquet":
+        export_geoparquet(config, args.out)
+        return
+    
     print("Initializing PostGIS...")
     init_postgis(config['database'])
     
     print("\nLoading data into PostgreSQL...")
     load_data(config)
     
+    print("\nRefreshing statistics...")
+    refresh_statistics(config)
+    
     print("\nLoading jurisdiction plans...")
     load_jurisdiction_plans(config)
+    if PLAN_RETENTION_WEEKS:
+        prune_jurisdiction_plans(config, PLAN_RETENTION_WEEKS)
+    
+    print("\nBuilding station boundaries...")
+    refresh_station_boundaries(config)
     
     print("\nDatabase initialization complete!")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,6 @@
+import os
+
+# app.database creates its engine at import time; no connection is opened until a query runs
+os.environ.setdefault("DATABASE_URL", "postgresql+psycopg2://test@localhost/test")
+os.environ.setdefault("PLAN_CHANGE_LISTENER", "false")
+os.environ["DATA_BACKEND"] = "postgis"
@@ -0,0 +1,109 @@
+import mapbox_vector_tile
+import numpy as np
+import pandas as pd
+import pytest
+import shapely
+from app import crud, geoparquet, plan_index
+from app.lod import FULL_DETAIL, GEOMETRY_TIERS
+
+# Two adjacent ZIP codes inside tile 10/164/357 (Bellevue, WA) and one far outside it
+ZIP_CODES = {
+    "98004": shapely.box(-122.20, 47.60, -122.15, 47.65),
+    "98005": shapely.box(-122.15, 47.60, -122.10, 47.65),
+    "50001": shapely.box(-100.00, 40.00, -99.90, 40.10),
+}
+
+PLANS = [
+    ("plan", "core", "98004", "DST1", "2025-01", None),
+    ("plan", "ssd", "98004", "DST2", "2025-01", None),
+    ("plan", "ssd", "98005", "DST2", "2025-01", None),
+]
+
+def zip_codes_table():
+    geometries = shapely.to_wkb(np.array(list(ZIP_CODES.values()), dtype=object))
+    table = pd.DataFrame({
+        "postal_code": list(ZIP_CODES),
+        "lat": [geometry.centroid.y for geometry in ZIP_CODES.values()],
+        "long": [geometry.centroid.x for geometry in ZIP_CODES.values()],
+    })
+    for column, _ in GEOMETRY_TIERS:
+        table[column] = geometries
+    return table
+
+@pytest.fixture
+def repository(monkeypatch):
+    """GeoParquetRepository over in-memory tables; tables missing from `tables` behave like missing files"""
+    def build(**tables):
+        def read_table(directory, table, columns=None):
+            frame = tables.get(table)
+            if frame is None:
+                return None
+            return frame[columns] if columns is not None else frame
+
+        monkeypatch.setattr(geoparquet, "read_table", read_table)
+        monkeypatch.setattr(plan_index, "_current_index", plan_index.build_index(PLANS, version=1))
+        return geoparquet.GeoParquetRepository("unused")
+    return build
+
+def decode_features(tile):
+    layer = mapbox_vector_tile.decode(tile)["zip_codes"]
+    return {feature["properties"]["postal_code"]: feature for feature in layer["features"]}
+
+def test_tile_attributes(repository):
+    demographics = pd.DataFrame({
+        "postal_code": ["98004", "98004", "98005"],
+        "year": [2019, 2020, 2020],
+        "population": [900.0, 1000.0, float("nan")],
+    })
+    repo = repository(zip_codes=zip_codes_table(), zip_demographics=demographics)
+
+    features = decode_features(repo.tile(10, 164, 357, "2025-01", "all", 2020))
+
+    assert sorted(features) == ["98004", "98005"]
+    assert features["98004"]["properties"] == {"postal_code": "98004", "delivery_station": "DST1,DST2", "population": 1000}
+    assert features["98005"]["properties"] == {"postal_code": "98005", "delivery_station": "DST2"}
+    assert features["98004"]["geometry"]["type"] == "Polygon"
+
+def test_tile_filters_program_type(repository):
+    repo = repository(zip_codes=zip_codes_table())
+
+    features = decode_features(repo.tile(10, 164, 357, "2025-01", "core", 2020))
+
+    assert features["98004"]["properties"]["delivery_station"] == "DST1"
+    assert "delivery_station" not in features["98005"]["properties"]
+
+def test_tile_without_zip_codes_is_empty(repository):
+    repo = repository(zip_codes=zip_codes_table())
+
+    assert repo.tile(10, 0, 0, "2025-01", "all", 2020) == b""
+
+def test_missing_optional_tables(repository):
+    repo = repository(zip_codes=zip_codes_table())
+
+    assert repo.demographics() == {}
+    with pytest.raises(ValueError):
+        repo.station_boundaries("2025-01", "all", FULL_DETAIL)
+
+def nearby_postal_codes(repo, **params):
+    response = crud.get_nearby_zip_codes(repo, 47.62, -122.19, **params)
+    return [(feature["properties"]["postal_code"], feature["properties"]["distance_m"]) for feature in response["features"]]
+
+def test_nearby_zip_codes_are_ordered_by_distance(repository):
+    repo = repository(zip_codes=zip_codes_table())
+
+    nearby = nearby_postal_codes(repo)
+
+    assert [postal_code for postal_code, _ in nearby] == ["98004", "98005", "50001"]
+    assert [distance for _, distance in nearby] == sorted(distance for _, distance in nearby)
+
+@pytest.mark.parametrize("params, expected", [
+    ({"limit": 1}, ["98004"]),
+    ({"limit": 2}, ["98004", "98005"]),
+    ({"radius": 10000.0}, ["98004", "98005"]),
+    ({"radius": 10000.0, "limit": 1}, ["98004"]),
+    ({"radius": 100.0}, []),
+])
+def test_nearby_zip_codes_limit_and_radius(repository, params, expected):
+    repo = repository(zip_codes=zip_codes_table())
+
+    assert [postal_code for postal_code, _ in nearby_postal_codes(repo, **params)] == expected
@@ -0,0 +1,50 @@
+import init_db
+from app.lod import GEOMETRY_TIERS
+
+class RecordingCursor:
+    """Stands in for a psycopg2 cursor: records every statement issued"""
+
+    def __init__(self):
+        self.statements = []
+        self.rowcount = 0
+
+    def execute(self, statement, params=None):
+        self.statements.append(" ".join(statement.split()))
+
+    def close(self):
+        pass
+
+class RecordingConnection:
+    def __init__(self):
+        self.cursor_ = RecordingCursor()
+        self.committed = False
+
+    def cursor(self):
+        return self.cursor_
+
+    def commit(self):
+        self.committed = True
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+def test_migrate_adds_and_fills_the_level_of_detail_columns(monkeypatch):
+    connection = RecordingConnection()
+    monkeypatch.setattr(init_db, "get_connection", lambda db_config: connection)
+    monkeypatch.setattr(init_db, "refresh_statistics", lambda config: None)
+
+    init_db.migrate_zip_codes({"database": {}})
+
+    statements = connection.cursor_.statements
+    assert connection.committed
+    alter = next(statement for statement in statements if statement.startswith("ALTER TABLE zip_codes"))
+    update = next(statement for statement in statements if statement.startswith("UPDATE zip_codes"))
+    for column, tolerance in GEOMETRY_TIERS[1:]:
+        assert f"ADD COLUMN IF NOT EXISTS {column} geometry(MULTIPOLYGON, 4326)" in alter
+        assert f"{column} = ST_Multi(ST_SimplifyPreserveTopology(geometry, {tolerance}))" in update
+        assert f"CREATE INDEX IF NOT EXISTS idx_zip_codes_{column} ON zip_codes USING gist ({column})" in statements
+    assert "centroid = ST_SetSRID(ST_MakePoint(long, lat), 4326)" in update
+    assert "NOTIFY zip_codes_changed" in statements
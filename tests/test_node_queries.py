@@ -0,0 +1,90 @@
+import pytest
+from app import crud, plan_index
+from app.geometry_cache import geometry_cache
+
+class RecordingQuery:
+    """Chainable stand-in for a SQLAlchemy Query that returns no rows"""
+
+    def filter(self, *criteria):
+        return self
+
+    def all(self):
+        return []
+
+    def yield_per(self, count):
+        return []
+
+class RecordingSession:
+    """Stands in for a SQLAlchemy Session: records every statement issued and returns no rows"""
+
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, statement, params=None):
+        self.statements.append(statement)
+        return []
+
+    def query(self, *entities):
+        self.statements.append(entities)
+        return RecordingQuery()
+
+def plan_rows(total_plans, stations=10):
+    """
+    Plans of one week, two per ZIP code: ZIP n is served by stations n and n + 1 (mod `stations`),
+    so each station shares ZIP codes with its two neighbours in a ring.
+    """
+    return [
+        ("plan", "ssd", f"{position // 2:05d}", f"DST{(position // 2 + position % 2) % stations}", "2025-01", None)
+        for position in range(total_plans)
+    ]
+
+@pytest.fixture
+def use_plans(monkeypatch):
+    def install(total_plans):
+        monkeypatch.setattr(plan_index, "_current_index", plan_index.build_index(plan_rows(total_plans), version=1))
+        geometry_cache.clear()
+    return install
+
+def count_node_statements(use_plans, total_plans):
+    use_plans(total_plans)
+    db = RecordingSession()
+    response = crud.get_node_data(
+        db, "DST", effective_week="2025-01", include_geometry=True, include_population=True, recursive=True
+    )
+    assert len(response["features"]) == total_plans
+    return len(db.statements)
+
+def count_node_reverse_statements(use_plans, total_plans):
+    use_plans(total_plans)
+    db = RecordingSession()
+    postal_codes = [f"{position:05d}" for position in range(total_plans // 2)]
+    response = crud.get_node_reverse_data(
+        db, postal_codes, effective_week="2025-01", include_geometry=True, include_population=True
+    )
+    assert len(response["features"]) == total_plans
+    return len(db.statements)
+
+def test_node_statement_count_does_not_grow_with_plans(use_plans):
+    counts = [count_node_statements(use_plans, total_plans) for total_plans in (10, 100, 1000)]
+    # ZIP attributes, geometries and demographics: one batched statement each
+    assert counts == [3, 3, 3]
+
+def test_node_reverse_statement_count_does_not_grow_with_plans(use_plans):
+    counts = [count_node_reverse_statements(use_plans, total_plans) for total_plans in (10, 100, 1000)]
+    assert counts == [3, 3, 3]
+
+@pytest.mark.parametrize("depth", [1, 2])
+def test_depth_implies_recursive(use_plans, depth):
+    use_plans(40)
+    _, metadata = crud.get_node_plans(RecordingSession(), "DST1", effective_week="2025-01", depth=depth)
+    assert metadata["recursive"] is True
+    assert metadata["depth"] == depth
+    # DST1 shares ZIP codes with DST0 and DST2 (hop 1), which share with DST9 and DST3 (hop 2)
+    assert {station for station, hops in metadata["station_hops"].items() if hops == 1} == {"DST0", "DST2"}
+    assert max(metadata["station_hops"].values()) == depth
+
+def test_no_depth_is_not_recursive(use_plans):
+    use_plans(40)
+    _, metadata = crud.get_node_plans(RecordingSession(), "DST1", effective_week="2025-01")
+    assert metadata["recursive"] is False
+    assert metadata["station_hops"] == {"DST1": 0}
@@ -0,0 +1,69 @@
+from app import plan_events, plan_index
+from app.geometry_cache import geometry_cache, tile_cache
+
+def test_zip_code_changes_drop_cached_geometries_and_tiles():
+    geometry_cache.put(("98004", "geometry:6"), b'{"type":"MultiPolygon"}')
+    tile_cache.put(("2025-01", "all", 2020, 10, 164, 357), b"tile")
+
+    plan_events.apply_zip_code_changes()
+
+    assert geometry_cache.get(("98004", "geometry:6")) is None
+    assert tile_cache.get(("2025-01", "all", 2020, 10, 164, 357)) is None
+
+class FakeConnection:
+    """Stands in for a pooled connection whose psycopg2 connection never receives a notification"""
+
+    def __init__(self):
+        self.dbapi_connection = self
+        self.autocommit = False
+        self.listening = []
+        self.notifies = []
+
+    def detach(self):
+        pass
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def execute(self, statement):
+        self.listening.append(statement)
+
+    def fileno(self):
+        raise OSError("connection closed")
+
+    def close(self):
+        pass
+
+def test_listener_reconnects_and_reloads_everything(monkeypatch):
+    connections = [OSError("connection refused"), FakeConnection(), FakeConnection()]
+    reloads = []
+
+    def raw_connection():
+        connection = connections.pop(0)
+        if isinstance(connection, Exception):
+            raise connection
+        return connection
+
+    def reload_all(db):
+        reloads.append(db)
+        if len(reloads) == 2:
+            listener.stop()
+        return plan_index.build_index([])
+
+    monkeypatch.setattr(plan_events, "LISTENER_RETRY_SECONDS", 0)
+    monkeypatch.setattr(plan_events.engine, "raw_connection", raw_connection)
+    monkeypatch.setattr(plan_events, "get_db", lambda: (db for db in [None]))
+    monkeypatch.setattr(plan_events, "reload_all", reload_all)
+    listener = plan_events.PlanChangeListener(poll_seconds=0)
+
+    # The first attempt fails to connect, the second loses its connection while listening
+    listener.run()
+
+    assert len(reloads) == 2
+    assert not connections
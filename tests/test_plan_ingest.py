@@ -0,0 +1,111 @@
+import os
+from datetime import datetime
+import pandas as pd
+import pytest
+from sqlalchemy.engine import make_url
+import init_db
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+# Scratch schema the database tests load into, so they never touch the loaded tables
+SCHEMA = "ingest_test"
+
+SSD_UPLOAD = datetime(2025, 1, 2, 8, 0)
+SSD_REEXPORT = datetime(2025, 1, 9, 8, 0)
+CORE_UPLOAD = datetime(2025, 1, 3, 8, 0)
+
+def plans(*rows):
+    """jurisdiction_plans rows as read_jurisdiction_plans() returns them"""
+    return pd.DataFrame([
+        {
+            "plan_identifier": f"amzl_{program_type}_{updated}",
+            "program_type": program_type,
+            "postal_code": postal_code,
+            "delivery_station": delivery_station,
+            "effective_week": effective_week,
+            "dw_update_datetime": pd.Timestamp(updated),
+        }
+        for program_type, postal_code, delivery_station, effective_week, updated in rows
+    ])
+
+STORED = plans(
+    ("ssd", "98004", "DST1", "2025-01", SSD_UPLOAD),
+    ("ssd", "98005", "DST1", "2025-01", SSD_UPLOAD),
+    ("core", "98004", "DST2", "2025-01", CORE_UPLOAD),
+    ("ssd", "98004", "DST1", "2025-02", SSD_UPLOAD),
+)
+
+# 2025-01 is re-exported under a new plan identifier without its core plan, 2025-02 is unchanged
+# and 2025-03 is new
+INCOMING = plans(
+    ("ssd", "98004", "DST3", "2025-01", SSD_REEXPORT),
+    ("ssd", "98006", "DST1", "2025-01", SSD_REEXPORT),
+    ("ssd", "98004", "DST1", "2025-02", SSD_UPLOAD),
+    ("ssd", "98005", "DST2", "2025-03", SSD_REEXPORT),
+)
+
+class StoredPlansCursor:
+    """Stands in for a psycopg2 cursor over a jurisdiction_plans table holding `plans_df`"""
+
+    def __init__(self, plans_df):
+        self.plans_df = plans_df
+
+    def execute(self, statement, params=None):
+        (self.weeks,) = params
+
+    def fetchall(self):
+        plans_df = self.plans_df[self.plans_df["effective_week"].isin(self.weeks)]
+        grouped = plans_df.groupby(["plan_identifier", "effective_week"])["dw_update_datetime"].agg(["max", "size"])
+        return [
+            (plan_identifier, effective_week, updated.to_pydatetime(), rows)
+            for (plan_identifier, effective_week), (updated, rows) in grouped.iterrows()
+        ]
+
+def test_changed_weeks_include_reexported_and_removed_plans():
+    assert init_db.changed_plan_weeks(StoredPlansCursor(STORED), INCOMING) == {"2025-01", "2025-03"}
+
+def test_unchanged_weeks_are_skipped():
+    assert init_db.changed_plan_weeks(StoredPlansCursor(STORED), STORED) == set()
+
+@pytest.fixture
+def db_config(monkeypatch):
+    """psycopg2 settings for TEST_DATABASE_URL with an empty scratch schema first on the search_path"""
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    url = make_url(TEST_DATABASE_URL)
+    config = {**url.translate_connect_args(username="user"), **url.query, "options": f"-c search_path={SCHEMA}"}
+    conn = init_db.get_connection(config)
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        cur.execute(f"CREATE SCHEMA {SCHEMA}")
+
+    # No retention window or archived weeks apply to the scratch schema
+    monkeypatch.setattr(init_db, "PLAN_RETENTION_WEEKS", 0)
+    monkeypatch.setattr(init_db, "retained_plans", lambda cur, plans_df, stored_weeks=(): plans_df)
+    yield config
+
+    with conn.cursor() as cur:
+        cur.execute(f"DROP SCHEMA {SCHEMA} CASCADE")
+    conn.close()
+
+def stored_rows(db_config):
+    conn = init_db.get_connection(db_config)
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT * FROM jurisdiction_plans ORDER BY effective_week, plan_identifier, postal_code")
+            return cur.fetchall()
+    finally:
+        conn.close()
+
+def test_ingest_matches_a_full_load(db_config, monkeypatch):
+    init_db.load_plans_table(db_config, STORED)
+    monkeypatch.setattr(init_db, "read_jurisdiction_plans", lambda ssd_filepath, core_filepath: INCOMING)
+    init_db.ingest_jurisdiction_plans({"database": db_config}, "ssd.csv", "core.csv")
+    ingested = stored_rows(db_config)
+
+    init_db.load_plans_table(db_config, INCOMING)
+
+    assert ingested == stored_rows(db_config)
+    assert {row[4] for row in ingested} == {"2025-01", "2025-02", "2025-03"}
+    assert not any(row[1] == "core" for row in ingested)
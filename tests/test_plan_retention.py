@@ -0,0 +1,37 @@
+import pandas as pd
+import pytest
+import init_db
+
+class ArchiveCursor:
+    """Stands in for a psycopg2 cursor of a database whose archive schema holds the given tables"""
+
+    def __init__(self, archived):
+        self.archived = archived
+
+    def execute(self, statement, params=None):
+        assert "pg_tables" in statement and params == (init_db.PLAN_ARCHIVE_SCHEMA,)
+
+    def fetchall(self):
+        return [(name,) for name in self.archived]
+
+def plans(*weeks):
+    return pd.DataFrame({"plan_identifier": "plan", "postal_code": "98004", "effective_week": list(weeks)})
+
+def retained_weeks(archived, plans_df, stored_weeks=(), keep=0):
+    retained = init_db.retained_plans(ArchiveCursor(archived), plans_df, stored_weeks, keep)
+    return sorted(retained["effective_week"])
+
+def test_archived_weeks_are_skipped():
+    assert retained_weeks({"jurisdiction_plans_2025_01"}, plans("2025-01", "2025-02")) == ["2025-02"]
+
+@pytest.mark.parametrize("stored_weeks, expected", [
+    ((), ["2025-03", "2025-04"]),
+    (("2025-05",), ["2025-04"]),
+    (("2025-05", "2025-06"), []),
+])
+def test_weeks_outside_the_retention_window_are_skipped(stored_weeks, expected):
+    assert retained_weeks(set(), plans("2025-01", "2025-02", "2025-03", "2025-04"), stored_weeks, keep=2) == expected
+
+def test_archived_weeks_do_not_count_toward_the_window():
+    archived = {"jurisdiction_plans_2025_04"}
+    assert retained_weeks(archived, plans("2025-02", "2025-03", "2025-04"), keep=2) == ["2025-02", "2025-03"]
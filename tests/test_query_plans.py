@@ -0,0 +1,193 @@
+"""
+EXPLAIN the statements the repository runs and check that each one can use its indexes, and check
+the results of the statements added with those indexes. Runs against a database loaded by init_db.py, given by TEST_DATABASE_URL, and is skipped without it.
+Sequential scans are disabled, so small development databases report whether an index is usable
+rather than whether the planner prefers it at their size.
+"""
+import math
+import os
+import pytest
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import Session
+from app import crud, models, repository
+from app.lod import FULL_DETAIL, resolve_detail
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+
+# Zoom level of the tile checked for /tiles
+TILE_ZOOM = 12
+
+def explain_values(plan, key):
+    """Values of `key` (e.g. "Index Name", "Relation Name") in an EXPLAIN (FORMAT JSON) plan node and its children"""
+    values = {plan[key]} if key in plan else set()
+    for child in plan.get("Plans", []):
+        values |= explain_values(child, key)
+    return values
+
+def tile_for(lat, lon, z):
+    """(x, y) of the web map tile containing a point at zoom `z`"""
+    n = 2 ** z
+    x = int((lon + 180) / 360 * n)
+    y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+    return x, y
+
+@pytest.fixture(scope="module")
+def connection():
+    engine = create_engine(TEST_DATABASE_URL)
+    with engine.connect() as connection:
+        connection.execute(text("SET enable_seqscan = off"))
+        yield connection
+        connection.rollback()
+    engine.dispose()
+
+@pytest.fixture(scope="module")
+def sample(connection):
+    """A plan row of the database whose ZIP code has a centroid, to bind the statements to real values"""
+    row = connection.execute(text("""
+        SELECT p.effective_week, p.program_type, p.delivery_station, p.postal_code, z.lat, z.long
+        FROM jurisdiction_plans p
+        JOIN zip_codes z ON z.postal_code = p.postal_code
+        WHERE z.lat IS NOT NULL
+        LIMIT 1
+    """)).first()
+    if row is None:
+        pytest.skip("jurisdiction_plans has no rows with a ZIP code centroid")
+    return row
+
+def explain(connection, statement, params):
+    """
+    EXPLAIN a statement with its parameters inlined by the driver, as the API's queries are sent,
+    and return (table index names used, relations scanned). Partition scans name the partition's
+    copy of an index, which is reported as the index of the partitioned table it belongs to.
+    """
+    compiled = statement.compile(dialect=connection.dialect, compile_kwargs={"render_postcompile": True})
+    parameters = {**compiled.params, **params}
+    plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", parameters).scalar()[0]["Plan"]
+
+    indexes = explain_values(plan, "Index Name")
+    parents = dict(connection.execute(text("""
+        SELECT c.relname, parent.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class parent ON parent.oid = i.inhparent
+        WHERE c.relname = ANY(:names)
+    """), {"names": list(indexes)}).all())
+    return {parents.get(name, name) for name in indexes}, explain_values(plan, "Relation Name")
+
+def test_plan_rows_of_a_week_scan_one_partition(connection, sample):
+    # POST /plans/reload?effective_weeks=... and plan change notifications
+    statement = repository.SqlRepository(Session(bind=connection)).plan_rows([sample.effective_week]).statement
+
+    _, relations = explain(connection, statement, {})
+
+    assert len(relations) == 1
+
+def test_station_plans_of_a_week(connection, sample):
+    # Plans of one delivery station within a week and program
+    statement = select(models.JurisdictionPlan).where(
+        models.JurisdictionPlan.effective_week == sample.effective_week,
+        models.JurisdictionPlan.program_type == sample.program_type,
+        models.JurisdictionPlan.delivery_station == sample.delivery_station
+    )
+
+    indexes, _ = explain(connection, statement, {})
+
+    assert indexes == {"idx_jurisdiction_plans_week_program_station"}
+
+def test_postal_code_plans_of_a_week(connection, sample):
+    # Reverse lookups: plans of a set of postal codes within a week
+    statement = select(models.JurisdictionPlan).where(
+        models.JurisdictionPlan.effective_week == sample.effective_week,
+        models.JurisdictionPlan.postal_code.in_([sample.postal_code])
+    )
+
+    indexes, _ = explain(connection, statement, {})
+
+    assert indexes == {"idx_jurisdiction_plans_week_postal_code"}
+
+def test_tile(connection, sample):
+    x, y = tile_for(sample.lat, sample.long, TILE_ZOOM)
+    statement = repository.tile_query(resolve_detail(zoom=TILE_ZOOM).column)
+
+    indexes, _ = explain(connection, statement, {
+        "z": TILE_ZOOM,
+        "x": x,
+        "y": y,
+        "effective_week": sample.effective_week,
+        "program_type": sample.program_type,
+        "year": None
+    })
+
+    assert "idx_zip_codes_geometry" in indexes
+    assert "idx_jurisdiction_plans_week_postal_code" in indexes
+
+@pytest.mark.parametrize("radius", [None, 5000.0])
+def test_nearby_zip_codes(connection, sample, radius):
+    indexes, _ = explain(connection, repository.nearby_zip_codes_query(radius), {
+        "lat": sample.lat,
+        "lon": sample.long,
+        "radius": radius,
+        "radius_degrees": repository.radius_degrees(sample.lat, radius) if radius is not None else None,
+        "candidates": 40,
+        "limit": 10
+    })
+
+    assert "idx_zip_codes_centroid" in indexes
+
+@pytest.mark.parametrize("radius", [None, 5000.0])
+def test_nearby_zip_codes_are_ordered_and_limited(connection, sample, radius):
+    rows = repository.SqlRepository(Session(bind=connection)).nearby_zip_codes(sample.lat, sample.long, radius, limit=5)
+
+    assert 0 < len(rows) <= 5
+    assert rows[0].distance_m < 1
+    assert [row.distance_m for row in rows] == sorted(row.distance_m for row in rows)
+    if radius is not None:
+        assert all(row.distance_m <= radius for row in rows)
+
+def test_zip_code_stats_coordinates_are_numeric(connection):
+    try:
+        stats = crud.get_zip_code_stats(Session(bind=connection))
+    except ValueError:
+        pytest.skip("zip_code_stats has not been computed; run `python init_db.py refresh-stats`")
+
+    coverage = stats["geographic_coverage"]
+    for axis, limit in [("lat_range", 90), ("long_range", 180)]:
+        low, high = coverage[axis]["min"], coverage[axis]["max"]
+        assert isinstance(low, float) and isinstance(high, float)
+        assert -limit <= low <= high <= limit
+
+def test_locate_postal_codes(connection, sample):
+    indexes, _ = explain(connection, repository.locate_postal_codes_query(), {
+        "lons": [sample.long],
+        "lats": [sample.lat]
+    })
+
+    assert "idx_zip_codes_geometry" in indexes
+
+def test_geometries(connection, sample):
+    indexes, _ = explain(connection, repository.geometry_query(FULL_DETAIL), {
+        "postal_codes": [sample.postal_code],
+        "precision": FULL_DETAIL.precision
+    })
+
+    assert "idx_zip_codes_postal_code" in indexes
+
+def test_demographics(connection, sample):
+    indexes, _ = explain(connection, repository.demographics_query([sample.postal_code]), {})
+
+    assert "idx_zip_demographics_postal_code_year" in indexes
+
+def test_station_boundary(connection, sample):
+    if connection.execute(text("SELECT to_regclass('station_boundaries')")).scalar() is None:
+        pytest.skip("station_boundaries does not exist; run `python init_db.py refresh-boundaries`")
+
+    indexes, _ = explain(connection, repository.station_boundaries_query(FULL_DETAIL, sample.delivery_station), {
+        "effective_week": sample.effective_week,
+        "program_type": sample.program_type,
+        "delivery_station": sample.delivery_station,
+        "precision": FULL_DETAIL.precision
+    })
+
+    assert "idx_station_boundaries_week_program_station" in indexes